@@ -1,163 +1,686 @@
+import argparse
+import os
+import time
 import pyglet, random, math
-from game import asteroid, load, player, resources
+from game import asteroid, bullet, entity, physicalobject, player, resources, world
+from game import collision, controls, events, levels, pilot, sectors, spatial
+from game import camera, hud, particles, spritearray
+from game import pacing, parallel, simthread
+from game import allocations, capture, framestats, metrics, replay, tracing
 
 # Set up a window
 game_window = pyglet.window.Window(800, 600)
 
 main_batch = pyglet.graphics.Batch()
 
-# Set up the two top labels
-score_label = pyglet.text.Label(text="Score: 0", x=10, y=575, batch=main_batch)
+# Debris and engine exhaust, shared by every game object
+particle_system = particles.ParticleSystem(budget=4096, batch=main_batch)
+particles.system = particle_system
+
+# Score, level and lives are drawn by the HUD, which only re-lays out text
+# once per frame and only when a value changed
+game_hud = hud.Hud(800, 600)
+
+# Set up the title label
 level_label = pyglet.text.Label(text="Version 5: It's a Game!",font_size=20, color=(255,0,0,255),
-                                x=400, y=575, anchor_x='center', batch=main_batch)
+                                x=400, y=575, anchor_x='center', batch=game_hud.batch)
 
 # Set up the game over label offscreen
 game_over_label = pyglet.text.Label(text="GAME OVER",
                                     x=400, y=-300, anchor_x='center',
-                                    batch=main_batch, font_size=48)
+                                    batch=game_hud.batch, font_size=48)
 
 counter = pyglet.clock.ClockDisplay()
 
+# Every ship reads its input from one byte of game_controls.actions; the
+# keyboard fills in the player's. It is pushed onto the window once, so
+# starting a level never touches the handler stack.
+game_controls = controls.Controls()
+keyboard = game_controls.add_source(controls.KeyboardSource(ship=0))
+game_window.push_handlers(keyboard)
+
+# The world can be bigger than the window; the camera follows the player and
+# keeps only the objects near the view in the batch
+game_camera = camera.Camera(800, 600, main_batch)
+
 player_ship = None
-player_lives = []
-score = 0
 num_asteroids = 3
 game_objects = []
 
-# We need to pop off as many event stack frames as we pushed on
-# every time we reset the level.
-event_stack_size = 0
+# In a big world, far away asteroids are parked in sectors instead of being
+# sprites. Stays None unless --sector-size is given.
+world_sectors = None
+
+# With --threaded, the simulation runs on a worker thread and on_draw only
+# draws the snapshots it publishes. The deaths and shots it sends back go
+# out on snapshot_events, to the debris and the shot sound.
+sim_thread = None
+snapshot_renderer = None
+snapshot_events = None
+snapshot_time = 0.0
 
+# Time between frames, to compare how evenly they land
+frame_stats = framestats.FrameStats()
 
-def init():
-    global score, num_asteroids
+# With --pilots, computer-flown ships join the player each level. They find
+# their targets in spatial_index, which update() then refreshes at the end of
+# every tick. The camera culls with it too.
+computer_pilots = None
+num_pilots = 0
+pilot_ships = []
+spatial_index = spatial.SpatialIndex()
 
-    score = 0
-    score_label.text = "Score: " + str(score)
+# Finds the overlapping pairs for update(); with --workers, a pool of
+# processes does it, a strip of the world each
+find_pairs = collision.candidate_pairs
+parallel_collider = None
 
-    num_asteroids = 3
-    reset_level(2)
+# Objects waiting to join or leave game_objects during update(); reused every tick
+pending_objects = []
+removed_objects = []
 
+# With --profile-allocations, update() reports what each of its phases allocates
+allocation_profiler = None
+
+# While tracing is on (F9, or ASTEROID_TRACE=trace.json from the start), the
+# tracer records when update() and its phases, reset_level(), on_draw() and
+# the batch draw start and end. F10 and exiting write the trace to a file.
+game_tracer = None
+tracer = None
+trace_filename = os.environ.get(tracing.environment_variable) or tracing.default_filename
+
+# With --metrics-port, counters and timings served over HTTP from another thread
+game_metrics = None
+metrics_server = None
+
+# F11 or SIGUSR1 profiles the next calls of update() and on_draw() with
+# cProfile and writes a .pstats file; with --capture-threshold, so does a
+# slow tick. game_capture is only set while the capture has work to do.
+profile_capture = capture.ProfileCapture(lambda: game_objects)
+game_capture = None
+
+# update() posts collisions, deaths, new objects, shots and points to the
+# event bus, which hands each kind to its subscribers once a tick, after the
+# cleanup: the collision loop itself only marks objects dead
+game_events = events.EventBus()
+events.bus = game_events
+
+# The next level's asteroids are planned ahead on a worker thread and come
+# in a slice per tick; the ship and the life icons stay from level to level
+level_loader = levels.LevelLoader()
+
+# Where update() reports its phases: the profiler, the tracer, both or None
+phase_listener = None
+
+# With --sprite-array, the game objects are drawn from one vertex buffer
+# filled with NumPy each frame, and their own Sprites stay out of the batch
+sprite_renderer = None
+object_batch = main_batch
+
+# With --record, every object's state is appended to a replay file each
+# update; the writer compresses and writes it on its own thread
+replay_writer = None
+replay_kinds = {asteroid.Asteroid: 0, bullet.Bullet: 1, player.Player: 2}
+
+
+def set_phase_listener():
+    global phase_listener
+    listeners = [listener for listener in (allocation_profiler, game_tracer) if listener is not None]
+    if len(listeners) > 1:
+        phase_listener = tracing.Tee(*listeners)
+    else:
+        phase_listener = listeners[0] if listeners else None
+
+
+def set_allocation_profiler(profiler):
+    global allocation_profiler
+    allocation_profiler = profiler
+    set_phase_listener()
 
-def reset_level(num_lives=2):
-    global player_ship, player_lives, game_objects, event_stack_size
 
-    # Clear the event stack of any remaining handlers from other levels
-    while event_stack_size > 0:
-        game_window.pop_handlers()
-        event_stack_size -= 1
+def set_tracing(on):
+    global game_tracer, tracer
+    if on and tracer is None:
+        tracer = tracing.Tracer()
+    game_tracer = tracer if on else None
+    set_phase_listener()
 
-    for life in player_lives:
-        life.delete()
 
-    # Initialize the player sprite
-    player_ship = player.Player(x=400, y=300, batch=main_batch)
+def toggle_tracing():
+    set_tracing(game_tracer is None)
+    print("tracing %s" % ("on" if game_tracer is not None else "off"))
 
-    # Make three sprites to represent remaining lives
-    player_lives = load.player_lives(num_lives, main_batch)
+
+def export_trace():
+    if tracer is not None and tracer.count:
+        events = tracer.export(trace_filename)
+        print("trace: %d events written to %s (%d dropped)" % (events, trace_filename, tracer.dropped))
+
+
+game_window.push_handlers(tracing.TraceKeys(toggle_tracing, export_trace))
+
+
+def set_capture_hook():
+    global game_capture
+    game_capture = profile_capture if profile_capture.watching else None
+
+
+def request_capture(reason="request"):
+    profile_capture.request(reason)
+    set_capture_hook()
+
+
+def capture_finished(filename):
+    print(profile_capture.report(filename))
+    set_capture_hook()
+
+
+profile_capture.on_finish = capture_finished
+game_window.push_handlers(capture.CaptureKeys(lambda: request_capture("F11")))
+
+
+def set_metrics(new_metrics):
+    global game_metrics
+    if game_metrics is not None:
+        game_events.unsubscribe(game_metrics)
+    game_metrics = new_metrics
+    if new_metrics is not None:
+        game_events.subscribe(new_metrics)
+
+
+def add_objects(objects):
+    """Put objects made by an event subscriber into the game"""
+    game_objects.extend(objects)
+    game_events.spawn(objects)
+
+
+def score_deaths(objects, x, y, velocity_x, velocity_y):
+    """One point for every asteroid destroyed"""
+    points = 0
+    for obj in objects:
+        if isinstance(obj, asteroid.Asteroid):
+            points += 1
+    game_events.score(points)
+
+
+def play_shots(count):
+    # However many ships fired in the tick, the sound plays once
+    resources.bullet_sound.play()
+
+
+asteroid_breakup = asteroid.Breakup(add_objects, batch=object_batch)
+game_events.subscribe(asteroid.Debris(), asteroid_breakup, game_hud,
+                      on_deaths=score_deaths, on_shots=play_shots)
+
+
+def init(start_asteroids=3):
+    global num_asteroids
+
+    game_hud.set_score(0)
+
+    num_asteroids = start_asteroids
+    game_hud.set_level(1)
+    reset_level(2)
+
+    # Nothing is running yet, so the first level can come in all at once
+    game_objects.extend(level_loader.finish(object_batch))
+    spatial_index.update(game_objects)
+
+
+def reset_level(num_lives=2):
+    global player_ship, game_objects
+
+    trace = game_tracer
+    if trace is not None:
+        trace.push('reset_level()')
+    if game_metrics is not None:
+        game_metrics.level_resets += 1
+
+    # The ship is made once and put back in the middle for every level after that
+    if player_ship is None:
+        player_ship = player.Player(x=world.width / 2, y=world.height / 2, batch=object_batch,
+                                    controls=game_controls, ship_index=0)
+        game_camera.follow(player_ship)
+        if sprite_renderer is not None:
+            # The engine flame is still drawn as an ordinary sprite
+            player_ship.engine_sprite.batch = main_batch
+    else:
+        player_ship.respawn(world.width / 2, world.height / 2)
+
+    # Whatever is left of the last level goes; the ships are dealt with below
+    for obj in game_objects:
+        if not isinstance(obj, player.Player):
+            obj.delete()
+
+    # Show the remaining lives; the icon sprites are reused across levels
+    game_hud.set_lives(num_lives)
 
     # Make some asteroids so we have something to shoot at 
-    asteroids = load.asteroids(num_asteroids, player_ship.position, main_batch)
+    if world_sectors is not None:
+        # Park them all; the ones near the player become sprites over the next frames
+        world_sectors.clear()
+        world_sectors.add_records(sectors.random_records(num_asteroids, player_ship.position))
+    else:
+        # They come in over the next ticks. Meanwhile the two levels that can
+        # follow this one (same count after a death, one more after a win) are
+        # worked out in the background.
+        level_loader.start(num_asteroids, player_ship.position)
+        level_loader.prepare(num_asteroids, player_ship.position)
+        level_loader.prepare(num_asteroids + 1, player_ship.position)
+
+    # Computer-flown ships start around the player, as ships 1 to num_pilots
+    for ship in pilot_ships:
+        if not ship.dead:
+            ship.delete()
+    pilot_ships[:] = []
+    for i in range(num_pilots):
+        angle = 2 * math.pi * i / num_pilots
+        pilot_ships.append(player.Player(x=player_ship.x + math.cos(angle) * 60,
+                                         y=player_ship.y + math.sin(angle) * 60,
+                                         batch=object_batch, controls=game_controls, ship_index=1 + i))
+
+    if sprite_renderer is not None:
+        # The engine flames are still drawn as ordinary sprites
+        for ship in pilot_ships:
+            ship.engine_sprite.batch = main_batch
 
     # Store all objects that update each frame in a list
-    game_objects = [player_ship] + asteroids
+    game_objects = [player_ship] + pilot_ships
+    spatial_index.update(game_objects)
 
-    # Add any specified event handlers to the event handler stack
-    for obj in game_objects:
-        for handler in obj.event_handlers:
-            game_window.push_handlers(handler)
-            event_stack_size += 1
+    if trace is not None:
+        trace.pop()
 
 
 @game_window.event
 def on_draw():
+    capture_hook = game_capture
+    if capture_hook is not None:
+        capture_hook.run('on_draw()', draw_game, timed=False)
+    else:
+        draw_game()
+
+
+def draw_game():
+    trace = game_tracer
+    if trace is not None:
+        trace.push('on_draw()')
+    telemetry = game_metrics
+    if telemetry is not None:
+        started = time.perf_counter()
+    frame_stats.tick()
     game_window.clear()
+
+    if sim_thread is not None:
+        draw_snapshot(sim_thread.latest)
+
+    game_camera.update()
+    if sprite_renderer is not None:
+        sprite_renderer.gather(game_objects)
+        sprite_renderer.upload(game_camera.view())
+    else:
+        if computer_pilots is None:
+            spatial_index.update(game_objects)
+        game_camera.cull(spatial_index)
+    game_camera.begin()
+    particle_system.upload()
+    if trace is not None:
+        trace.push('main_batch.draw()')
     main_batch.draw()
+    if trace is not None:
+        trace.pop()
+    game_camera.end()
+
+    game_hud.flush()
+    game_hud.draw()
     counter.draw()
+    if telemetry is not None:
+        telemetry.draw_times.record(time.perf_counter() - started)
+    if trace is not None:
+        trace.pop()
+
+
+def draw_snapshot(snapshot):
+    """Match the sprites, particles and HUD to the simulation thread's latest state"""
+    global snapshot_time
+    sim_thread.relay.deliver(snapshot_events)
+    particle_system.update(snapshot.time - snapshot_time)
+    snapshot_time = snapshot.time
+    snapshot_renderer.draw_snapshot(snapshot)
+    game_hud.set_score(snapshot.score)
+    game_hud.set_lives(snapshot.lives)
+    game_hud.set_level(snapshot.level)
+    if snapshot.game_over:
+        game_over_label.y = 300
 
 
 def update(dt):
-    global score, num_asteroids
-
-    player_dead = False
-    victory = False
+    capture_hook = game_capture
+    if capture_hook is not None:
+        capture_hook.run('update()', update_game, dt)
+    else:
+        update_game(dt)
 
-    # To avoid handling collisions twice, we employ nested loops of ranges.
-    # This method also avoids the problem of colliding an object with itself.
-    for i in range(len(game_objects)):
-        for j in range(i + 1, len(game_objects)):
 
-            obj_1 = game_objects[i]
-            obj_2 = game_objects[j]
+def update_game(dt):
+    global num_asteroids
 
-            # Make sure the objects haven't already been killed
-            if not obj_1.dead and not obj_2.dead:
-                if obj_1.collides_with(obj_2):
-                    obj_1.handle_collision_with(obj_2)
-                    obj_2.handle_collision_with(obj_1)
+    player_dead = False
+    victory = False
 
-    # Let's not modify the list while traversing it
-    to_add = []
+    trace = game_tracer
+    if trace is not None:
+        trace.push('update()')
+    telemetry = game_metrics
+    if telemetry is not None:
+        started = time.perf_counter()
+
+    # With --profile-allocations or tracing, each phase below is reported separately
+    profiler = phase_listener
+
+    # This tick's input for every ship
+    if profiler is not None:
+        profiler.begin('input')
+    game_controls.update()
+
+    # Only pairs that are close enough to touch are checked, each once
+    if profiler is not None:
+        profiler.begin('collide')
+    tested = collision.collide(game_objects, find_pairs=find_pairs, bus=game_events)[0]
+    if telemetry is not None:
+        telemetry.pairs_tested += tested
+    # A count past 256 is a new int; freed on return, after the last phase has
+    # been measured, it would show up as a leak of the collide phase
+    del tested
+
+    # Let's not modify the list while traversing it. The lists are kept
+    # between ticks and emptied in place, so a quiet tick allocates nothing.
+    to_add = pending_objects
+    dead_objects = removed_objects
 
     # Check for win condition
     asteroids_remaining = 0
 
+    if profiler is not None:
+        profiler.begin('update')
     for obj in game_objects:
         obj.update(dt)
 
-        to_add.extend(obj.new_objects)
-        obj.new_objects = []
+        if obj.new_objects:
+            to_add.extend(obj.new_objects)
+            del obj.new_objects[:]
+
+        if obj.dead:
+            dead_objects.append(obj)
 
         # Check for win condition
         if isinstance(obj, asteroid.Asteroid):
             asteroids_remaining += 1
 
+    if world_sectors is not None:
+        asteroids_remaining += world_sectors.dormant_count
+    asteroids_remaining += level_loader.pending
+
     if asteroids_remaining == 0:
         # Don't act on victory until the end of the time step
         victory = True
 
     # Get rid of dead objects
-    for to_remove in [obj for obj in game_objects if obj.dead]:
-        if to_remove == player_ship:
-            player_dead = True
+    if profiler is not None:
+        profiler.begin('cleanup')
+    for to_remove in dead_objects:
         # If the dying object spawned any new objects, add those to the 
         # game_objects list later
         to_add.extend(to_remove.new_objects)
 
-        # Remove the object from any batches it is a member of
-        to_remove.delete()
+        # The subscribers hear about it (and score it) at the end of the cleanup
+        game_events.death(to_remove)
+
+        if to_remove is player_ship:
+            # Kept for the next level
+            player_dead = True
+            to_remove.hide()
+        else:
+            # Remove the object from any batches it is a member of
+            to_remove.delete()
 
         # Remove the object from our list
         game_objects.remove(to_remove)
-
-        # Bump the score if the object to remove is an asteroid
-        if isinstance(to_remove, asteroid.Asteroid):
-            score += 1
-            score_label.text = "Score: " + str(score)
+    del dead_objects[:]
 
     # Add new objects to the list
-    game_objects.extend(to_add)
+    if to_add:
+        game_objects.extend(to_add)
+        game_events.spawn(to_add)
+        del to_add[:]
+
+    # Debris, fragments, score, sound and telemetry for everything above
+    if profiler is not None:
+        profiler.begin('events')
+    game_events.dispatch()
+
+    # Stream asteroids in and out of the sectors around the player
+    if world_sectors is not None:
+        if profiler is not None:
+            profiler.begin('sectors')
+        world_sectors.update(dt, [player_ship], game_objects)
+
+    if profiler is not None:
+        profiler.begin('particles')
+    particle_system.update(dt)
+
+    if replay_writer is not None:
+        if profiler is not None:
+            profiler.begin('record')
+        record_objects()
 
     # Check for win/lose conditions
+    if profiler is not None:
+        profiler.begin('level')
+    if level_loader.pending:
+        game_objects.extend(level_loader.step(object_batch))
     if player_dead:
-        # We can just use the length of the player_lives list as the number of lives
-        if len(player_lives) > 0:
-            reset_level(len(player_lives) - 1)
+        # The HUD keeps track of the number of lives
+        if game_hud.lives > 0:
+            reset_level(game_hud.lives - 1)
         else:
             game_over_label.y = 300
     elif victory:
         num_asteroids += 1
-        player_ship.delete()
-        score += 10
-        reset_level(len(player_lives))
+        game_events.score(10)
+        game_hud.set_level(game_hud.level + 1)
+        reset_level(game_hud.lives)
+
+    # Where everything is for the pilots in the next tick, and for the frame;
+    # objects deleted above drop out of it here. Without pilots the frame
+    # brings it up to date itself.
+    if computer_pilots is not None:
+        if profiler is not None:
+            profiler.begin('spatial')
+        spatial_index.update(game_objects)
+    if profiler is not None:
+        profiler.end()
+    if telemetry is not None:
+        telemetry.tick_times.record(time.perf_counter() - started)
+    if trace is not None:
+        trace.pop()
+
+
+def record_objects():
+    """Write this tick's input and the state of every object"""
+    tick = game_controls.tick - 1
+    controls.record(replay_writer, tick, game_controls.actions)
+    write = replay_writer.write
+    for index, obj in enumerate(game_objects):
+        write(tick, replay_kinds.get(type(obj), 0xffff), index & 0xffff,
+              obj.x, obj.y, obj.velocity_x, obj.velocity_y)
+
+
+def run_paced(simulate, frame_rate=60.0):
+    """Our own loop instead of pyglet.app.run(), so a FramePacer decides when
+    to update, when to draw and when to sleep"""
+
+    def draw():
+        game_window.switch_to()
+        game_window.dispatch_event('on_draw')
+        game_window.flip()
+
+    pacer = pacing.FramePacer(simulate, draw, step=1 / 120.0, frame_time=1 / frame_rate)
+    while not game_window.has_exit:
+        pyglet.clock.tick()
+        game_window.dispatch_events()
+        pacer.run_frame()
+    return pacer
 
 
 if __name__ == "__main__":
-    # Start it up!
-    init()
-
-    # Update the game 120 times per second
-    pyglet.clock.schedule_interval(update, 1 / 120.0)
-
-    # Tell pyglet to do its thing
-    pyglet.app.run()
+    parser = argparse.ArgumentParser(description="Asteroids, written with pyglet")
+    parser.add_argument('--world', default='800x600',
+                        help="size of the playfield, e.g. 20000x20000 (default: the window)")
+    parser.add_argument('--asteroids', type=int, default=3,
+                        help="number of asteroids in the first level")
+    parser.add_argument('--sector-size', type=int, default=0,
+                        help="stream asteroids in sectors of this size (default: off)")
+    parser.add_argument('--threaded', action='store_true',
+                        help="run the simulation on a worker thread")
+    parser.add_argument('--fixed-point', action='store_true',
+                        help="run the deterministic Q16.16 simulation, on a worker thread (implies --threaded)")
+    parser.add_argument('--record', metavar='PATH',
+                        help="write every object's state to a replay file each update")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="find collision pairs with this many worker processes (default: on this thread)")
+    parser.add_argument('--pilots', type=int, default=0,
+                        help="number of computer-flown ships alongside the player")
+    parser.add_argument('--input-replay', metavar='PATH',
+                        help="also take ship input from a file written with --record")
+    parser.add_argument('--input-port', type=int, metavar='PORT',
+                        help="also take ship input from UDP packets on this port")
+    parser.add_argument('--input-host', default='127.0.0.1', metavar='HOST',
+                        help="address to take --input-port packets on (default: this machine only; "
+                             "0.0.0.0 lets any host steer the ships)")
+    parser.add_argument('--profile-allocations', action='store_true',
+                        help="report allocations and GC pauses for each phase of update()")
+    parser.add_argument('--paced', type=float, nargs='?', const=60.0, metavar='FPS',
+                        help="pace updates and draws with our own loop (default: 60 frames per second)")
+    parser.add_argument('--sprite-array', action='store_true',
+                        help="draw the game objects from one NumPy-filled vertex buffer")
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+    parser.add_argument('--capture-calls', type=int, default=240, metavar='N',
+                        help="calls of update() or on_draw() a profile capture covers (default: 240)")
+    parser.add_argument('--capture-threshold', type=float, metavar='MS',
+                        help="start a profile capture when a tick takes longer than this")
+    parser.add_argument('--capture-dir', default='.',
+                        help="where profile captures are written (default: the current directory)")
+    args = parser.parse_args()
+    args.threaded = args.threaded or args.fixed_point
+    world.resize(*[int(size) for size in args.world.split('x')])
+    if args.sprite_array:
+        sprite_renderer = spritearray.SpriteArray(
+            spritearray.Atlas([resources.asteroid_image, resources.bullet_image, resources.player_image]),
+            batch=main_batch)
+        physicalobject.PhysicalObject.array_drawn = True
+        object_batch = None
+        asteroid_breakup.batch = None
+    if args.sector_size:
+        world_sectors = sectors.SectorGrid(args.sector_size, batch=object_batch)
+    if args.record:
+        replay_writer = replay.ReplayWriter(args.record)
+    if args.threaded and args.sector_size:
+        parser.error("--sector-size only works without --threaded")
+    if args.threaded and args.workers > 1:
+        parser.error("--workers only works without --threaded")
+    if args.workers > 1:
+        parallel_collider = parallel.ParallelCollider(args.workers)
+        find_pairs = parallel_collider.pairs
+    if args.fixed_point and args.pilots:
+        parser.error("--pilots only works without --fixed-point")
+    if args.pilots and not args.threaded:
+        num_pilots = args.pilots
+        computer_pilots = pilot.Pilots(index=spatial_index, target_kinds=[asteroid.Asteroid])
+        game_controls.add_source(controls.PilotSource(computer_pilots, lambda: pilot_ships,
+                                                      None, first=1))
+    if args.profile_allocations:
+        set_allocation_profiler(allocations.AllocationProfiler())
+        allocation_profiler.start()
+    if args.metrics_port is not None:
+        set_metrics(metrics.Metrics(lambda: game_objects))
+        metrics_server = metrics.MetricsServer(game_metrics, args.metrics_port).start()
+        print("metrics on http://%s:%d/metrics" % metrics_server.address)
+    profile_capture.calls = args.capture_calls
+    profile_capture.directory = args.capture_dir
+    if args.capture_threshold is not None:
+        profile_capture.threshold = args.capture_threshold / 1000.0
+        set_capture_hook()
+    capture.install_signal(lambda: request_capture("SIGUSR1"))
+    if os.environ.get(tracing.environment_variable):
+        set_tracing(True)
+    if args.input_replay:
+        game_controls.add_source(controls.ReplaySource(args.input_replay))
+    if args.input_port:
+        game_controls.add_source(controls.NetworkSource((args.input_host, args.input_port)))
+
+    if args.threaded:
+        if args.fixed_point:
+            simulation = simthread.FixedPointSimulation(args.asteroids)
+            sim_thread = simthread.SimulationThread(simulation, dt=simulation.dt)
+        else:
+            sim_thread = simthread.SimulationThread(simthread.EntitySimulation(args.asteroids, pilots=args.pilots))
+        snapshot_renderer = simthread.SnapshotRenderer(main_batch)
+        snapshot_events = events.EventBus()
+        snapshot_events.subscribe(asteroid.Debris(entity.Asteroid), on_shots=play_shots)
+        computer_pilots = sim_thread.simulation.pilots
+        game_window.push_handlers(sim_thread)
+
+        # The engine sprite always sits on the ship, so the camera can follow it
+        game_camera.follow(snapshot_renderer.engine_sprite)
+        game_hud.set_lives(sim_thread.latest.lives)
+        sim_thread.start()
+
+        # Nothing to update on this thread; just keep drawing
+        pyglet.clock.schedule(lambda dt: None)
+    else:
+        # Start it up!
+        init(args.asteroids)
+
+        # Update the game 120 times per second
+        if not args.paced:
+            pyglet.clock.schedule_interval(update, 1 / 120.0)
+
+    if args.paced:
+        frame_pacer = run_paced(update if sim_thread is None else (lambda dt: None), args.paced)
+        print(frame_pacer.report())
+    else:
+        # Tell pyglet to do its thing
+        pyglet.app.run()
+
+    if sim_thread is not None:
+        sim_thread.stop()
+    print(frame_stats.report("threaded" if args.threaded else "single-threaded"))
+
+    if computer_pilots is not None:
+        print(computer_pilots.report())
+
+    if sprite_renderer is not None:
+        print(sprite_renderer.report())
+
+    print(level_loader.report())
+    level_loader.close()
+
+    if parallel_collider is not None:
+        print(parallel_collider.report())
+        parallel_collider.close()
+
+    if allocation_profiler is not None:
+        allocation_profiler.stop()
+        print(allocation_profiler.report())
+
+    export_trace()
+
+    if metrics_server is not None:
+        metrics_server.stop()
+
+    if replay_writer is not None:
+        replay_writer.close()
+        print("replay: %(written)d records, %(dropped)d dropped, %(bytes_out)d bytes, "
+              "peak ring fill %(peak_fill).0f%%" % dict(replay_writer.stats(), peak_fill=100 * replay_writer.peak_fill))
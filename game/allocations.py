@@ -0,0 +1,167 @@
+"""Where does update() allocate? Per-phase allocation and GC pause tracking.
+
+The game calls begin(name) at the start of each phase of a tick and end()
+after the last one. For every phase the profiler keeps:
+
+* the net number of memory blocks it left allocated (sys.getallocatedblocks),
+* the net bytes and the peak bytes above the start, from tracemalloc,
+* the garbage collections that ran inside it and how long they paused.
+
+report() adds the source lines whose allocations grew the most since
+start(), from two tracemalloc snapshots. All of this is slow; it is only
+switched on when asked for.
+"""
+import gc
+import sys
+import time
+import tracemalloc
+from array import array
+
+
+class PhaseStats(object):
+    __slots__ = ('calls', 'blocks', 'bytes', 'peak', 'collections', 'collected', 'gc_time', 'worst_gc')
+
+    def __init__(self):
+        self.calls = 0
+        self.blocks = 0
+        self.bytes = 0
+        self.peak = 0
+        self.collections = 0
+        self.collected = 0
+        self.gc_time = 0.0
+        self.worst_gc = 0.0
+
+
+class AllocationProfiler(object):
+    """Allocation and GC statistics for the named phases of each tick"""
+
+    def __init__(self, frames=1, top=10):
+        self.frames = frames
+        self.top = top
+        self.phases = {}
+        self.ticks = 0
+        self.current = None
+        self.started = False
+        # Block and byte counts at the start of the phase, and what measuring
+        # them costs by itself (an empty phase), which is taken off each phase
+        self._start = array('q', [0, 0])
+        self._overhead = array('q', [0, 0])
+        self._gc_start = None
+        self._baseline = None
+        self._final = None
+        self._started_tracing = False
+
+    def start(self):
+        if self.started:
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+        gc.callbacks.append(self._on_gc)
+        self._calibrate()
+        self._baseline = tracemalloc.take_snapshot()
+        self.started = True
+
+    def _calibrate(self):
+        """Measure empty phases and keep the typical cost (the median, as the
+        first few can be thrown off by freelists filling up)"""
+        self._overhead[0] = self._overhead[1] = 0
+        samples = []
+        for i in range(9):
+            stats = self.current = PhaseStats()
+            self._measure_start()
+            self._close()
+            samples.append((stats.blocks, stats.bytes))
+        self.current = None
+        blocks, sizes = sorted(sample[0] for sample in samples), sorted(sample[1] for sample in samples)
+        self._overhead[0] = blocks[len(blocks) // 2]
+        self._overhead[1] = sizes[len(sizes) // 2]
+
+    def _measure_start(self):
+        tracemalloc.reset_peak()
+        self._start[1] = tracemalloc.get_traced_memory()[0]
+        self._start[0] = sys.getallocatedblocks()
+
+    def stop(self):
+        if not self.started:
+            return
+        self.end()
+        gc.callbacks.remove(self._on_gc)
+        self._final = tracemalloc.take_snapshot()
+        # Tracing slows everything down, so don't leave it on behind the caller's back
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self.started = False
+
+    def begin(self, name):
+        """Close the phase that is running, if any, and start `name`"""
+        if self.current is not None:
+            self._close()
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = self.phases[name] = PhaseStats()
+        self.current = stats
+        self._measure_start()
+
+    def end(self):
+        """Close the last phase of a tick"""
+        if self.current is not None:
+            self._close()
+            self.current = None
+            self.ticks += 1
+
+    def _close(self):
+        blocks = sys.getallocatedblocks()
+        current, peak = tracemalloc.get_traced_memory()
+        stats = self.current
+        stats.calls += 1
+        stats.blocks += blocks - self._start[0] - self._overhead[0]
+        stats.bytes += current - self._start[1] - self._overhead[1]
+        stats.peak = max(stats.peak, peak - self._start[1])
+
+    def _on_gc(self, phase, info):
+        if phase == 'start':
+            self._gc_start = time.perf_counter()
+            return
+        if self._gc_start is None:
+            return
+        pause = time.perf_counter() - self._gc_start
+        self._gc_start = None
+        stats = self.current
+        if stats is None:
+            stats = self.phases.get('(between ticks)')
+            if stats is None:
+                stats = self.phases['(between ticks)'] = PhaseStats()
+        stats.collections += 1
+        stats.collected += info.get('collected', 0)
+        stats.gc_time += pause
+        stats.worst_gc = max(stats.worst_gc, pause)
+
+    def top_lines(self):
+        """The source lines whose allocations grew the most between start() and stop() (or now)"""
+        if self._baseline is None:
+            return []
+        if self.started:
+            snapshot = tracemalloc.take_snapshot()
+        else:
+            snapshot = self._final
+        # Leave out the profiler's own bookkeeping
+        ignore = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+        snapshot = snapshot.filter_traces(ignore)
+        return snapshot.compare_to(self._baseline.filter_traces(ignore), 'lineno')[:self.top]
+
+    def report(self):
+        lines = ["%-16s %8s %12s %12s %12s %6s %10s %10s"
+                 % ("phase", "calls", "blocks/call", "bytes/call", "peak bytes", "gcs", "gc ms", "worst ms")]
+        for name, stats in self.phases.items():
+            calls = max(stats.calls, 1)
+            lines.append("%-16s %8d %12.2f %12.1f %12d %6d %10.2f %10.2f"
+                         % (name, stats.calls, stats.blocks / float(calls), stats.bytes / float(calls),
+                            stats.peak, stats.collections, stats.gc_time * 1000, stats.worst_gc * 1000))
+        growth = self.top_lines()
+        if growth:
+            lines.append("")
+            lines.append("Biggest growth since start:")
+            lines.extend("  %s" % difference for difference in growth)
+        return "\n".join(lines)
@@ -1,30 +1,65 @@
 import random
-from . import physicalobject, resources
+from . import particles, physicalobject, resources, spawn
 
 
 class Asteroid(physicalobject.PhysicalObject):
-    """An asteroid that divides a little before it dies"""
+    """An asteroid; Breakup divides it a little when it dies"""
 
     def __init__(self, *args, **kwargs):
-        super(Asteroid, self).__init__(resources.asteroid_image, *args, **kwargs)
+        img = kwargs.pop('img', resources.asteroid_image)
+        rotate_speed = kwargs.pop('rotate_speed', None)
+        super(Asteroid, self).__init__(img, *args, **kwargs)
 
         # Slowly rotate the asteroid as it moves
-        self.rotate_speed = random.random() * 100.0 - 50.0
+        if rotate_speed is None:
+            rotate_speed = random.random() * 100.0 - 50.0
+        self.rotate_speed = rotate_speed
 
     def update(self, dt):
         super(Asteroid, self).update(dt)
         self.rotation += self.rotate_speed * dt
 
-    def handle_collision_with(self, other_object):
-        super(Asteroid, self).handle_collision_with(other_object)
-
-        # Superclass handles deadness already
-        if self.dead and self.scale > 0.25:
-            num_asteroids = random.randint(2, 3)
-            for i in range(num_asteroids):
-                new_asteroid = Asteroid(x=self.x, y=self.y, batch=self.batch)
-                new_asteroid.rotation = random.randint(0, 360)
-                new_asteroid.velocity_x = random.random() * 70 + self.velocity_x
-                new_asteroid.velocity_y = random.random() * 70 + self.velocity_y
-                new_asteroid.scale = self.scale * 0.5
-                self.new_objects.append(new_asteroid)
+
+class Debris(object):
+    """Event subscriber: a breaking asteroid throws debris around"""
+
+    def __init__(self, kind=None):
+        # The class of the objects that count as asteroids (default: Asteroid)
+        self.kind = kind or Asteroid
+
+    def on_deaths(self, objects, x, y, velocity_x, velocity_y):
+        for index, obj in enumerate(objects):
+            if isinstance(obj, self.kind):
+                particles.emit(particles.debris, x[index], y[index], int(60 * obj.scale),
+                               velocity_x[index], velocity_y[index])
+
+
+class Breakup(object):
+    """Event subscriber: an asteroid that dies divides into smaller ones, unless it is small already.
+
+    The fragments go to add(), which puts them in the game. They are made
+    from the `fragment` prefab (default: fragment below), and only objects
+    of its class break up.
+    """
+
+    def __init__(self, add, batch=None, fragment=None):
+        self.add = add
+        self.batch = batch
+        self.fragment = fragment
+
+    def on_deaths(self, objects, x, y, velocity_x, velocity_y):
+        prefab = self.fragment or fragment
+        for index, obj in enumerate(objects):
+            if isinstance(obj, prefab.cls) and obj.scale > 0.25:
+                num_asteroids = int(spawn.rng.integers(2, 4))
+                self.add(spawn.spawn(prefab, num_asteroids, (x[index], y[index]),
+                                     batch=self.batch,
+                                     velocity=(velocity_x[index], velocity_y[index]),
+                                     scale=obj.scale * 0.5))
+
+
+# A full-size asteroid drifting slowly, as placed at the start of a level
+big_asteroid = spawn.Prefab(Asteroid, image=resources.asteroid_image, speed=(0.0, 40.0))
+
+# The pieces of a broken asteroid fly off faster; their scale comes from the parent
+fragment = spawn.Prefab(Asteroid, image=resources.asteroid_image, speed=(0.0, 70.0))
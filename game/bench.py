@@ -0,0 +1,642 @@
+"""Benchmarks for the game package.
+
+Run them all with `python -m game.bench`, or some of them by name:
+`python -m game.bench entity_memory`.
+"""
+import argparse
+import gc
+import sys
+import tracemalloc
+
+
+def traced_bytes(build):
+    """Memory allocated by build() and still alive afterwards, as seen by tracemalloc"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = build()
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return after - before, kept
+
+
+def sprite_bytes(count):
+    """Bytes per Sprite-based Asteroid, and what they were measured on.
+
+    With a display this is pyglet's own Sprite, each with its vertex list in
+    the batch. Without one it is the headless stand-in, which allocates the
+    same group and vertex list per sprite but not pyglet's buffer and region
+    bookkeeping, so it comes out a little low.
+    """
+    import pyglet
+    try:
+        window = pyglet.window.Window(visible=False)
+    except Exception:
+        window = None
+        from . import headless
+        headless.install()
+        import pyglet
+    from . import asteroid
+    batch = pyglet.graphics.Batch()
+
+    def build_sprites():
+        return [asteroid.Asteroid(x=i % 800, y=i % 600, batch=batch, rotate_speed=0.0)
+                for i in range(count)]
+
+    sprite_bytes, sprites = traced_bytes(build_sprites)
+    for sprite in sprites:
+        sprite.delete()
+    if window is not None:
+        window.close()
+    return sprite_bytes / float(count), 'pyglet' if window is not None else 'headless'
+
+
+def entity_memory(count=100000, min_reduction=10.0, min_headless_reduction=5.0):
+    """Bytes per entity: __slots__ Entity records against Sprite-based Asteroids"""
+    import multiprocessing
+    from . import entity
+
+    def build_records():
+        return [entity.asteroid(float(i % 800), float(i % 600), 10.0, 10.0) for i in range(count)]
+
+    record_bytes, records = traced_bytes(build_records)
+    del records
+    record_bytes /= float(count)
+    print("Entity records:   %8.1f bytes each (%d entities)" % (record_bytes, count))
+
+    # In a process of its own, so real pyglet doesn't clash with the
+    # headless stand-in the other benchmarks install
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        per_sprite, measured_on = pool.apply(sprite_bytes, (count,))
+    reduction = per_sprite / record_bytes
+    print("Sprite objects:   %8.1f bytes each (%d entities, %s)" % (per_sprite, count, measured_on))
+    print("Reduction:        %8.1fx (target %.0fx)" % (reduction, min_reduction))
+    if measured_on == 'pyglet':
+        assert reduction >= min_reduction, \
+            "entity records take %.1fx less memory than sprites, expected %.1fx" % (reduction, min_reduction)
+    else:
+        # The stand-in undercounts a real Sprite; the target is only checked against pyglet's
+        print("Not checked against the %.0fx target without a display" % min_reduction)
+        assert reduction >= min_headless_reduction, \
+            "entity records take %.1fx less memory than headless sprites, expected %.1fx" \
+            % (reduction, min_headless_reduction)
+
+
+def fixed_physics(ticks=5000, num_asteroids=20, seed=1):
+    """Ticks per second of the fixed-point simulation, and that two runs agree bit for bit"""
+    import time
+    from . import fixedpoint
+
+    def run():
+        simulation = fixedpoint.FixedSimulation(800, 600, seed)
+        ship = simulation.add_player(400, 300)
+        simulation.add_asteroids(num_asteroids, avoid=ship)
+        pilot = fixedpoint.XorShift(seed + 1)
+        start = time.perf_counter()
+        for i in range(ticks):
+            simulation.step([pilot.below(16)])
+        return simulation.state_hash(), time.perf_counter() - start
+
+    first_hash, elapsed = run()
+    second_hash, elapsed_again = run()
+    print("Fixed-point ticks/sec: %8.1f" % (2 * ticks / (elapsed + elapsed_again)))
+    print("State hash:            %s" % first_hash)
+    print("Repeatable:            %s" % (first_hash == second_hash))
+    assert first_hash == second_hash, "fixed-point simulation is not deterministic"
+
+
+def replay_write(ticks=360, records_per_tick=500, codec='zlib', tick_rate=120.0):
+    """Game-thread cost per replay record, and whether the flusher keeps up at the game's tick rate"""
+    import os
+    import tempfile
+    import time
+    from . import replay
+
+    handle, filename = tempfile.mkstemp(suffix='.replay')
+    os.close(handle)
+    try:
+        writer = replay.ReplayWriter(filename, codec=codec)
+        write = writer.write
+        spent = 0.0
+        next_tick = time.perf_counter()
+        for tick in range(ticks):
+            start = time.perf_counter()
+            for index in range(records_per_tick):
+                write(tick, 0, index, 1.0, 2.0, 3.0, 4.0)
+            spent += time.perf_counter() - start
+            # The rest of the tick is where the game would update and draw
+            next_tick += 1 / tick_rate
+            time.sleep(max(0.0, next_tick - time.perf_counter()))
+        writer.close()
+        stats = writer.stats()
+        count = sum(1 for values in replay.read(filename))
+    finally:
+        os.remove(filename)
+
+    total = ticks * records_per_tick
+    print("Per record:        %8.0f ns" % (spent / total * 1e9))
+    print("Records written:   %8d (%d dropped, peak ring fill %.0f%%)"
+          % (stats['written'], stats['dropped'], 100 * stats['peak_fill']))
+    print("Compressed size:   %8.1f bytes/record (%s)" % (stats['bytes_out'] / float(total), codec))
+    print("Read back:         %8d" % count)
+    assert count == stats['written'], "replay file lost records"
+
+
+def frame_pacing(frames=600, step_cost=0.002, draw_cost=0.004, spike_every=50, spike=0.012):
+    """FramePacer on a MockClock with made-up costs, steady and with slow draws now and then:
+    missed deadlines, deferred steps, steps kept and time slept"""
+    from . import pacing
+
+    def run(spike_every):
+        clock = pacing.MockClock()
+        counts = {'steps': 0, 'draws': 0, 'spikes': 0}
+
+        def simulate(dt):
+            counts['steps'] += 1
+            clock.advance(step_cost)
+
+        def draw():
+            counts['draws'] += 1
+            if spike_every and counts['draws'] % spike_every == 0:
+                counts['spikes'] += 1
+                clock.advance(spike)
+            else:
+                clock.advance(draw_cost)
+
+        pacer = pacing.FramePacer(simulate, draw, clock=clock, sleep=clock.sleep)
+        for i in range(frames):
+            pacer.run_frame()
+        busy = (counts['steps'] * step_cost + (counts['draws'] - counts['spikes']) * draw_cost
+                + counts['spikes'] * spike)
+        name = "spike every %d frames" % spike_every if spike_every else "steady"
+        print(pacer.report(name))
+        print("Steps behind:      %8.1f" % (clock.time / pacer.step - pacer.steps))
+        print("Slept:             %8.3f s of %.3f s" % (clock.slept, clock.time))
+
+        assert pacer.frames == counts['draws'] == frames, "%s: not every frame was drawn" % name
+        assert pacer.steps == counts['steps'], "%s: steps run and counted differ" % name
+        assert pacer.dropped_time == 0.0, "%s: the pacer dropped time it had room for" % name
+        # Behind by no more than what is left in the accumulator and one frame's steps
+        assert clock.time / pacer.step - pacer.steps <= pacer.frame_time / pacer.step + 1, \
+            "%s: the simulation fell behind" % name
+        # Paced at the frame rate: neither running flat out nor losing frames
+        assert abs(clock.time - frames * pacer.frame_time) <= pacer.frame_time, \
+            "%s: %d frames took %.3f s" % (name, frames, clock.time)
+        # The clock only moves by the work and the sleeps, so the rest was spent asleep
+        assert abs(clock.slept - (clock.time - busy)) < 1e-6, "%s: time unaccounted for" % name
+        return pacer, counts['spikes']
+
+    # Only the first frame, drawn before the pacer knows the costs, may be late
+    pacer, spikes = run(0)
+    assert pacer.missed <= 1, "steady: %d frames missed their deadline" % pacer.missed
+    assert pacer.deferred_steps <= 1, "steady: %d steps deferred" % pacer.deferred_steps
+
+    # Each slow draw misses its deadline, by no more than it ran over
+    pacer, spikes = run(spike_every)
+    assert spikes <= pacer.missed <= spikes + 1, \
+        "spikes: %d frames missed their deadline for %d slow draws" % (pacer.missed, spikes)
+    assert pacer.lateness.summary()['worst'] <= spike - draw_cost, "spikes: frames ran later than the spike"
+    assert pacer.deferred_steps <= spikes + 1, "spikes: %d steps deferred" % pacer.deferred_steps
+
+
+def load_game():
+    """The asteroid.py script's globals, loaded under the headless pyglet stand-in"""
+    import os
+    import runpy
+    from . import headless
+    clock = headless.install()
+    script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'asteroid.py')
+    # run_path hands back a copy; the functions' own globals are the live ones
+    return clock, runpy.run_path(script, run_name='headless_game')['update'].__globals__
+
+
+def steady_state_allocations(ticks=2000, num_asteroids=200, warmup=100, max_blocks_per_tick=0.05,
+                             max_bytes_per_tick=8.0):
+    """Net allocations per update(), and per phase of it, once nothing spawns or dies; should be zero"""
+    from . import allocations
+    clock, game = load_game()
+    game['init'](num_asteroids)
+
+    # Freeze the asteroids where they are, away from the idle player. Overlapping
+    # asteroids still collide every tick, but nothing dies.
+    for obj in game['game_objects']:
+        obj.velocity_x = obj.velocity_y = 0.0
+    count = len(game['game_objects'])
+
+    dt = 1 / 120.0
+    for i in range(warmup):
+        clock.tick(dt)
+        game['update'](dt)
+
+    profiler = allocations.AllocationProfiler()
+    game['set_allocation_profiler'](profiler)
+    profiler.start()
+    for i in range(ticks):
+        clock.tick(dt)
+        game['update'](dt)
+    profiler.stop()
+    game['set_allocation_profiler'](None)
+
+    print(profiler.report())
+    blocks = sum(stats.blocks for stats in profiler.phases.values())
+    print("Objects:           %8d (%d at the start)" % (len(game['game_objects']), count))
+    print("Net blocks/tick:   %8.3f" % (blocks / float(ticks)))
+    assert len(game['game_objects']) == count, "objects spawned or died during the steady state"
+    assert blocks / float(ticks) <= max_blocks_per_tick, "update() allocates in the steady state"
+    # One phase allocating and a later one freeing would cancel out in the sum
+    for name, stats in profiler.phases.items():
+        assert abs(stats.blocks) / float(ticks) <= max_blocks_per_tick, "the %s phase allocates blocks" % name
+        assert abs(stats.bytes) / float(ticks) <= max_bytes_per_tick, "the %s phase allocates bytes" % name
+
+
+def version_loops(ticks=600, asteroid_counts=(10, 50, 200)):
+    """Tick time of version1-5 and asteroid.py in the same scenario (see game.versions)"""
+    from . import versions
+    versions.main(['--ticks', str(ticks), '--asteroids'] + [str(count) for count in asteroid_counts])
+
+
+def asteroid_placement(count=10000, safe_radius=100, seed=1):
+    """Poisson-disk placement of `count` asteroids against the old one-at-a-time rejection loop"""
+    import random
+    import time
+    import numpy as np
+    from . import placement, util, world
+
+    center = (world.width / 2, world.height / 2)
+    exclude = [(center[0], center[1], safe_radius)]
+    start = time.perf_counter()
+    points = placement.positions(count, exclude=exclude, seed=seed)
+    elapsed = time.perf_counter() - start
+    again = placement.positions(count, exclude=exclude, seed=seed)
+
+    random.seed(seed)
+    start = time.perf_counter()
+    rejected = []
+    for i in range(count):
+        x, y = center
+        while util.distance((x, y), center) < safe_radius:
+            x = random.randint(0, world.width)
+            y = random.randint(0, world.height)
+        rejected.append((x, y))
+    rejection_time = time.perf_counter() - start
+    rejected = np.array(rejected, dtype=np.float64)
+
+    spacing = placement.default_spacing(count, world.width, world.height, exclude)
+    closest_to_player = np.hypot(points[:, 0] - center[0], points[:, 1] - center[1]).min()
+    print("Poisson-disk:      %8.1f ms for %d, min spacing %.2f (asked %.2f)"
+          % (elapsed * 1000, count, placement.minimum_distance(points), spacing))
+    print("Rejection loop:    %8.1f ms for %d, min spacing %.2f"
+          % (rejection_time * 1000, count, placement.minimum_distance(rejected)))
+    print("Closest to player: %8.1f" % closest_to_player)
+    assert len(points) == count
+    assert (points == again).all(), "placement is not deterministic for a seed"
+    assert closest_to_player >= safe_radius, "asteroid placed inside the player's safe zone"
+    assert placement.minimum_distance(points) >= spacing * (1 - 1e-9), "asteroids closer than the spacing"
+
+
+def spatial_queries(count=10000, queries=500, kinds=3, seed=1, checked=50):
+    """Batched k-d tree queries over `count` objects, checked against the brute-force scans"""
+    import time
+    import numpy as np
+    from . import spatial, world
+
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(0, world.width, count)
+    y = rng.uniform(0, world.height, count)
+    radius = rng.uniform(5, 40, count)
+    kind = rng.integers(0, kinds, count)
+    query_x = rng.uniform(0, world.width, queries)
+    query_y = rng.uniform(0, world.height, queries)
+    reach = rng.uniform(10, 100, queries)
+    angle = rng.uniform(0, 2 * np.pi, queries)
+    direction_x, direction_y = np.cos(angle), np.sin(angle)
+    length = np.full(queries, 400.0)
+
+    index = spatial.SpatialIndex()
+    timings = []
+
+    def timed(name, function, *args):
+        start = time.perf_counter()
+        result = function(*args)
+        timings.append((name, time.perf_counter() - start))
+        return result
+
+    timed("rebuild", index.load, x, y, radius, kind)
+    timed("refit", index.refit, x + 1.0, y, radius)
+    within = timed("within", index.within, query_x, query_y, reach, [0])
+    nearest = timed("nearest k=4", index.nearest, query_x, query_y, 4)
+    ray = timed("ray", index.ray, query_x, query_y, direction_x, direction_y, length, [1, 2])
+    for name, elapsed in timings:
+        print("%-18s %8.2f ms (%d objects, %d queries)" % (name + ":", elapsed * 1000, count, queries))
+
+    # The scans are slow; check the first `checked` queries against them
+    x = x + 1.0
+    part = slice(0, checked)
+    kept = within[0] < checked
+    reference = spatial.brute_within(x, y, kind == 0, query_x[part], query_y[part], reach[part])
+    assert (within[0][kept] == reference[0]).all() and (within[1][kept] == reference[1]).all(), \
+        "radius query differs from the scan"
+    reference = spatial.brute_nearest(x, y, np.ones(count, dtype=bool), query_x[part], query_y[part], 4)
+    assert (nearest[0][part] == reference[0]).all() and (nearest[1][part] == reference[1]).all(), \
+        "nearest-neighbour query differs from the scan"
+    reference = spatial.brute_ray(x, y, radius, kind != 0, query_x[part], query_y[part],
+                                  direction_x[part], direction_y[part], length[part])
+    assert (ray[0][part] == reference[0]).all() and (ray[1][part] == reference[1]).all(), \
+        "ray query differs from the scan"
+    print("Matches the brute-force scans on %d queries" % checked)
+
+
+def sprite_array(count=10000, frames=120, seed=1, frame_budget=1 / 60.0):
+    """Per-frame vertex cost of `count` rotating asteroids in one SpriteArray, against per-sprite vertices"""
+    import time
+    import numpy as np
+    from . import headless
+    headless.install()
+    from . import resources, spritearray, world
+
+    batch = sys.modules['pyglet'].graphics.Batch()
+    image = resources.asteroid_image
+    sprites = spritearray.SpriteArray(spritearray.Atlas([image]), count, batch=batch)
+    rng = np.random.default_rng(seed)
+    sprites.set(rng.uniform(0, world.width, count), rng.uniform(0, world.height, count),
+                rng.uniform(0, 360, count), rng.choice([1.0, 0.5, 0.25], count))
+    spin = rng.uniform(-50, 50, count)
+
+    dt = 1 / 60.0
+    for i in range(frames):
+        sprites.rotation[:count] += spin * dt
+        sprites.upload()
+
+    # Same corners as pyglet's Sprite would compute, one sprite at a time
+    start = time.perf_counter()
+    expected = [spritearray.sprite_vertices(x, y, rotation, scale, image)
+                for x, y, rotation, scale in zip(sprites.x.tolist(), sprites.y.tolist(),
+                                                  sprites.rotation.tolist(), sprites.scale.tolist())]
+    per_sprite = time.perf_counter() - start
+    uploaded = np.ctypeslib.as_array(sprites.vertex_list.vertices).reshape(count, 8)
+    error = np.abs(uploaded - np.array(expected, dtype=np.float32)).max()
+
+    upload = sprites.upload_costs.summary()
+    print("Vertex upload:     %8.3f ms per frame (p99 %.3f ms) for %d sprites"
+          % (upload['mean'] * 1000, upload['p99'] * 1000, count))
+    print("Per-sprite Python: %8.3f ms per frame" % (per_sprite * 1000))
+    print("Largest difference %8.5f pixels" % error)
+    assert error < 0.01, "SpriteArray corners differ from pyglet's"
+    assert upload['mean'] < frame_budget, "vertex upload alone doesn't fit in a frame"
+
+
+def trace_overhead(ticks=2000, num_asteroids=50):
+    """Tick time with tracing off and on, and a check that the exported trace nests properly"""
+    import json
+    import os
+    import tempfile
+    import time
+    clock, game = load_game()
+    game['init'](num_asteroids)
+    # Nothing moves, so both runs do the same work
+    for obj in game['game_objects']:
+        obj.velocity_x = obj.velocity_y = 0.0
+    dt = 1 / 120.0
+
+    def run():
+        start = time.perf_counter()
+        for i in range(ticks):
+            clock.tick(dt)
+            game['update'](dt)
+            if i % 2:
+                game['on_draw']()
+        return (time.perf_counter() - start) / ticks
+
+    off = run()
+    game['set_tracing'](True)
+    on = run()
+    game['set_tracing'](False)
+    tracer = game['tracer']
+
+    handle, filename = tempfile.mkstemp(suffix='.json')
+    os.close(handle)
+    try:
+        count = tracer.export(filename)
+        with open(filename) as trace:
+            events = json.load(trace)['traceEvents']
+    finally:
+        os.remove(filename)
+    open_spans = []
+    for event in events:
+        if event['ph'] == 'B':
+            open_spans.append(event['name'])
+        else:
+            assert open_spans.pop() == event['name'], "trace events don't nest"
+
+    print("Tracing off:       %8.3f ms/tick" % (off * 1000))
+    print("Tracing on:        %8.3f ms/tick (%.1f events per tick, %d dropped)"
+          % (on * 1000, count / float(ticks), tracer.dropped))
+
+
+def metrics_scrape(ticks=2000, num_asteroids=50, scrapes_per_sec=20.0):
+    """Tick time while a client scrapes the metrics endpoint, against no metrics at all"""
+    import threading
+    import time
+    import urllib.request
+    from . import metrics
+    clock, game = load_game()
+    game['init'](num_asteroids)
+    for obj in game['game_objects']:
+        obj.velocity_x = obj.velocity_y = 0.0
+    dt = 1 / 120.0
+
+    def run():
+        start = time.perf_counter()
+        for i in range(ticks):
+            clock.tick(dt)
+            game['update'](dt)
+            if i % 2:
+                game['on_draw']()
+        return (time.perf_counter() - start) / ticks
+
+    off = run()
+    game_metrics = metrics.Metrics(lambda: game['game_objects'])
+    game['set_metrics'](game_metrics)
+    server = metrics.MetricsServer(game_metrics).start()
+    url = "http://%s:%d/metrics" % server.address
+    done = threading.Event()
+    pages = []
+
+    def scrape():
+        while not done.wait(1 / scrapes_per_sec):
+            pages.append(urllib.request.urlopen(url).read().decode('utf-8'))
+
+    scraper = threading.Thread(target=scrape)
+    scraper.start()
+    on = run()
+    done.set()
+    scraper.join()
+    pages.append(urllib.request.urlopen(url).read().decode('utf-8'))
+    server.stop()
+    game['set_metrics'](None)
+
+    print("Metrics off:       %8.3f ms/tick" % (off * 1000))
+    print("Metrics scraped:   %8.3f ms/tick (%d scrapes)" % (on * 1000, server.scrapes))
+    print("\n".join(line for line in pages[-1].splitlines() if not line.startswith('#')))
+    assert 'asteroid_tick_seconds_count %d' % ticks in pages[-1], "not every tick was counted"
+
+
+def profile_capture(ticks=2000, num_asteroids=50, calls=120):
+    """Tick time while watching for slow ticks, and a capture of update() and on_draw() to a .pstats file"""
+    import os
+    import pstats
+    import tempfile
+    import time
+    clock, game = load_game()
+    game['init'](num_asteroids)
+    for obj in game['game_objects']:
+        obj.velocity_x = obj.velocity_y = 0.0
+    dt = 1 / 120.0
+
+    def run(count):
+        start = time.perf_counter()
+        for i in range(count):
+            clock.tick(dt)
+            game['update'](dt)
+            if i % 2:
+                game['on_draw']()
+        return (time.perf_counter() - start) / count
+
+    profile_capture = game['profile_capture']
+    profile_capture.calls = calls
+    profile_capture.directory = directory = tempfile.mkdtemp()
+    off = run(ticks)
+    # Too high to trigger; only the timing is left
+    profile_capture.threshold = 1.0
+    game['set_capture_hook']()
+    watching = run(ticks)
+    profile_capture.threshold = None
+    game['request_capture']("benchmark")
+    capturing = run(calls)
+
+    try:
+        assert game['game_capture'] is None, "the capture didn't switch itself off"
+        filename, = profile_capture.files
+        functions = set(name for path, line, name in pstats.Stats(filename).stats)
+    finally:
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+
+    print("Capture off:       %8.3f ms/tick" % (off * 1000))
+    print("Slow tick watch:   %8.3f ms/tick" % (watching * 1000))
+    print("Capturing:         %8.3f ms/tick" % (capturing * 1000))
+    print("Wrote:             %s" % os.path.basename(filename))
+    assert 'update_game' in functions and 'draw_game' in functions, "update() and on_draw() missing from the profile"
+
+
+def parallel_collision(count=300000, size=100000, workers=4, repeats=3, seed=1):
+    """Collision pairs of a crowded world on one core and on a pool of workers; must be identical"""
+    import os
+    import time
+    import numpy as np
+    from . import collision, parallel
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(0, size, count)
+    y = rng.uniform(0, size, count)
+    radius = rng.choice([4.0, 8.0, 16.0, 32.0], count)
+
+    collider = parallel.ParallelCollider(workers, min_parallel=0)
+    try:
+        collider.pairs(x, y, radius)
+        serial = parallel_time = float('inf')
+        for i in range(repeats):
+            start = time.perf_counter()
+            expected = collision.candidate_pairs(x, y, radius)
+            serial = min(serial, time.perf_counter() - start)
+            start = time.perf_counter()
+            pairs = collider.pairs(x, y, radius)
+            parallel_time = min(parallel_time, time.perf_counter() - start)
+            assert np.array_equal(pairs, expected), "parallel pairs differ from candidate_pairs"
+    finally:
+        collider.close()
+
+    print("Objects:           %8d (%d pairs, %d cores)" % (count, len(expected), os.cpu_count() or 1))
+    print("One core:          %8.1f ms" % (serial * 1000))
+    print("%d workers:         %8.1f ms (%d strips)" % (workers, parallel_time * 1000, collider.strips))
+
+
+def level_transition(num_asteroids=2000, transitions=5):
+    """The most level-loading work done in one tick: building the whole level in
+    the tick it starts, against planning it ahead and spreading it over ticks"""
+    import time
+    clock, game = load_game()
+    levels = game['levels']
+
+    def worst_tick(loader, all_at_once):
+        game['level_loader'] = loader
+        game['init'](num_asteroids)
+        worst = 0.0
+        ticks = 0
+        for transition in range(transitions):
+            # A level lasts long enough for the next ones to be worked out
+            loader.wait()
+            start = time.perf_counter()
+            game['reset_level'](2)
+            if all_at_once:
+                game['game_objects'].extend(loader.finish(game['object_batch']))
+            worst = max(worst, time.perf_counter() - start)
+            while loader.pending:
+                start = time.perf_counter()
+                game['game_objects'].extend(loader.step(game['object_batch']))
+                worst = max(worst, time.perf_counter() - start)
+                ticks += 1
+            assert len(game['game_objects']) == num_asteroids + 1, "the level didn't come in whole"
+        loader.close()
+        return worst, ticks / float(transitions)
+
+    before, _ = worst_tick(levels.LevelLoader(spread=1, background=False), True)
+    after, ticks = worst_tick(levels.LevelLoader(), False)
+
+    print("Asteroids:         %8d" % num_asteroids)
+    print("All in one tick:   %8.2f ms worst tick" % (before * 1000))
+    print("Planned ahead:     %8.2f ms worst tick (spread over %.0f ticks)" % (after * 1000, ticks))
+    assert after < before, "spreading the level out made the worst tick worse"
+
+
+# Name -> benchmark function, in the order they run
+benchmarks = [
+    ('entity_memory', entity_memory),
+    ('fixed_physics', fixed_physics),
+    ('replay_write', replay_write),
+    ('frame_pacing', frame_pacing),
+    ('steady_state_allocations', steady_state_allocations),
+    ('version_loops', version_loops),
+    ('asteroid_placement', asteroid_placement),
+    ('spatial_queries', spatial_queries),
+    ('sprite_array', sprite_array),
+    ('trace_overhead', trace_overhead),
+    ('metrics_scrape', metrics_scrape),
+    ('profile_capture', profile_capture),
+    ('parallel_collision', parallel_collision),
+    ('level_transition', level_transition),
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the game benchmarks")
+    parser.add_argument('names', nargs='*', help="benchmarks to run (default: all)")
+    args = parser.parse_args(argv)
+
+    known = dict(benchmarks)
+    for name in args.names:
+        if name not in known:
+            parser.error("unknown benchmark %r, choose from: %s" % (name, ", ".join(known)))
+
+    for name, function in benchmarks:
+        if not args.names or name in args.names:
+            print("== %s" % name)
+            function()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+import math
+from pyglet import gl
+from . import world
+
+
+class Camera(object):
+    """Follows a target around the world and only lets nearby sprites into the batch"""
+
+    def __init__(self, window_width, window_height, batch, margin=100):
+        self.window_width = window_width
+        self.window_height = window_height
+        self.batch = batch
+
+        # Objects this far outside the view still get drawn, so they don't pop in
+        self.margin = margin
+
+        # Bottom left corner of the view, in world coordinates
+        self.x, self.y = 0, 0
+        self.target = None
+
+        # How many objects the last cull kept and dropped
+        self.visible = 0
+        self.culled = 0
+
+        # What the last cull left in the batch and took out of it, and the
+        # index's object list it sorted them from
+        self.attached = set()
+        self.detached = set()
+        self._indexed = None
+
+    def follow(self, target):
+        self.target = target
+
+    def update(self):
+        """Center the view on the target without leaving the world"""
+        if self.target is not None:
+            self.x = min(max(self.target.x - self.window_width / 2, 0),
+                         max(world.width - self.window_width, 0))
+            self.y = min(max(self.target.y - self.window_height / 2, 0),
+                         max(world.height - self.window_height, 0))
+
+    def can_see(self, x, y, radius=0):
+        reach = self.margin + radius
+        return (self.x - reach <= x <= self.x + self.window_width + reach and
+                self.y - reach <= y <= self.y + self.window_height + reach)
+
+    def view(self):
+        """(left, bottom, right, top) of what gets drawn, margin included, in world coordinates"""
+        return (self.x - self.margin, self.y - self.margin,
+                self.x + self.window_width + self.margin, self.y + self.window_height + self.margin)
+
+    def cull(self, index):
+        """Attach the objects near the view to the batch and detach the rest.
+
+        `index` is a spatial.SpatialIndex of the game objects as they are
+        now. Only what it finds near the view and what the last cull
+        attached is visited, so the cost follows what is on screen, not the
+        size of the world; the rest of the objects are only looked at when
+        the index's object list changes. Detached sprites give their
+        vertices back, and a ship takes its engine flame with it. Visibility
+        is left alone, so a ship hidden between lives stays hidden.
+        """
+        objects = index.objects
+        if objects is not self._indexed:
+            self._indexed = objects
+            present = set(objects)
+            self.attached &= present
+            self.detached &= present
+            for obj in present - self.attached - self.detached:
+                # New to the camera; the ones far away leave the batch below
+                if obj.batch is None:
+                    self.detached.add(obj)
+                else:
+                    self.attached.add(obj)
+
+        left, bottom, right, top = self.view()
+        inside = set()
+        if len(objects):
+            # Everything within reach of the view grown by the largest radius, then the exact test
+            grow = 2.0 * float(index.radius.max())
+            reach = 0.5 * math.hypot(right - left + grow, top - bottom + grow)
+            found = index.within((left + right) * 0.5, (bottom + top) * 0.5, reach)[1]
+            x, y, radius = index.x[found], index.y[found], index.radius[found]
+            near = (x + radius >= left) & (x - radius <= right) & (y + radius >= bottom) & (y - radius <= top)
+            inside.update(index.objects_of(found[near]))
+
+        for obj in self.attached - inside:
+            self._move(obj, None)
+        for obj in inside - self.attached:
+            self._move(obj, self.batch)
+        self.detached = (self.detached | self.attached) - inside
+        self.attached = inside
+
+        self.visible = len(inside)
+        self.culled = len(objects) - self.visible
+
+    @staticmethod
+    def _move(obj, batch):
+        obj.batch = batch
+        engine = getattr(obj, 'engine_sprite', None)
+        if engine is not None:
+            engine.batch = batch
+
+    def begin(self):
+        """Draw everything after this call from the camera's point of view"""
+        gl.glPushMatrix()
+        gl.glTranslatef(-int(self.x), -int(self.y), 0)
+
+    def end(self):
+        gl.glPopMatrix()
@@ -0,0 +1,134 @@
+"""Profile the next few ticks with cProfile when asked, or when one runs slow.
+
+A frame rate drop in the field usually can't be reproduced, so the game
+can profile itself when it happens. update() and on_draw() hand their
+work to a ProfileCapture's run() while it is watching. Once a capture is
+requested, the next `calls` of them run under cProfile; the stats go
+to a .pstats file whose name carries the time and the number of live
+objects of each class, and the profiler is switched off again.
+
+A capture can be requested from a hotkey (CaptureKeys), from a signal
+(install_signal, SIGUSR1 by default: `kill -USR1 <pid>`), or by the
+capture itself when a tick takes longer than `threshold` seconds. With no
+threshold the game only calls into it between a request and the end of
+the capture.
+
+    python -m pstats asteroid-profile-20261019-101500-Asteroid812-Bullet3-Player1.pstats
+"""
+import cProfile
+import os
+import signal
+import time
+from collections import Counter
+
+from pyglet.window import key
+
+default_prefix = 'asteroid-profile'
+
+
+class ProfileCapture(object):
+    """cProfile over the next `calls` calls, on request or after a slow tick"""
+
+    def __init__(self, objects=lambda: (), calls=240, threshold=None, directory='.',
+                 prefix=default_prefix, cooldown=30.0, clock=time.perf_counter):
+        # Returns the live game objects, counted into the file name
+        self.objects = objects
+        self.calls = calls
+        # Seconds a tick may take before a capture starts by itself (None: never)
+        self.threshold = threshold
+        self.directory = directory
+        self.prefix = prefix
+        # Seconds after a capture before a slow tick can start another one
+        self.cooldown = cooldown
+        self.clock = clock
+
+        self.profile = None
+        self.reason = None
+        self.counts = None
+        self.called = Counter()
+        self.files = []
+        # Called with the file name after each capture
+        self.on_finish = None
+
+        self._requested = None
+        self._quiet_until = 0.0
+
+    @property
+    def capturing(self):
+        return self.profile is not None
+
+    @property
+    def watching(self):
+        """Whether run() has anything to do"""
+        return self.profile is not None or self._requested is not None or self.threshold is not None
+
+    def request(self, reason="request"):
+        """Capture from the next call on. Only sets a flag, so a signal handler can call it."""
+        if self.profile is None:
+            self._requested = reason
+
+    def run(self, name, function, *args, timed=True):
+        """function(*args), under the profiler while capturing. A `timed` call
+        slower than the threshold starts a capture from the next call on."""
+        if self._requested is not None:
+            self._start()
+        profile = self.profile
+        if profile is not None:
+            result = profile.runcall(function, *args)
+            self.called[name] += 1
+            if self.called[name] >= self.calls:
+                self._finish()
+            return result
+        if not timed or self.threshold is None:
+            return function(*args)
+        started = self.clock()
+        result = function(*args)
+        now = self.clock()
+        if now - started > self.threshold and now >= self._quiet_until:
+            self.request("%s took %.1f ms" % (name, (now - started) * 1000))
+        return result
+
+    def _start(self):
+        self.reason, self._requested = self._requested, None
+        self.counts = Counter(type(obj).__name__ for obj in list(self.objects()))
+        self.called.clear()
+        self.profile = cProfile.Profile()
+
+    def _finish(self):
+        profile, self.profile = self.profile, None
+        filename = os.path.join(self.directory, self.filename(self.counts))
+        profile.dump_stats(filename)
+        self.files.append(filename)
+        self._quiet_until = self.clock() + self.cooldown
+        if self.on_finish is not None:
+            self.on_finish(filename)
+
+    def filename(self, counts):
+        tags = "".join("-%s%d" % (name, count) for name, count in sorted(counts.items()))
+        return "%s-%s%s.pstats" % (self.prefix, time.strftime('%Y%m%d-%H%M%S'), tags)
+
+    def report(self, filename):
+        calls = ", ".join("%d %s" % (count, name) for name, count in sorted(self.called.items()))
+        return "profile (%s): %s written to %s" % (self.reason, calls, filename)
+
+
+def install_signal(request, signal_number=getattr(signal, 'SIGUSR1', None)):
+    """Call request() when the process gets the signal; False where there is no such signal"""
+    if signal_number is None:
+        return False
+    signal.signal(signal_number, lambda number, frame: request())
+    return True
+
+
+class CaptureKeys(object):
+    """Window handler: a key asks for a capture"""
+
+    def __init__(self, request, capture_key=key.F11):
+        self.request = request
+        self.capture_key = capture_key
+
+    def on_key_press(self, symbol, modifiers):
+        if symbol == self.capture_key:
+            self.request()
+            return True
+        return False
@@ -0,0 +1,93 @@
+import numpy as np
+
+
+def radii(game_objects):
+    """Collision radius of each object, as used by PhysicalObject.collides_with"""
+    return np.fromiter((obj.image.width * 0.5 * obj.scale for obj in game_objects),
+                       dtype=np.float64, count=len(game_objects))
+
+
+def positions(game_objects):
+    count = len(game_objects)
+    x = np.fromiter((obj.x for obj in game_objects), dtype=np.float64, count=count)
+    y = np.fromiter((obj.y for obj in game_objects), dtype=np.float64, count=count)
+    return x, y
+
+
+def candidate_pairs(x, y, radius, cell_size=0.0):
+    """Index pairs (i, j), i < j, whose circles overlap, found with a uniform grid.
+
+    Every object goes in the one cell that holds its center. Cells are at
+    least as big as the largest diameter, so touching objects are always in
+    the same or neighbouring cells. The pairs come back sorted, in the same
+    order the nested all-pairs loop would visit them.
+    """
+    count = len(x)
+    if count < 2:
+        return np.zeros((0, 2), dtype=np.int64)
+    cell_size = max(cell_size, 2.0 * float(radius.max()), 1.0)
+
+    cell_x = np.floor(x / cell_size).astype(np.int64)
+    cell_y = np.floor(y / cell_size).astype(np.int64)
+    cell_y -= cell_y.min() - 1
+    stride = int(cell_y.max()) + 2
+    keys = cell_x * stride + cell_y
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+
+    found = []
+    # Own cell plus half of the neighbours, so each pair of cells is visited once
+    for offset_x, offset_y in ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1)):
+        # Looking up the neighbours in sorted order keeps searchsorted fast
+        neighbour = sorted_keys + (offset_x * stride + offset_y)
+        start = np.searchsorted(sorted_keys, neighbour, 'left')
+        end = np.searchsorted(sorted_keys, neighbour, 'right')
+        matches = end - start
+        total = int(matches.sum())
+        if not total:
+            continue
+        first = np.repeat(order, matches)
+        within = np.arange(total) - np.repeat(np.cumsum(matches) - matches, matches)
+        second = order[np.repeat(start, matches) + within]
+        if offset_x == 0 and offset_y == 0:
+            keep = first < second
+            first, second = first[keep], second[keep]
+        found.append(np.stack([np.minimum(first, second), np.maximum(first, second)], axis=1))
+
+    if not found:
+        return np.zeros((0, 2), dtype=np.int64)
+    pairs = np.concatenate(found)
+
+    # Keep only the pairs that really overlap
+    reach = radius[pairs[:, 0]] + radius[pairs[:, 1]]
+    distance = np.hypot(x[pairs[:, 0]] - x[pairs[:, 1]], y[pairs[:, 0]] - y[pairs[:, 1]])
+    pairs = pairs[distance <= reach * (1.0 + 1e-9)]
+    pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+    return pairs
+
+
+def collide(game_objects, cell_size=0.0, find_pairs=candidate_pairs, bus=None):
+    """The nested all-pairs loop, with a grid to skip far apart pairs.
+
+    `find_pairs` can replace candidate_pairs with something that gives the
+    same pairs, such as ParallelCollider.pairs. With an events.EventBus as
+    `bus`, the pairs whose collision killed something are posted to it.
+    Returns (pairs tested, pairs that collided).
+    """
+    x, y = positions(game_objects)
+    pairs = find_pairs(x, y, radii(game_objects), cell_size)
+    hits = 0
+    for i, j in pairs.tolist():
+        obj_1 = game_objects[i]
+        obj_2 = game_objects[j]
+
+        # Make sure the objects haven't already been killed
+        if not obj_1.dead and not obj_2.dead:
+            if obj_1.collides_with(obj_2):
+                obj_1.handle_collision_with(obj_2)
+                obj_2.handle_collision_with(obj_1)
+                hits += 1
+                # Overlaps that change nothing (asteroid on asteroid) aren't events
+                if bus is not None and (obj_1.dead or obj_2.dead):
+                    bus.collision(obj_1, obj_2)
+    return len(pairs), hits
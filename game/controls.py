@@ -0,0 +1,203 @@
+"""Turns every kind of input into one action byte per ship per tick.
+
+Controls.actions is a bytearray indexed by ship. Each tick, update()
+clears it and lets every source OR in its bits:
+
+* KeyboardSource: a window event handler, pushed once for the whole game;
+* ReplaySource: actions read back from a replay file (see record());
+* NetworkSource: (tick, ship, bits) datagrams from a UDP socket;
+* PilotSource: the choices of game.pilot's computer pilots.
+
+A ship then reads one byte, `controls.actions[ship_index]`. LEFT, RIGHT
+and UP are held for as long as the bits are set; FIRE means "fire on this
+tick", so holding it down still only fires once per press.
+"""
+import socket
+import struct
+
+import numpy as np
+from pyglet.window import key
+
+from . import replay
+
+LEFT, RIGHT, UP, FIRE = 1, 2, 4, 8
+
+# Replay records with this kind hold one ship's actions for one tick
+INPUT_RECORD = 0xff00
+
+packet = struct.Struct('<IHB')
+
+
+class Controls(object):
+    """The per-ship action array, and the sources that fill it"""
+
+    def __init__(self, ships=1):
+        self.actions = bytearray(ships)
+        # As many zero bytes as there are ships, to clear the actions with
+        self._zeros = bytes(ships)
+        self.sources = []
+        self.tick = 0
+
+    def ensure(self, ships):
+        """Make room for at least this many ships"""
+        if len(self.actions) < ships:
+            self.actions.extend(bytes(ships - len(self.actions)))
+            self._zeros = bytes(ships)
+
+    def add_source(self, source):
+        self.sources.append(source)
+        return source
+
+    def remove_source(self, source):
+        self.sources.remove(source)
+
+    def update(self):
+        """Gather this tick's actions from every source"""
+        actions = self.actions
+        actions[:] = self._zeros
+        for source in self.sources:
+            source.fill(actions, self.tick)
+        self.tick += 1
+        return actions
+
+
+class KeyboardSource(object):
+    """Arrow keys and space for one ship. Push it onto the window once."""
+
+    bindings = {key.LEFT: LEFT, key.RIGHT: RIGHT, key.UP: UP}
+
+    def __init__(self, ship=0):
+        self.ship = ship
+        self.held = 0
+        self.fire = False
+
+    def on_key_press(self, symbol, modifiers):
+        if symbol == key.SPACE:
+            self.fire = True
+        else:
+            self.held |= self.bindings.get(symbol, 0)
+
+    def on_key_release(self, symbol, modifiers):
+        self.held &= ~self.bindings.get(symbol, 0)
+
+    def fill(self, actions, tick):
+        if self.ship < len(actions):
+            actions[self.ship] |= self.held | (FIRE if self.fire else 0)
+            self.fire = False
+
+
+def record(writer, tick, actions):
+    """Write the non-empty actions of one tick to a ReplayWriter"""
+    write = writer.write
+    for ship, bits in enumerate(actions):
+        if bits:
+            write(tick, INPUT_RECORD, ship, bits, 0.0, 0.0, 0.0)
+
+
+class ReplaySource(object):
+    """Plays back actions stored with record()"""
+
+    def __init__(self, filename):
+        self.records = (values for values in replay.read(filename) if values[1] == INPUT_RECORD)
+        self.pending = next(self.records, None)
+
+    def fill(self, actions, tick):
+        pending = self.pending
+        while pending is not None and pending[0] <= tick:
+            ship = pending[2]
+            if pending[0] == tick and ship < len(actions):
+                actions[ship] |= int(pending[3])
+            pending = next(self.records, None)
+        self.pending = pending
+
+
+class NetworkSource(object):
+    """Actions from UDP datagrams, each one a `packet` of (tick, ship, bits).
+
+    The newest packet for each ship is held until a newer one arrives, so a
+    late or lost packet repeats the last known input. Ticks are only used
+    to throw away packets that arrive out of order.
+    """
+
+    def __init__(self, address=('127.0.0.1', 0), ships=()):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(address)
+        self.socket.setblocking(False)
+        self.address = self.socket.getsockname()
+
+        # Only these ships may be driven from the network (all of them if empty)
+        self.ships = frozenset(ships)
+        self.latest = {}
+        self.received = 0
+        self.rejected = 0
+
+    def fill(self, actions, tick):
+        latest = self.latest
+        while True:
+            try:
+                data = self.socket.recv(64)
+            except (BlockingIOError, InterruptedError):
+                break
+            if len(data) != packet.size:
+                self.rejected += 1
+                continue
+            sent_tick, ship, bits = packet.unpack(data)
+            if (self.ships and ship not in self.ships) or sent_tick < latest.get(ship, (-1, 0))[0]:
+                self.rejected += 1
+                continue
+            latest[ship] = (sent_tick, bits)
+            self.received += 1
+
+        for ship, (sent_tick, bits) in latest.items():
+            if ship < len(actions):
+                actions[ship] |= bits
+                # A fire press counts once, however long the packet is repeated
+                if bits & FIRE:
+                    latest[ship] = (sent_tick, bits & ~FIRE)
+
+    def close(self):
+        self.socket.close()
+
+
+def send(sock, address, tick, ship, bits):
+    """Send one ship's actions to a NetworkSource"""
+    sock.sendto(packet.pack(tick, ship, bits), address)
+
+
+def action_bits(left, right, up, fire):
+    """Boolean arrays, one entry per ship, as action bytes"""
+    bits = left.astype(np.uint8) * LEFT
+    bits |= right.astype(np.uint8) * RIGHT
+    bits |= up.astype(np.uint8) * UP
+    bits |= fire.astype(np.uint8) * FIRE
+    return bits
+
+
+class PilotSource(object):
+    """Lets game.pilot fly a run of ships, `first` onwards
+
+    `ships` and `targets` are callables returning the ships to fly and the
+    asteroids to shoot at. The n-th ship returned has index first + n.
+    `targets` can be None for pilots that look their targets up in an index.
+    """
+
+    def __init__(self, pilots, ships, targets, first=0, dt=1 / 120.0):
+        self.pilots = pilots
+        self.ships = ships
+        self.targets = targets
+        self.first = first
+        self.dt = dt
+        self.shots = 0
+
+    def fill(self, actions, tick):
+        ships = self.ships()
+        if not ships:
+            return
+        targets = self.targets() if self.targets is not None else None
+        bits = action_bits(*self.pilots.decide(ships, targets, self.dt))
+        self.shots += int(np.count_nonzero(bits & FIRE))
+        stop = min(self.first + len(bits), len(actions))
+        view = np.frombuffer(actions, dtype=np.uint8)
+        view[self.first:stop] |= bits[:stop - self.first]
+        # Let go of the view so the bytearray can still grow
+        del view
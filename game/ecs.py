@@ -0,0 +1,288 @@
+"""Entity-component storage for the game objects.
+
+Entities with the same set of components share an Archetype: a table with
+one NumPy structured array per component, one row per entity. Systems ask
+the Registry for the tables that have the components they need and work on
+whole columns at once.
+"""
+import numpy as np
+
+from . import collision
+
+# Component name -> fields, in NumPy dtype form
+components = {
+    # `margin` is half the image size, used to wrap around the world edges
+    'transform': [('x', 'f8'), ('y', 'f8'), ('rotation', 'f8'), ('scale', 'f8'), ('margin', 'f8')],
+    'velocity': [('x', 'f8'), ('y', 'f8')],
+    'spin': [('speed', 'f8')],
+    'lifetime': [('remaining', 'f8')],
+    # `radius` is unscaled, like image.width / 2 in PhysicalObject.collides_with
+    'collider': [('radius', 'f8'), ('kind', 'i1'), ('reacts_to_bullets', '?'), ('is_bullet', '?')],
+    'renderable': [('image', 'i2'), ('visible', '?')],
+    'input': [('left', '?'), ('right', '?'), ('thrust', '?'), ('fire', '?'),
+              ('thrust_power', 'f8'), ('rotate_speed', 'f8'), ('bullet_speed', 'f8')],
+}
+
+# Collider kinds, standing in for the classes of the sprite-based objects
+ASTEROID, BULLET, PLAYER = 0, 1, 2
+
+# Unscaled collider radii: half the width of bullet.png and asteroid.png
+default_bullet_radius = 5.0
+default_asteroid_radius = 40.0
+
+# The archetypes the game uses
+asteroid_archetype = ('transform', 'velocity', 'spin', 'collider', 'renderable')
+bullet_archetype = ('transform', 'velocity', 'lifetime', 'collider', 'renderable')
+player_archetype = ('transform', 'velocity', 'collider', 'renderable', 'input')
+
+
+class Archetype(object):
+    """Columnar table of every entity that has exactly these components"""
+
+    def __init__(self, component_names, capacity=64):
+        self.component_names = tuple(sorted(component_names))
+        self.count = 0
+        self.capacity = capacity
+        self.entity = np.zeros(capacity, dtype=np.int64)
+        self.dead = np.zeros(capacity, dtype=bool)
+        self.columns = dict((name, np.zeros(capacity, dtype=components[name]))
+                            for name in self.component_names)
+
+    def __contains__(self, component_name):
+        return component_name in self.columns
+
+    def view(self, component_name):
+        """The live rows of one component column"""
+        return self.columns[component_name][:self.count]
+
+    def _grow(self, needed):
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        if capacity == self.capacity:
+            return
+        self.entity = np.resize(self.entity, capacity)
+        self.dead = np.resize(self.dead, capacity)
+        for name in self.component_names:
+            column = np.zeros(capacity, dtype=components[name])
+            column[:self.count] = self.columns[name][:self.count]
+            self.columns[name] = column
+        self.capacity = capacity
+
+    def append(self, entity_ids, values):
+        """Add rows; `values` maps component name -> {field: scalar or array}"""
+        start = self.count
+        end = start + len(entity_ids)
+        self._grow(end)
+        self.entity[start:end] = entity_ids
+        self.dead[start:end] = False
+        for name in self.component_names:
+            self.columns[name][start:end] = np.zeros(1, dtype=components[name])
+            for field, value in values.get(name, {}).items():
+                self.columns[name][field][start:end] = value
+        self.count = end
+        return start, end
+
+    def compact(self):
+        """Drop the rows marked dead, keeping the order of the others"""
+        dead = self.dead[:self.count]
+        if not dead.any():
+            return 0
+        keep = np.flatnonzero(~dead)
+        removed = self.count - len(keep)
+        self.entity[:len(keep)] = self.entity[keep]
+        for name in self.component_names:
+            self.columns[name][:len(keep)] = self.columns[name][keep]
+        self.count = len(keep)
+        self.dead[:self.count] = False
+        return removed
+
+
+class Registry(object):
+    """All archetype tables, plus entity id bookkeeping"""
+
+    def __init__(self):
+        self.archetypes = {}
+        self.next_entity = 0
+
+    def archetype(self, component_names):
+        key = tuple(sorted(component_names))
+        if key not in self.archetypes:
+            self.archetypes[key] = Archetype(key)
+        return self.archetypes[key]
+
+    def spawn(self, component_names, count, **values):
+        """Create `count` entities at once. Returns their entity ids."""
+        table = self.archetype(component_names)
+        entity_ids = np.arange(self.next_entity, self.next_entity + count)
+        self.next_entity += count
+        table.append(entity_ids, values)
+        return entity_ids
+
+    def query(self, *component_names):
+        """Tables that have all of these components and at least one row"""
+        return [table for table in self.archetypes.values()
+                if table.count and all(name in table for name in component_names)]
+
+    def flush(self):
+        """Remove every entity killed during the tick"""
+        return sum(table.compact() for table in self.archetypes.values())
+
+    def count(self, *component_names):
+        return sum(table.count for table in self.query(*component_names))
+
+
+def movement_system(registry, dt, world_width, world_height):
+    """Port of PhysicalObject.update: move by velocity and wrap around the world"""
+    for table in registry.query('transform', 'velocity'):
+        transform = table.view('transform')
+        velocity = table.view('velocity')
+        transform['x'] += velocity['x'] * dt
+        transform['y'] += velocity['y'] * dt
+
+        margin = transform['margin']
+        for axis, size in (('x', world_width), ('y', world_height)):
+            position = transform[axis]
+            position[:] = np.where(position < -margin, size + margin, position)
+            position[:] = np.where(position > size + margin, -margin, position)
+
+
+def spin_system(registry, dt):
+    """Port of Asteroid.update: keep rotating"""
+    for table in registry.query('transform', 'spin'):
+        table.view('transform')['rotation'] += table.view('spin')['speed'] * dt
+
+
+def lifetime_system(registry, dt):
+    """Port of Bullet's scheduled die(): kill entities whose time ran out"""
+    for table in registry.query('lifetime'):
+        lifetime = table.view('lifetime')
+        lifetime['remaining'] -= dt
+        table.dead[:table.count] |= lifetime['remaining'] <= 0.0
+
+
+def input_system(registry, dt, bullet_radius=default_bullet_radius, bullet_life=0.5):
+    """Port of Player.update and Player.fire, for every controlled entity at once"""
+    fired = []
+    for table in registry.query('transform', 'velocity', 'input', 'collider'):
+        transform = table.view('transform')
+        velocity = table.view('velocity')
+        controls = table.view('input')
+        alive = ~table.dead[:table.count]
+
+        turn = controls['rotate_speed'] * dt
+        transform['rotation'] += np.where(controls['right'], turn, 0.0) - np.where(controls['left'], turn, 0.0)
+
+        # Note: rotation is in "negative degrees", like pyglet's
+        angle = -np.radians(transform['rotation'])
+        cos, sin = np.cos(angle), np.sin(angle)
+        thrust = np.where(controls['thrust'] & alive, controls['thrust_power'] * dt, 0.0)
+        velocity['x'] += cos * thrust
+        velocity['y'] += sin * thrust
+
+        shooters = np.flatnonzero(controls['fire'] & alive)
+        controls['fire'] = False
+        if len(shooters):
+            ship_radius = table.view('collider')['radius'][shooters]
+            speed = controls['bullet_speed'][shooters]
+            fired.append((transform['x'][shooters] + cos[shooters] * ship_radius,
+                          transform['y'][shooters] + sin[shooters] * ship_radius,
+                          velocity['x'][shooters] + cos[shooters] * speed,
+                          velocity['y'][shooters] + sin[shooters] * speed))
+
+    for x, y, velocity_x, velocity_y in fired:
+        spawn_bullets(registry, x, y, velocity_x, velocity_y, bullet_radius, bullet_life)
+    return sum(len(shot[0]) for shot in fired)
+
+
+def spawn_bullets(registry, x, y, velocity_x, velocity_y, radius=default_bullet_radius, life=0.5):
+    return registry.spawn(bullet_archetype, len(x),
+                          transform={'x': x, 'y': y, 'scale': 1.0, 'margin': radius},
+                          velocity={'x': velocity_x, 'y': velocity_y},
+                          lifetime={'remaining': life},
+                          collider={'radius': radius, 'kind': BULLET, 'is_bullet': True,
+                                    'reacts_to_bullets': True},
+                          renderable={'image': BULLET, 'visible': True})
+
+
+def spawn_asteroids(registry, x, y, velocity_x, velocity_y, rotation, rotate_speed,
+                    scale=1.0, radius=default_asteroid_radius):
+    return registry.spawn(asteroid_archetype, len(x),
+                          transform={'x': x, 'y': y, 'rotation': rotation, 'scale': scale,
+                                     'margin': radius},
+                          velocity={'x': velocity_x, 'y': velocity_y},
+                          spin={'speed': rotate_speed},
+                          collider={'radius': radius, 'kind': ASTEROID, 'reacts_to_bullets': True},
+                          renderable={'image': ASTEROID, 'visible': True})
+
+
+def collision_pairs(registry):
+    """Port of the all-pairs test in PhysicalObject.collides_with, on the
+    collision grid (collision.candidate_pairs) instead of every pair.
+
+    Returns the colliding (table, row) pairs in the same order the nested
+    loop over game_objects would visit them.
+    """
+    tables = registry.query('transform', 'collider')
+    if not tables:
+        return []
+    rows = [(table, row) for table in tables for row in range(table.count)]
+    transform = np.concatenate([table.view('transform') for table in tables])
+    collider = np.concatenate([table.view('collider') for table in tables])
+    dead = np.concatenate([table.dead[:table.count] for table in tables])
+
+    reach = collider['radius'] * transform['scale']
+    pairs = collision.candidate_pairs(transform['x'], transform['y'], reach)
+    first, second = pairs[:, 0], pairs[:, 1]
+
+    # Ignore bullet collisions for objects that don't react to them
+    ignores = ~collider['reacts_to_bullets']
+    bullets = collider['is_bullet']
+    keep = ~(ignores[first] & bullets[second])
+    keep &= ~(bullets[first] & ignores[second])
+    keep &= ~(dead[first] | dead[second])
+
+    first, second = first[keep], second[keep]
+    return [(rows[i], rows[j]) for i, j in zip(first.tolist(), second.tolist())]
+
+
+def collision_system(registry, rng, min_split_scale=0.25):
+    """Port of handle_collision_with for every class: kill, and split asteroids"""
+    deaths = 0
+    splits = []
+    for (table_1, row_1), (table_2, row_2) in collision_pairs(registry):
+        # Make sure the objects haven't already been killed
+        if table_1.dead[row_1] or table_2.dead[row_2]:
+            continue
+        kind_1 = table_1.view('collider')['kind'][row_1]
+        kind_2 = table_2.view('collider')['kind'][row_2]
+        if kind_1 == kind_2:
+            continue
+        for table, row, kind in ((table_1, row_1, kind_1), (table_2, row_2, kind_2)):
+            table.dead[row] = True
+            deaths += 1
+            scale = table.view('transform')['scale'][row]
+            if kind == ASTEROID and scale > min_split_scale:
+                splits.append((table, row))
+
+    for table, row in splits:
+        transform = table.view('transform')[row]
+        velocity = table.view('velocity')[row]
+        count = int(rng.integers(2, 4))
+        spawn_asteroids(registry,
+                        np.full(count, transform['x']), np.full(count, transform['y']),
+                        rng.random(count) * 70 + velocity['x'], rng.random(count) * 70 + velocity['y'],
+                        rng.integers(0, 361, count), rng.uniform(-50.0, 50.0, count),
+                        scale=transform['scale'] * 0.5, radius=table.view('collider')['radius'][row])
+    return deaths, len(splits)
+
+
+def step(registry, dt, rng, world_width=800, world_height=600):
+    """One tick in the same order as the game's update(): collide, move, then clean up"""
+    deaths, splits = collision_system(registry, rng)
+    movement_system(registry, dt, world_width, world_height)
+    spin_system(registry, dt)
+    input_system(registry, dt)
+    lifetime_system(registry, dt)
+    registry.flush()
+    return deaths, splits
@@ -0,0 +1,154 @@
+import math
+from . import spawn, world
+from .ecs import ASTEROID, BULLET, PLAYER
+
+
+class Entity(object):
+    """Simulation state of one game object, without the Sprite machinery.
+
+    The rules match PhysicalObject, Asteroid, Bullet and Player. A Sprite is
+    only attached with bind() while the entity needs to be drawn, and
+    sync() copies the state into it once per frame.
+    """
+
+    __slots__ = ('kind', 'x', 'y', 'rotation', 'scale', 'velocity_x', 'velocity_y',
+                 'rotate_speed', 'radius', 'ttl', 'dead', 'sprite')
+
+    def __init__(self, kind, x=0.0, y=0.0, rotation=0.0, scale=1.0,
+                 velocity_x=0.0, velocity_y=0.0, rotate_speed=0.0, radius=0.0, ttl=-1.0):
+        self.kind = kind
+        self.x = x
+        self.y = y
+        self.rotation = rotation
+        self.scale = scale
+        self.velocity_x = velocity_x
+        self.velocity_y = velocity_y
+        self.rotate_speed = rotate_speed
+
+        # Half the (unscaled) image width, used for collisions and wrapping
+        self.radius = radius
+
+        # Seconds left to live; negative means forever
+        self.ttl = ttl
+        self.dead = False
+        self.sprite = None
+
+    def update(self, dt):
+        """Move, spin and age the entity by one time step"""
+        self.x += self.velocity_x * dt
+        self.y += self.velocity_y * dt
+        self.check_bounds()
+
+        if self.rotate_speed:
+            self.rotation += self.rotate_speed * dt
+
+        if self.ttl >= 0.0:
+            self.ttl -= dt
+            if self.ttl <= 0.0:
+                self.dead = True
+
+    def check_bounds(self):
+        """Use the classic Asteroids screen wrapping behavior, around the whole world"""
+        min_x = min_y = -self.radius
+        max_x = world.width + self.radius
+        max_y = world.height + self.radius
+        if self.x < min_x:
+            self.x = max_x
+        if self.y < min_y:
+            self.y = max_y
+        if self.x > max_x:
+            self.x = min_x
+        if self.y > max_y:
+            self.y = min_y
+
+    def collides_with(self, other):
+        """Determine if this entity collides with another"""
+
+        # The player ignores its own bullets
+        if self.kind == PLAYER and other.kind == BULLET:
+            return False
+        if self.kind == BULLET and other.kind == PLAYER:
+            return False
+
+        collision_distance = self.radius * self.scale + other.radius * other.scale
+        dx = self.x - other.x
+        dy = self.y - other.y
+        return dx * dx + dy * dy <= collision_distance * collision_distance
+
+    def handle_collision_with(self, other):
+        """Die when hitting a different kind of entity (asteroid.Breakup splits asteroids)"""
+        if other.kind != self.kind:
+            self.dead = True
+
+    def steer(self, dt, left, right, thrust, rotate_speed=200.0, thrust_power=300.0):
+        """Player controls, as in Player.update"""
+        if left:
+            self.rotation -= rotate_speed * dt
+        if right:
+            self.rotation += rotate_speed * dt
+        if thrust:
+            # Note: rotation is in "negative degrees", like pyglet's
+            angle_radians = -math.radians(self.rotation)
+            self.velocity_x += math.cos(angle_radians) * thrust_power * dt
+            self.velocity_y += math.sin(angle_radians) * thrust_power * dt
+
+    def fire(self, bullet_speed=700.0, bullet_radius=5.0):
+        """Return a new bullet just in front of this entity, as in Player.fire"""
+        angle_radians = -math.radians(self.rotation)
+        cos, sin = math.cos(angle_radians), math.sin(angle_radians)
+        return Entity(BULLET, self.x + cos * self.radius, self.y + sin * self.radius,
+                      velocity_x=self.velocity_x + cos * bullet_speed,
+                      velocity_y=self.velocity_y + sin * bullet_speed,
+                      radius=bullet_radius, ttl=0.5)
+
+    def bind(self, batch=None):
+        """Attach a Sprite so the entity can be drawn"""
+        if self.sprite is None:
+            import pyglet
+            from . import resources
+            image = {ASTEROID: resources.asteroid_image,
+                     BULLET: resources.bullet_image,
+                     PLAYER: resources.player_image}[self.kind]
+            self.sprite = pyglet.sprite.Sprite(image, x=self.x, y=self.y, batch=batch)
+            self.sync()
+        return self.sprite
+
+    def unbind(self):
+        """Drop the Sprite once the entity no longer needs drawing"""
+        if self.sprite is not None:
+            self.sprite.delete()
+            self.sprite = None
+
+    def sync(self):
+        """Copy the state into the Sprite, computing its vertices once"""
+        if self.sprite is not None:
+            self.sprite.update(x=self.x, y=self.y, rotation=self.rotation, scale=self.scale)
+
+
+class Asteroid(Entity):
+    """An asteroid record, built with the same arguments as game.asteroid.Asteroid
+    so spawn.build() and asteroid.Breakup can make them from a Prefab"""
+
+    __slots__ = ()
+
+    def __init__(self, x=0.0, y=0.0, batch=None, rotation=0.0, scale=1.0,
+                 velocity_x=0.0, velocity_y=0.0, rotate_speed=0.0, radius=40.0):
+        super(Asteroid, self).__init__(ASTEROID, x, y, rotation=rotation, scale=scale,
+                                       velocity_x=velocity_x, velocity_y=velocity_y,
+                                       rotate_speed=rotate_speed, radius=radius)
+        if batch is not None:
+            self.bind(batch)
+
+
+# The records' counterparts of game.asteroid's big_asteroid and fragment prefabs
+big_asteroid = spawn.Prefab(Asteroid, speed=(0.0, 40.0))
+fragment = spawn.Prefab(Asteroid, speed=(0.0, 70.0))
+
+
+def asteroid(x, y, velocity_x, velocity_y, rotation=0.0, rotate_speed=0.0, scale=1.0, radius=40.0):
+    return Asteroid(x, y, rotation=rotation, scale=scale, velocity_x=velocity_x,
+                    velocity_y=velocity_y, rotate_speed=rotate_speed, radius=radius)
+
+
+def player(x, y, radius=25.0):
+    return Entity(PLAYER, x, y, radius=radius)
@@ -0,0 +1,124 @@
+"""Game events, collected during a tick and handed out once at its end.
+
+While a tick runs, the game only records what happened: which objects
+collided, which died (and where), which joined the game, how many shots
+were fired and how many points were scored. Each kind of event goes into
+its own flat lists, a list per field, kept from tick to tick.
+
+dispatch() then calls the subscribers once per kind, with the whole
+tick's lists: the particles, sounds, score, HUD and telemetry react to a
+tick's worth of events at a time, in a fixed order, and the collision
+loop itself has nothing to do but mark objects dead. Shots and points
+are only counted, so any number of them in one tick reach a subscriber
+as one call.
+
+Subscribers are objects with any of these methods, or functions given
+by name, the way pyglet's push_handlers takes event handlers:
+
+    on_collisions(first, second)    the objects of each pair whose collision killed something
+    on_deaths(objects, x, y, velocity_x, velocity_y)
+    on_spawns(objects)
+    on_shots(count)
+    on_score(points)
+
+Events a subscriber posts while the bus dispatches go out in the same
+dispatch if their kind comes later in that list, and in the next one
+otherwise.
+"""
+from array import array
+
+kinds = ('on_collisions', 'on_deaths', 'on_spawns', 'on_shots', 'on_score')
+
+# The bus objects post to from their own methods, such as Player.fire(); None without one
+bus = None
+
+
+class EventBus(object):
+    """One tick's events, a flat list per field, and who wants to hear about them"""
+
+    def __init__(self):
+        self.first = []
+        self.second = []
+
+        self.dead = []
+        self.dead_x = array('d')
+        self.dead_y = array('d')
+        self.dead_velocity_x = array('d')
+        self.dead_velocity_y = array('d')
+
+        self.spawned = []
+        self.shots = 0
+        self.points = 0
+
+        self._handlers = dict((kind, []) for kind in kinds)
+
+    def subscribe(self, *subscribers, **handlers):
+        """Add objects with on_... methods, and on_...=function handlers"""
+        for subscriber in subscribers:
+            for kind in kinds:
+                handler = getattr(subscriber, kind, None)
+                if handler is not None:
+                    self._handlers[kind].append(handler)
+        for kind, handler in handlers.items():
+            if kind not in self._handlers:
+                raise ValueError("unknown event %r, choose from: %s" % (kind, ", ".join(kinds)))
+            self._handlers[kind].append(handler)
+
+    def unsubscribe(self, subscriber):
+        """Remove every handler of `subscriber` (or the function itself)"""
+        for handlers in self._handlers.values():
+            handlers[:] = [handler for handler in handlers
+                           if handler != subscriber and getattr(handler, '__self__', None) is not subscriber]
+
+    def collision(self, obj_1, obj_2):
+        self.first.append(obj_1)
+        self.second.append(obj_2)
+
+    def death(self, obj):
+        self.dead.append(obj)
+        self.dead_x.append(obj.x)
+        self.dead_y.append(obj.y)
+        self.dead_velocity_x.append(obj.velocity_x)
+        self.dead_velocity_y.append(obj.velocity_y)
+
+    def spawn(self, objects):
+        self.spawned.extend(objects)
+
+    def shot(self):
+        self.shots += 1
+
+    def score(self, points):
+        self.points += points
+
+    def dispatch(self):
+        """Hand this tick's events to the subscribers and start over"""
+        handlers = self._handlers
+        if self.first:
+            for handler in handlers['on_collisions']:
+                handler(self.first, self.second)
+            del self.first[:]
+            del self.second[:]
+
+        if self.dead:
+            for handler in handlers['on_deaths']:
+                handler(self.dead, self.dead_x, self.dead_y, self.dead_velocity_x, self.dead_velocity_y)
+            del self.dead[:]
+            del self.dead_x[:]
+            del self.dead_y[:]
+            del self.dead_velocity_x[:]
+            del self.dead_velocity_y[:]
+
+        if self.spawned:
+            for handler in handlers['on_spawns']:
+                handler(self.spawned)
+            del self.spawned[:]
+
+        if self.shots:
+            shots, self.shots = self.shots, 0
+            for handler in handlers['on_shots']:
+                handler(shots)
+
+        if self.points:
+            points, self.points = self.points, 0
+            for handler in handlers['on_score']:
+                handler(points)
@@ -0,0 +1,334 @@
+"""Deterministic fixed-point physics, for lockstep multiplayer and replay checks.
+
+Everything here is integer maths, so a run gives bit-identical results on
+any CPU and Python build:
+
+* positions and velocities are Q16.16 fixed point (ONE == 1.0 pixel),
+  velocities in pixels per tick, and bodies wrap around the world once
+  they are half their size past an edge, as in check_bounds;
+* angles are binary angles, ANGLE_STEPS per turn, and sine/cosine come
+  from a table that is itself built with integer arithmetic only;
+* collisions compare squared integer distances;
+* randomness comes from a xorshift generator with integer state.
+
+The rules follow PhysicalObject, Asteroid, Bullet and Player, with time
+measured in ticks of 1/TICKS_PER_SECOND seconds.
+"""
+import hashlib
+import struct
+
+FRACTION_BITS = 16
+ONE = 1 << FRACTION_BITS
+
+TICKS_PER_SECOND = 120
+
+# Binary angles: a full turn is ANGLE_STEPS, the table has TABLE_SIZE entries
+ANGLE_STEPS = 1 << 24
+TABLE_BITS = 12
+TABLE_SIZE = 1 << TABLE_BITS
+_TABLE_SHIFT = 24 - TABLE_BITS
+
+# Controls, as bits of one integer per player per tick
+LEFT, RIGHT, UP, FIRE = 1, 2, 4, 8
+
+ASTEROID, BULLET, PLAYER = 0, 1, 2
+
+# Pi to 50 places, as an integer fraction
+_PI_DIGITS = 314159265358979323846264338327950288419716939937510
+_PI_SCALE = 10 ** 50
+
+
+def _build_sine_table():
+    """Sine in Q16.16 for every table step, from an integer Taylor series"""
+    scale = 1 << 96
+    pi = _PI_DIGITS * scale // _PI_SCALE
+    quarter = TABLE_SIZE // 4
+    table = [0] * TABLE_SIZE
+    for step in range(quarter + 1):
+        angle = 2 * pi * step // TABLE_SIZE
+        term = angle
+        total = angle
+        n = 1
+        while term:
+            term = -term * angle // scale * angle // scale // ((2 * n) * (2 * n + 1))
+            total += term
+            n += 1
+        value = (total * ONE + scale // 2) // scale
+        table[step] = value
+        table[TABLE_SIZE // 2 - step] = value
+        table[(TABLE_SIZE // 2 + step) % TABLE_SIZE] = -value
+        table[(TABLE_SIZE - step) % TABLE_SIZE] = -value
+    return table
+
+
+SINE = _build_sine_table()
+
+
+def sin(angle):
+    return SINE[(angle % ANGLE_STEPS) >> _TABLE_SHIFT]
+
+
+def cos(angle):
+    return SINE[((angle + ANGLE_STEPS // 4) % ANGLE_STEPS) >> _TABLE_SHIFT]
+
+
+def from_float(value):
+    """Only for setting things up; never use floats inside a simulation step"""
+    return int(round(value * ONE))
+
+
+def degrees_per_second(degrees):
+    """Angular speed in binary angle steps per tick"""
+    return int(degrees * ANGLE_STEPS // (360 * TICKS_PER_SECOND))
+
+
+def pixels_per_second(pixels):
+    return int(pixels * ONE // TICKS_PER_SECOND)
+
+
+class XorShift(object):
+    """32-bit xorshift generator: same numbers everywhere for the same seed"""
+
+    def __init__(self, seed=1):
+        self.state = (seed & 0xffffffff) or 0x9e3779b9
+
+    def next(self):
+        x = self.state
+        x ^= (x << 13) & 0xffffffff
+        x ^= x >> 17
+        x ^= (x << 5) & 0xffffffff
+        self.state = x
+        return x
+
+    def below(self, limit):
+        return self.next() % limit
+
+
+class Body(object):
+    """One game object in fixed point"""
+
+    __slots__ = ('kind', 'x', 'y', 'velocity_x', 'velocity_y', 'angle', 'spin',
+                 'radius', 'level', 'ttl', 'dead')
+
+    def __init__(self, kind, x, y, velocity_x=0, velocity_y=0, angle=0, spin=0,
+                 radius=0, level=0, ttl=-1):
+        self.kind = kind
+        self.x = x
+        self.y = y
+        self.velocity_x = velocity_x
+        self.velocity_y = velocity_y
+        self.angle = angle
+        self.spin = spin
+
+        # Collision radius at full size; each split level halves it
+        self.radius = radius
+        self.level = level
+
+        # Ticks left to live, or -1 for forever
+        self.ttl = ttl
+        self.dead = False
+
+
+class FixedSimulation(object):
+    """The asteroid game rules in integer maths"""
+
+    asteroid_radius = 40 * ONE
+    bullet_radius = 5 * ONE
+    player_radius = 25 * ONE
+
+    thrust = pixels_per_second(300) // TICKS_PER_SECOND
+    rotate_speed = degrees_per_second(200)
+    bullet_speed = pixels_per_second(700)
+    bullet_ticks = TICKS_PER_SECOND // 2
+
+    # Asteroids split while they are bigger than a quarter of the original size
+    max_split_level = 2
+
+    def __init__(self, world_width=800, world_height=600, seed=1):
+        self.width = world_width * ONE
+        self.height = world_height * ONE
+        self.random = XorShift(seed)
+        self.tick = 0
+        self.bodies = []
+        self.players = []
+        self.kills = 0
+        self.splits = 0
+        self._fire_held = []
+
+    def add_player(self, x, y):
+        ship = Body(PLAYER, x * ONE, y * ONE, radius=self.player_radius)
+        self.bodies.append(ship)
+        self.players.append(ship)
+        self._fire_held.append(False)
+        return ship
+
+    def respawn_player(self, index, x, y):
+        """Bring a dead player back at (x, y) pixels, standing still"""
+        ship = self.players[index]
+        ship.x, ship.y = x * ONE, y * ONE
+        ship.velocity_x = ship.velocity_y = 0
+        ship.angle = 0
+        if ship.dead:
+            ship.dead = False
+            self.bodies.append(ship)
+        return ship
+
+    def start_level(self, num_asteroids, x, y):
+        """Clear the field, every player back at (x, y) pixels, and fresh asteroids"""
+        self.bodies = []
+        for index, ship in enumerate(self.players):
+            ship.dead = True
+            self.respawn_player(index, x, y)
+        self.add_asteroids(num_asteroids, avoid=self.players[0] if self.players else None)
+
+    def add_asteroids(self, count, avoid=None, min_distance=100):
+        """Scatter asteroids at random, away from `avoid` (a Body)"""
+        min_distance *= ONE
+        for i in range(count):
+            while True:
+                x = self.random.below(self.width)
+                y = self.random.below(self.height)
+                if avoid is None:
+                    break
+                dx, dy = x - avoid.x, y - avoid.y
+                if dx * dx + dy * dy >= min_distance * min_distance:
+                    break
+            self.bodies.append(Body(ASTEROID, x, y,
+                                    velocity_x=self.random.below(pixels_per_second(40)),
+                                    velocity_y=self.random.below(pixels_per_second(40)),
+                                    angle=self.random.below(ANGLE_STEPS),
+                                    spin=self._random_spin(),
+                                    radius=self.asteroid_radius))
+
+    def _random_spin(self):
+        top = degrees_per_second(50)
+        return self.random.below(2 * top + 1) - top
+
+    def reach(self, body):
+        return body.radius >> body.level
+
+    def step(self, controls=()):
+        """Advance one tick. `controls` has one LEFT/RIGHT/UP/FIRE bitmask per player."""
+        self._collide()
+
+        new_bodies = []
+        for index, ship in enumerate(self.players):
+            held = controls[index] if index < len(controls) else 0
+            if ship.dead:
+                continue
+            if held & LEFT:
+                ship.angle += self.rotate_speed
+            if held & RIGHT:
+                ship.angle -= self.rotate_speed
+            if held & UP:
+                ship.velocity_x += cos(ship.angle) * self.thrust >> FRACTION_BITS
+                ship.velocity_y += sin(ship.angle) * self.thrust >> FRACTION_BITS
+            # Fire once per press, like on_key_press
+            fire = bool(held & FIRE)
+            if fire and not self._fire_held[index]:
+                new_bodies.append(self._bullet(ship))
+            self._fire_held[index] = fire
+
+        for body in self.bodies:
+            body.x += body.velocity_x
+            body.y += body.velocity_y
+            self._wrap(body)
+            body.angle = (body.angle + body.spin) % ANGLE_STEPS
+            if body.ttl > 0:
+                body.ttl -= 1
+                if body.ttl == 0:
+                    body.dead = True
+
+        survivors = []
+        for body in self.bodies:
+            if not body.dead:
+                survivors.append(body)
+            elif body.kind == ASTEROID:
+                self.kills += 1
+                if body.level < self.max_split_level:
+                    self.splits += 1
+                    new_bodies.extend(self._split(body))
+        survivors.extend(new_bodies)
+        self.bodies = survivors
+        self.tick += 1
+
+    def _wrap(self, body):
+        """Same edges as PhysicalObject.check_bounds: the (full size) radius
+        stands in for half the image, past either side of the world"""
+        margin = body.radius
+        if body.x < -margin:
+            body.x = self.width + margin
+        elif body.x > self.width + margin:
+            body.x = -margin
+        if body.y < -margin:
+            body.y = self.height + margin
+        elif body.y > self.height + margin:
+            body.y = -margin
+
+    def _bullet(self, ship):
+        c, s = cos(ship.angle), sin(ship.angle)
+        # Wrapped on the next step, like a bullet sprite fired at the edge
+        return Body(BULLET,
+                    ship.x + (c * ship.radius >> FRACTION_BITS),
+                    ship.y + (s * ship.radius >> FRACTION_BITS),
+                    velocity_x=ship.velocity_x + (c * self.bullet_speed >> FRACTION_BITS),
+                    velocity_y=ship.velocity_y + (s * self.bullet_speed >> FRACTION_BITS),
+                    radius=self.bullet_radius, ttl=self.bullet_ticks)
+
+    def _split(self, parent):
+        fragments = []
+        top = pixels_per_second(70)
+        for i in range(2 + self.random.below(2)):
+            fragments.append(Body(ASTEROID, parent.x, parent.y,
+                                  velocity_x=parent.velocity_x + self.random.below(top),
+                                  velocity_y=parent.velocity_y + self.random.below(top),
+                                  angle=self.random.below(ANGLE_STEPS),
+                                  spin=self._random_spin(),
+                                  radius=parent.radius, level=parent.level + 1))
+        return fragments
+
+    def _collide(self):
+        """Grid broadphase, then exact integer tests in the nested-loop order"""
+        bodies = self.bodies
+        cell_size = 2 * self.asteroid_radius
+        cells = {}
+        for index, body in enumerate(bodies):
+            key = (body.x // cell_size, body.y // cell_size)
+            if key in cells:
+                cells[key].append(index)
+            else:
+                cells[key] = [index]
+
+        pairs = []
+        for (cell_x, cell_y), members in cells.items():
+            for offset_x, offset_y in ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1)):
+                others = cells.get((cell_x + offset_x, cell_y + offset_y))
+                if others is None:
+                    continue
+                for i in members:
+                    for j in others:
+                        if (offset_x or offset_y) or i < j:
+                            pairs.append((i, j) if i < j else (j, i))
+        pairs.sort()
+
+        for i, j in pairs:
+            first, second = bodies[i], bodies[j]
+            if first.dead or second.dead or first.kind == second.kind:
+                continue
+            # The player ignores its own bullets
+            if {first.kind, second.kind} == {PLAYER, BULLET}:
+                continue
+            reach = self.reach(first) + self.reach(second)
+            dx = first.x - second.x
+            dy = first.y - second.y
+            if dx * dx + dy * dy <= reach * reach:
+                first.dead = True
+                second.dead = True
+
+    def state_hash(self):
+        """Digest of the whole state; equal on every machine after the same inputs"""
+        digest = hashlib.sha1(struct.pack('<qII', self.tick, self.random.state, len(self.bodies)))
+        for body in self.bodies:
+            digest.update(struct.pack('<bqqqqqqbq', body.kind, body.x, body.y, body.velocity_x,
+                                      body.velocity_y, body.angle, body.spin, body.level, body.ttl))
+        return digest.hexdigest()
@@ -0,0 +1,47 @@
+import math
+import time
+from array import array
+
+
+class FrameStats(object):
+    """Keeps the last `capacity` frame intervals and summarizes their jitter"""
+
+    def __init__(self, capacity=1024, clock=time.perf_counter):
+        self.clock = clock
+        self.capacity = capacity
+        self.intervals = array('d', [0.0] * capacity)
+        self.count = 0
+        self._last = None
+
+    def tick(self):
+        """Call once per frame"""
+        now = self.clock()
+        if self._last is not None:
+            self.record(now - self._last)
+        self._last = now
+
+    def record(self, interval):
+        self.intervals[self.count % self.capacity] = interval
+        self.count += 1
+
+    def reset(self):
+        self.count = 0
+        self._last = None
+
+    def summary(self):
+        """Mean, standard deviation (the jitter), median, 99th percentile and worst interval"""
+        values = sorted(self.intervals[:min(self.count, self.capacity)])
+        if not values:
+            return dict(frames=0, mean=0.0, jitter=0.0, p50=0.0, p99=0.0, worst=0.0)
+        mean = sum(values) / len(values)
+        variance = sum((value - mean) ** 2 for value in values) / len(values)
+        return dict(frames=len(values), mean=mean, jitter=math.sqrt(variance),
+                    p50=values[len(values) // 2],
+                    p99=values[min(len(values) - 1, int(len(values) * 0.99))],
+                    worst=values[-1])
+
+    def report(self, name="frames"):
+        stats = self.summary()
+        return ("%s: %d frames, mean %.2f ms, jitter %.2f ms, p50 %.2f ms, p99 %.2f ms, worst %.2f ms"
+                % (name, stats['frames'], stats['mean'] * 1000, stats['jitter'] * 1000,
+                   stats['p50'] * 1000, stats['p99'] * 1000, stats['worst'] * 1000))
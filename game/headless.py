@@ -0,0 +1,419 @@
+"""A windowless stand-in for the parts of pyglet the game uses.
+
+Call install() before importing any game module. After that the real
+Asteroid, Bullet and Player classes run without a display or GL context:
+sprites only keep their attributes, images only know their size, sounds
+are silent and the clock only moves when tick() is called. Windows only
+collect event handlers, so scripts that open one can be loaded as well.
+"""
+import ctypes
+import heapq
+import os
+import struct
+import sys
+import types
+
+
+class Clock(object):
+    """Replacement for pyglet.clock that only advances on tick()"""
+
+    def __init__(self):
+        self.time = 0.0
+        self._queue = []
+        self._counter = 0
+
+    def schedule_once(self, func, delay, *args, **kwargs):
+        self._counter += 1
+        heapq.heappush(self._queue, (self.time + delay, self._counter, func, None, args, kwargs))
+
+    def schedule_interval(self, func, interval, *args, **kwargs):
+        self._counter += 1
+        heapq.heappush(self._queue, (self.time + interval, self._counter, func, interval, args, kwargs))
+
+    def schedule(self, func, *args, **kwargs):
+        self.schedule_interval(func, 0.0, *args, **kwargs)
+
+    def unschedule(self, func):
+        self._queue = [item for item in self._queue if item[2] != func]
+        heapq.heapify(self._queue)
+
+    def tick(self, dt=0.0):
+        """Advance the clock and run every callback that came due, in order"""
+        self.time += dt
+        while self._queue and self._queue[0][0] <= self.time:
+            due, counter, func, interval, args, kwargs = heapq.heappop(self._queue)
+            if interval is not None:
+                self._counter += 1
+                heapq.heappush(self._queue, (due + max(interval, 1e-9), self._counter,
+                                             func, interval, args, kwargs))
+            func(self.time - due + (interval or 0.0), *args, **kwargs)
+        return dt
+
+    def get_fps(self):
+        return 0.0
+
+
+class Image(object):
+    """Just the size and anchor of an image, on one shared stand-in texture"""
+
+    id = 0
+    target = 0
+    tex_coords = (0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 1.0, 1.0, 0.0, 0.0, 1.0, 0.0)
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.anchor_x = 0
+        self.anchor_y = 0
+
+    def get_texture(self):
+        return self
+
+
+class Sound(object):
+    def play(self):
+        return None
+
+
+class Sprite(object):
+    """Keeps a sprite's attributes, and allocates what a real one holds.
+
+    Like pyglet's Sprite, each one makes its own SpriteGroup and a four
+    vertex list ('v2i', 'c4B', 't3f') in its batch, or on its own without
+    one, so memory measured here is close to the real thing. Only drawing
+    is skipped: moving a sprite doesn't write its vertices.
+    """
+
+    _rotation = 0
+    _scale = 1.0
+
+    def __init__(self, img, x=0, y=0, blend_src=None, blend_dest=None,
+                 batch=None, group=None, usage='dynamic', subpixel=False):
+        self.image = img
+        self.x = x
+        self.y = y
+        self.rotation = self._rotation
+        self.scale = self._scale
+        self._batch = batch
+        self._texture = img.get_texture()
+        self._group = SpriteGroup(self._texture, blend_src, blend_dest, group)
+        self._usage = usage
+        self._subpixel = subpixel
+        self.group = group
+        self.visible = True
+        self.opacity = 255
+        self.color = (255, 255, 255)
+        self._create_vertex_list()
+
+    def _create_vertex_list(self):
+        formats = ('v2f/%s' if self._subpixel else 'v2i/%s') % self._usage, 'c4B', ('t3f', self._texture.tex_coords)
+        if self._batch is None:
+            self._vertex_list = VertexList(4, *formats)
+        else:
+            self._vertex_list = self._batch.add(4, 0, self._group, *formats)
+
+    @property
+    def batch(self):
+        return self._batch
+
+    @batch.setter
+    def batch(self, batch):
+        # As in pyglet, leaving a batch gives the vertices back and takes a new list
+        if self._batch is batch:
+            return
+        self._vertex_list.delete()
+        self._batch = batch
+        self._create_vertex_list()
+
+    @property
+    def position(self):
+        return self.x, self.y
+
+    @position.setter
+    def position(self, position):
+        self.x, self.y = position
+
+    @property
+    def width(self):
+        return self.image.width * self.scale
+
+    @property
+    def height(self):
+        return self.image.height * self.scale
+
+    def update(self, x=None, y=None, rotation=None, scale=None, scale_x=None, scale_y=None):
+        if x is not None:
+            self.x = x
+        if y is not None:
+            self.y = y
+        if rotation is not None:
+            self.rotation = rotation
+        if scale is not None:
+            self.scale = scale
+
+    def delete(self):
+        self._vertex_list.delete()
+        self._vertex_list = None
+        self._texture = None
+        self._group = None
+        self._batch = None
+
+    def draw(self):
+        pass
+
+
+class VertexList(object):
+    """Vertex data in ctypes arrays, the way pyglet hands it out"""
+
+    _types = {'f': ctypes.c_float, 'B': ctypes.c_ubyte, 'i': ctypes.c_int}
+
+    def __init__(self, count, *formats):
+        for spec in formats:
+            # e.g. 'v2f/stream' -> vertices, 2 floats per vertex; ('t3f', data) fills it in
+            data = None
+            if isinstance(spec, tuple):
+                spec, data = spec
+            spec = spec.split('/')[0]
+            name = {'v': 'vertices', 'c': 'colors', 't': 'tex_coords'}[spec[0]]
+            array = (self._types[spec[2]] * (int(spec[1]) * count))()
+            if data is not None:
+                array[:] = data
+            setattr(self, name, array)
+
+    def delete(self):
+        pass
+
+
+class Batch(object):
+    def add(self, count, mode, group, *formats):
+        return VertexList(count, *formats)
+
+    def draw(self):
+        pass
+
+    def migrate(self, *args):
+        pass
+
+
+class Group(object):
+    def __init__(self, parent=None):
+        self.parent = parent
+
+    def set_state(self):
+        pass
+
+    def unset_state(self):
+        pass
+
+
+class SpriteGroup(Group):
+    def __init__(self, texture, blend_src, blend_dest, parent=None):
+        super(SpriteGroup, self).__init__(parent)
+        self.texture = texture
+        self.blend_src = blend_src
+        self.blend_dest = blend_dest
+
+
+class Label(object):
+    def __init__(self, text='', x=0, y=0, batch=None, **kwargs):
+        self.text = text
+        self.x = x
+        self.y = y
+        self.batch = batch
+        for name, value in kwargs.items():
+            setattr(self, name, value)
+
+    def draw(self):
+        pass
+
+
+class ClockDisplay(object):
+    def draw(self):
+        pass
+
+
+class Window(object):
+    """Keeps the event handlers it is given and calls them on dispatch_event()"""
+
+    def __init__(self, width=640, height=480, *args, **kwargs):
+        self.width = width
+        self.height = height
+        self.has_exit = False
+        self._handlers = [{}]
+
+    def event(self, func):
+        self._handlers[0][func.__name__] = func
+        return func
+
+    def push_handlers(self, *handlers):
+        frame = {}
+        for handler in handlers:
+            for name in dir(handler):
+                if name.startswith('on_'):
+                    frame[name] = getattr(handler, name)
+        self._handlers.append(frame)
+
+    def pop_handlers(self):
+        self._handlers.pop()
+
+    def dispatch_event(self, name, *args):
+        for frame in reversed(self._handlers):
+            if name in frame and frame[name](*args):
+                return True
+        return False
+
+    def dispatch_events(self):
+        pass
+
+    def switch_to(self):
+        pass
+
+    def clear(self):
+        pass
+
+    def flip(self):
+        pass
+
+    def close(self):
+        self.has_exit = True
+
+
+class KeyStateHandler(dict):
+    """Same as pyglet's: a dict of key -> pressed that defaults to False"""
+
+    def on_key_press(self, symbol, modifiers):
+        self[symbol] = True
+
+    def on_key_release(self, symbol, modifiers):
+        self[symbol] = False
+
+    def __getitem__(self, key):
+        return self.get(key, False)
+
+
+def png_size(filename):
+    """Read the width and height from a PNG header"""
+    with open(filename, 'rb') as png:
+        header = png.read(24)
+    return struct.unpack('>II', header[16:24])
+
+
+class Resources(object):
+    """Replacement for pyglet.resource that only reads image sizes"""
+
+    def __init__(self):
+        self.path = ['.']
+
+    def reindex(self):
+        pass
+
+    def _find(self, name):
+        package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        for directory in self.path:
+            for root in ('', package_root):
+                filename = os.path.join(root, directory, name)
+                if os.path.exists(filename):
+                    return filename
+        raise IOError("Resource %r not found in %r" % (name, self.path))
+
+    def image(self, name, *args, **kwargs):
+        width, height = png_size(self._find(name))
+        return Image(width, height)
+
+    def media(self, name, streaming=True):
+        return Sound()
+
+
+def _gl_getattr(name):
+    if name.startswith('GL_'):
+        return 0
+    if name.startswith('gl'):
+        return lambda *args: None
+    raise AttributeError(name)
+
+
+# The shared clock; tick it once per simulated step
+clock = None
+
+
+def install():
+    """Put the stand-in pyglet modules in sys.modules and return the clock"""
+    global clock
+    if clock is not None:
+        return clock
+    if 'game.resources' in sys.modules:
+        raise RuntimeError("headless.install() must run before the game modules are imported")
+
+    clock = Clock()
+
+    pyglet = types.ModuleType('pyglet')
+    pyglet.version = 'headless'
+    pyglet.options = {}
+
+    clock_module = types.ModuleType('pyglet.clock')
+    for name in ('schedule_once', 'schedule_interval', 'schedule', 'unschedule', 'tick', 'get_fps'):
+        setattr(clock_module, name, getattr(clock, name))
+    clock_module.ClockDisplay = ClockDisplay
+
+    gl = types.ModuleType('pyglet.gl')
+    gl.__getattr__ = _gl_getattr
+
+    graphics = types.ModuleType('pyglet.graphics')
+    graphics.Batch = Batch
+    graphics.Group = Group
+    graphics.OrderedGroup = Group
+
+    sprite = types.ModuleType('pyglet.sprite')
+    sprite.Sprite = Sprite
+    sprite.SpriteGroup = SpriteGroup
+
+    text = types.ModuleType('pyglet.text')
+    text.Label = Label
+
+    resource = Resources()
+
+    image = types.ModuleType('pyglet.image')
+    image.AbstractImage = Image
+
+    key = types.ModuleType('pyglet.window.key')
+    key.KeyStateHandler = KeyStateHandler
+    for name, value in (('SPACE', 32), ('LEFT', 65361), ('UP', 65362), ('RIGHT', 65363),
+                        ('DOWN', 65364), ('F9', 65478), ('F10', 65479), ('F11', 65480),
+                        ('F12', 65481), ('ESCAPE', 65307)):
+        setattr(key, name, value)
+
+    window = types.ModuleType('pyglet.window')
+    window.key = key
+    window.Window = Window
+
+    def no_event_loop(*args, **kwargs):
+        raise RuntimeError("There is no event loop in headless mode; tick the clock instead")
+
+    app = types.ModuleType('pyglet.app')
+    app.run = no_event_loop
+    app.exit = lambda: None
+
+    pyglet.clock = clock_module
+    pyglet.gl = gl
+    pyglet.graphics = graphics
+    pyglet.sprite = sprite
+    pyglet.text = text
+    pyglet.resource = resource
+    pyglet.image = image
+    pyglet.window = window
+    pyglet.app = app
+
+    sys.modules.update({
+        'pyglet': pyglet,
+        'pyglet.clock': clock_module,
+        'pyglet.gl': gl,
+        'pyglet.graphics': graphics,
+        'pyglet.sprite': sprite,
+        'pyglet.text': text,
+        'pyglet.resource': resource,
+        'pyglet.image': image,
+        'pyglet.window': window,
+        'pyglet.window.key': key,
+        'pyglet.app': app,
+    })
+    return clock
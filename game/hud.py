@@ -0,0 +1,100 @@
+import time
+import pyglet
+from . import load
+
+
+class Hud(object):
+    """Score, level and life icons that only re-layout text when a value changed.
+
+    Game code calls add_score/set_lives/set_level as often as it likes during
+    a tick; flush() is called once per frame and rebuilds at most one layout
+    per label.
+    """
+
+    def __init__(self, window_width=800, window_height=600, max_lives=3, batch=None):
+        if batch is None:
+            batch = pyglet.graphics.Batch()
+        self.batch = batch
+        self.window_width = window_width
+        self.window_height = window_height
+
+        self.score = 0
+        self.lives = 0
+        self.level = 1
+
+        self.score_label = pyglet.text.Label(text="Score: 0", x=10, y=window_height - 25,
+                                             batch=batch)
+        self.level_label = pyglet.text.Label(text="Level: 1", x=10, y=window_height - 45,
+                                             batch=batch)
+
+        # The life icons are made once and only shown or hidden afterwards
+        self.life_icons = load.player_lives(max_lives, batch,
+                                            window_width=window_width, window_height=window_height)
+        for icon in self.life_icons:
+            icon.visible = False
+
+        self._score_dirty = False
+        self._level_dirty = False
+        self._lives_dirty = False
+
+        # Count text layouts, and how many happened in the last second
+        self.layouts = 0
+        self.layouts_per_second = 0.0
+        self._rate_start = time.time()
+        self._rate_layouts = 0
+
+    def add_score(self, points):
+        if points:
+            self.score += points
+            self._score_dirty = True
+
+    def on_score(self, points):
+        """Event subscriber: a tick's points, all at once"""
+        self.add_score(points)
+
+    def set_score(self, score):
+        if score != self.score:
+            self.score = score
+            self._score_dirty = True
+
+    def set_lives(self, lives):
+        if lives != self.lives:
+            self.lives = lives
+            self._lives_dirty = True
+
+    def set_level(self, level):
+        if level != self.level:
+            self.level = level
+            self._level_dirty = True
+
+    def flush(self):
+        """Apply this frame's changes to the labels and icons. Call once per frame."""
+        if self._score_dirty:
+            self.score_label.text = "Score: " + str(self.score)
+            self.layouts += 1
+            self._score_dirty = False
+
+        if self._level_dirty:
+            self.level_label.text = "Level: " + str(self.level)
+            self.layouts += 1
+            self._level_dirty = False
+
+        if self._lives_dirty:
+            # Grow the icon pool only if we run out of icons
+            if self.lives > len(self.life_icons):
+                self.life_icons.extend(load.player_lives(self.lives, self.batch,
+                                                         window_width=self.window_width,
+                                                         window_height=self.window_height,
+                                                         first_icon=len(self.life_icons)))
+            for i, icon in enumerate(self.life_icons):
+                icon.visible = i < self.lives
+            self._lives_dirty = False
+
+        now = time.time()
+        if now - self._rate_start >= 1.0:
+            self.layouts_per_second = (self.layouts - self._rate_layouts) / (now - self._rate_start)
+            self._rate_start = now
+            self._rate_layouts = self.layouts
+
+    def draw(self):
+        self.batch.draw()
@@ -0,0 +1,125 @@
+"""Moving on to the next level without a hitch.
+
+Starting a level used to build all of its asteroids inside one tick:
+placing them, drawing their random values and creating every sprite.
+With a few thousand asteroids that stalls a frame. A LevelLoader splits
+the work up:
+
+* The numbers (positions, rotations, velocities, spin) of the levels that
+  can come next are worked out ahead of time on a worker thread, as a
+  Layout. They only depend on the asteroid count and where the ship
+  starts, and never touch pyglet.
+* When a level starts, its prepared Layout is picked up (or worked out
+  there and then if it wasn't prepared), and step() turns it into sprites
+  a slice per tick, so it is all in after `spread` ticks.
+
+The ship, its engine flame and the life icons are kept from level to level
+by the game; only the asteroids are new.
+"""
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from . import asteroid, placement, spawn
+
+
+class Layout(object):
+    """Where a level's asteroids start and how they move, before any sprite exists"""
+
+    def __init__(self, count, player_position, seed, safe_radius=100, prefab=asteroid.big_asteroid):
+        generator = np.random.default_rng(seed)
+        self.count = count
+        self.prefab = prefab
+        x, y = player_position
+        self.positions = placement.positions(count, exclude=[(x, y, safe_radius)], seed=generator).tolist()
+        self.values = spawn.random_values(prefab, count, generator=generator)
+
+    def build(self, start, stop, batch=None):
+        return spawn.build(self.prefab, self.positions, self.values, batch, start=start, stop=stop)
+
+
+class LevelLoader(object):
+    """Plans levels ahead on a worker thread and brings their asteroids in a slice per tick"""
+
+    def __init__(self, spread=12, safe_radius=100, background=True, prefab=asteroid.big_asteroid):
+        # Ticks a level's asteroids are spread over (1: all at once)
+        self.spread = spread
+        self.safe_radius = safe_radius
+        self.prefab = prefab
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix='levels') if background else None
+
+        # (count, player position) -> Future of a Layout
+        self._prepared = {}
+        self.layout = None
+        self.built = 0
+        self.per_tick = 0
+
+        # Levels whose layout was ready ahead of time, and ones worked out on the spot
+        self.prepared_levels = 0
+        self.unprepared_levels = 0
+
+    def prepare(self, count, player_position):
+        """Start working out a level of `count` asteroids, for a ship starting at `player_position`"""
+        key = (count, tuple(player_position))
+        if self.executor is None or key in self._prepared:
+            return
+        # Seeds come from spawn.rng, in order, so a seeded game stays the same
+        seed = int(spawn.rng.integers(1 << 62))
+        self._prepared[key] = self.executor.submit(Layout, count, player_position, seed, self.safe_radius,
+                                                   self.prefab)
+
+    def wait(self):
+        """Block until the prepared levels are worked out"""
+        for future in list(self._prepared.values()):
+            future.result()
+
+    def start(self, count, player_position):
+        """Begin bringing in a level; the other prepared levels are dropped"""
+        future = self._prepared.pop((count, tuple(player_position)), None)
+        for other in self._prepared.values():
+            other.cancel()
+        self._prepared.clear()
+
+        if future is not None:
+            self.layout = future.result()
+            self.prepared_levels += 1
+        else:
+            self.layout = Layout(count, player_position, int(spawn.rng.integers(1 << 62)), self.safe_radius,
+                                 self.prefab)
+            self.unprepared_levels += 1
+        self.built = 0
+        self.per_tick = max(1, int(math.ceil(count / float(self.spread))))
+
+    @property
+    def pending(self):
+        """Asteroids of the level still to come"""
+        return self.layout.count - self.built if self.layout is not None else 0
+
+    def step(self, batch=None):
+        """This tick's slice of the level's asteroids"""
+        return self._build(self.per_tick, batch)
+
+    def finish(self, batch=None):
+        """The rest of the level's asteroids, all at once"""
+        return self._build(self.pending, batch)
+
+    def _build(self, count, batch):
+        layout = self.layout
+        if layout is None:
+            return []
+        stop = min(self.built + count, layout.count)
+        objects = layout.build(self.built, stop, batch)
+        self.built = stop
+        if stop == layout.count:
+            self.layout = None
+        return objects
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+    def report(self):
+        return ("levels: %d planned ahead, %d planned on the spot, %d asteroids per tick"
+                % (self.prepared_levels, self.unprepared_levels, self.per_tick))
@@ -1,30 +1,21 @@
 import pyglet
-import random
-from . import asteroid, resources, util
+from . import asteroid, placement, resources, spawn
 
 
-def player_lives(num_icons, batch=None):
-    """Generate sprites for player life icons"""
+def player_lives(num_icons, batch=None, window_width=800, window_height=600, first_icon=0):
+    """Generate sprites for player life icons, starting at slot `first_icon`"""
     player_lives = []
-    for i in range(num_icons):
+    for i in range(first_icon, num_icons):
         new_sprite = pyglet.sprite.Sprite(img=resources.player_image,
-                                          x=785 - i * 30, y=585,
+                                          x=window_width - 15 - i * 30, y=window_height - 15,
                                           batch=batch)
         new_sprite.scale = 0.5
         player_lives.append(new_sprite)
     return player_lives
 
 
-def asteroids(num_asteroids, player_position, batch=None):
-    """Generate asteroid objects with random positions and velocities, not close to the player"""
-    asteroids = []
-    for i in range(num_asteroids):
-        asteroid_x, asteroid_y = player_position
-        while util.distance((asteroid_x, asteroid_y), player_position) < 100:
-            asteroid_x = random.randint(0, 800)
-            asteroid_y = random.randint(0, 600)
-        new_asteroid = asteroid.Asteroid(x=asteroid_x, y=asteroid_y, batch=batch)
-        new_asteroid.rotation = random.randint(0, 360)
-        new_asteroid.velocity_x, new_asteroid.velocity_y = random.random() * 40, random.random() * 40
-        asteroids.append(new_asteroid)
-    return asteroids
+def asteroids(num_asteroids, player_position, batch=None, safe_radius=100):
+    """Generate asteroid objects with random velocities, spread out over the
+    world and at least `safe_radius` away from the player"""
+    positions = placement.positions(num_asteroids, exclude=[(player_position[0], player_position[1], safe_radius)])
+    return spawn.spawn(asteroid.big_asteroid, num_asteroids, positions.tolist(), batch=batch)
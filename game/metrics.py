@@ -0,0 +1,153 @@
+"""Live game telemetry over HTTP, in the Prometheus text format.
+
+    python asteroid.py --metrics-port 9100
+    curl http://127.0.0.1:9100/metrics
+
+The game thread only adds to plain counters and writes tick and draw
+times into fixed-size rings; it never takes a lock or builds a string.
+Everything else happens on the server's own thread when a scrape comes
+in: it copies the rings, works out the percentiles, counts the live
+objects by class from a copy of the object list, and formats the text.
+A scrape can therefore see one tick's counters half updated, which is
+fine for monitoring.
+"""
+import threading
+from array import array
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+content_type = 'text/plain; version=0.0.4; charset=utf-8'
+
+quantiles = (0.5, 0.9, 0.99, 1.0)
+
+
+class Ring(object):
+    """The last `capacity` durations, plus a running count and sum"""
+
+    def __init__(self, capacity=1024):
+        self.values = array('d', bytes(8 * capacity))
+        self.capacity = capacity
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, value):
+        self.values[self.count % self.capacity] = value
+        self.count += 1
+        self.sum += value
+
+    def recent(self):
+        """The values in the ring right now, unordered"""
+        return list(self.values[:min(self.count, self.capacity)])
+
+
+class Metrics(object):
+    """Counters the game thread updates, read by a MetricsServer"""
+
+    def __init__(self, objects=lambda: (), classes=('Asteroid', 'Bullet', 'Player'), capacity=1024):
+        # Returns the live game objects; only called on the server thread
+        self.objects = objects
+        # Always reported, even when there are none of them
+        self.classes = classes
+
+        self.tick_times = Ring(capacity)
+        self.draw_times = Ring(capacity)
+        self.pairs_tested = 0
+        self.collisions = 0
+        self.spawned = 0
+        self.deaths = 0
+        self.level_resets = 0
+
+    # Event subscriber: a tick's collisions, deaths and new objects
+    def on_collisions(self, first, second):
+        self.collisions += len(first)
+
+    def on_deaths(self, objects, x, y, velocity_x, velocity_y):
+        self.deaths += len(objects)
+
+    def on_spawns(self, objects):
+        self.spawned += len(objects)
+
+    def object_counts(self):
+        counts = Counter(dict((name, 0) for name in self.classes))
+        counts.update(type(obj).__name__ for obj in list(self.objects()))
+        return counts
+
+    def text(self):
+        """Everything in the Prometheus text exposition format"""
+        lines = []
+        summary(lines, 'asteroid_tick_seconds', "Time spent in one update()", self.tick_times)
+        summary(lines, 'asteroid_draw_seconds', "Time spent in one on_draw()", self.draw_times)
+
+        lines.append("# HELP asteroid_objects Live game objects by class")
+        lines.append("# TYPE asteroid_objects gauge")
+        for name, count in sorted(self.object_counts().items()):
+            lines.append('asteroid_objects{class="%s"} %d' % (name, count))
+
+        for name, value, help_text in (
+                ('asteroid_collision_pairs_tested_total', self.pairs_tested, "Object pairs checked for collisions"),
+                ('asteroid_collisions_total', self.collisions, "Collisions that killed something"),
+                ('asteroid_spawned_total', self.spawned, "Objects added during updates"),
+                ('asteroid_deaths_total', self.deaths, "Objects removed during updates"),
+                ('asteroid_level_resets_total', self.level_resets, "Calls to reset_level()")):
+            lines.append("# HELP %s %s" % (name, help_text))
+            lines.append("# TYPE %s counter" % name)
+            lines.append("%s %d" % (name, value))
+        return "\n".join(lines) + "\n"
+
+
+def summary(lines, name, help_text, ring):
+    """A Prometheus summary: percentiles of the recent values, and the all-time count and sum"""
+    count, total = ring.count, ring.sum
+    values = sorted(ring.recent())
+    lines.append("# HELP %s %s" % (name, help_text))
+    lines.append("# TYPE %s summary" % name)
+    for quantile in quantiles:
+        if values:
+            value = values[min(int(quantile * len(values)), len(values) - 1)]
+            lines.append('%s{quantile="%g"} %.9f' % (name, quantile, value))
+        else:
+            lines.append('%s{quantile="%g"} NaN' % (name, quantile))
+    lines.append("%s_sum %.9f" % (name, total))
+    lines.append("%s_count %d" % (name, count))
+
+
+class _Server(ThreadingHTTPServer):
+    allow_reuse_address = True
+
+
+class MetricsServer(object):
+    """Serves /metrics for a Metrics object from a daemon thread"""
+
+    def __init__(self, metrics, port=0, host='127.0.0.1'):
+        self.metrics = metrics
+        self.scrapes = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = server.metrics.text().encode('utf-8')
+                server.scrapes += 1
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = _Server((host, port), Handler)
+        self.address = self.httpd.server_address
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='metrics')
+        self.thread.daemon = True
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,137 @@
+"""A game loop scheduler that decides when to simulate, draw and sleep.
+
+The simulation runs in fixed steps from an accumulator of real time; a
+frame is drawn once per target frame time. Before each frame the pacer
+looks at how long simulation steps and draws have been taking and only
+runs as many steps as fit before the frame's deadline, carrying the rest
+over. It then sleeps until the latest moment the next frame can start and
+still finish on time, less a small margin since sleep() tends to oversleep.
+
+The clock and sleep functions can be swapped for a MockClock, which makes
+the pacing reproducible without a window or real time passing.
+"""
+import time
+
+from . import framestats
+
+
+class MockClock(object):
+    """A clock that only moves when told to. Use it as both clock and sleep."""
+
+    def __init__(self, start=0.0):
+        self.time = start
+        self.slept = 0.0
+
+    def __call__(self):
+        return self.time
+
+    def advance(self, seconds):
+        self.time += seconds
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.time += seconds
+            self.slept += seconds
+
+
+class FramePacer(object):
+    """Runs `simulate(step)` at a fixed rate and `draw()` once per frame"""
+
+    def __init__(self, simulate, draw, step=1 / 120.0, frame_time=1 / 60.0,
+                 clock=time.perf_counter, sleep=time.sleep, max_steps=8,
+                 sleep_margin=0.001, smoothing=0.1):
+        self.simulate = simulate
+        self.draw = draw
+        self.step = step
+        self.frame_time = frame_time
+        self.clock = clock
+        self.sleep = sleep
+
+        # Never run more than this many steps in one frame; past that the
+        # game slows down instead of spiralling
+        self.max_steps = max_steps
+        self.sleep_margin = sleep_margin
+        self.smoothing = smoothing
+
+        # Moving averages of what one step and one draw cost
+        self.step_cost = 0.0
+        self.draw_cost = 0.0
+
+        self.accumulator = 0.0
+        self.steps = 0
+        self.frames = 0
+        self.deferred_steps = 0
+        self.dropped_time = 0.0
+
+        # Frames that finished drawing after their deadline, and by how much
+        self.missed = 0
+        self.lateness = framestats.FrameStats(clock=clock)
+        self.stats = framestats.FrameStats(clock=clock)
+
+        self._last = None
+        self.deadline = None
+
+    def _average(self, average, sample):
+        if not average:
+            return sample
+        return average + (sample - average) * self.smoothing
+
+    def run_frame(self):
+        """Simulate what fits, draw, then sleep until the next frame is due"""
+        clock = self.clock
+        now = clock()
+        if self._last is None:
+            self._last = now
+            self.deadline = now + self.frame_time
+        self.accumulator += now - self._last
+        self._last = now
+
+        limit = self.max_steps * self.step
+        if self.accumulator > limit:
+            self.dropped_time += self.accumulator - limit
+            self.accumulator = limit
+
+        # Run the steps that are due, as long as the draw still fits before the deadline.
+        # At least one due step always runs, so the game can't stall.
+        ran = 0
+        while self.accumulator >= self.step:
+            if ran and now + self.step_cost + self.draw_cost > self.deadline:
+                self.deferred_steps += 1
+                break
+            start = clock()
+            self.simulate(self.step)
+            now = clock()
+            self.step_cost = self._average(self.step_cost, now - start)
+            self.accumulator -= self.step
+            self.steps += 1
+            ran += 1
+
+        start = clock()
+        self.draw()
+        now = clock()
+        self.draw_cost = self._average(self.draw_cost, now - start)
+        self.stats.tick()
+        self.frames += 1
+
+        late = now - self.deadline
+        self.lateness.record(max(late, 0.0))
+        if late > 0:
+            self.missed += 1
+
+        self.deadline += self.frame_time
+        if self.deadline < now:
+            # More than a whole frame behind: start counting from now
+            self.deadline = now + self.frame_time
+
+        # Start the next frame as late as possible while it still finishes on time
+        due = min(int((self.accumulator + self.deadline - now) / self.step), self.max_steps)
+        wait = self.deadline - now - due * self.step_cost - self.draw_cost - self.sleep_margin
+        if wait > 0:
+            self.sleep(wait)
+
+    def report(self, name="paced"):
+        lateness = self.lateness.summary()
+        return ("%s\n%s: %d steps, %d frames, %d missed deadlines (worst %.2f ms late), "
+                "%d steps deferred, %.3f s dropped"
+                % (self.stats.report(name), name, self.steps, self.frames, self.missed,
+                   lateness['worst'] * 1000, self.deferred_steps, self.dropped_time))
@@ -0,0 +1,139 @@
+"""Collision pairs found by several processes at once, one strip of the world each.
+
+With hundreds of thousands of objects even the grid broadphase in
+collision.candidate_pairs keeps one core busy. A ParallelCollider splits
+the playfield into vertical strips holding about the same number of
+objects, and a pool of worker processes finds the overlapping pairs of
+one strip each:
+
+* x, y and radius go into one multiprocessing.shared_memory block, so a
+  worker reads them straight out of it instead of having them pickled.
+* A worker takes the objects whose x lies in its strip, plus those up to
+  one largest diameter past its right edge, and runs candidate_pairs on
+  them.
+* Of what it finds, it keeps only the pairs whose leftmost object is in its
+  own strip. Every overlapping pair has exactly one such strip, so no pair
+  is lost and none comes back twice.
+
+The pairs of all strips are merged and sorted the way candidate_pairs
+sorts them, so the result is the same array, whatever the number of
+workers. Handling the collisions stays on the main thread
+(collision.collide(..., find_pairs=collider.pairs)).
+"""
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from . import collision
+
+# Below this many objects the pool costs more than it saves
+default_min_parallel = 20000
+
+# Shared memory blocks a worker has opened, by name
+_attached = {}
+
+
+def _arrays(buffer, capacity):
+    """x, y and radius, as views of a block of capacity * 3 float64"""
+    block = np.ndarray((3, capacity), dtype=np.float64, buffer=buffer)
+    return block[0], block[1], block[2]
+
+
+def strip_pairs(name, capacity, count, left, right, reach, cell_size):
+    """The overlapping pairs whose leftmost object has left <= x < right (runs in a worker)"""
+    memory = _attached.get(name)
+    if memory is None:
+        # The collider moved to a bigger block; the old ones are gone
+        for old in _attached.values():
+            old.close()
+        _attached.clear()
+        memory = _attached[name] = shared_memory.SharedMemory(name)
+    x, y, radius = [values[:count] for values in _arrays(memory.buf, capacity)]
+
+    members = np.flatnonzero((x >= left) & (x < right + reach))
+    pairs = members[collision.candidate_pairs(x[members], y[members], radius[members], cell_size)]
+    leftmost = np.minimum(x[pairs[:, 0]], x[pairs[:, 1]])
+    return pairs[(leftmost >= left) & (leftmost < right)]
+
+
+class ParallelCollider(object):
+    """candidate_pairs, spread over a pool of worker processes"""
+
+    def __init__(self, workers=None, strips=None, cell_size=0.0, capacity=1 << 16,
+                 min_parallel=default_min_parallel, context=None):
+        self.workers = workers or os.cpu_count() or 1
+        # A few strips per worker evens out crowded and empty parts of the world
+        self.strips = strips or self.workers * 4
+        self.cell_size = cell_size
+        self.min_parallel = min_parallel
+
+        self.memory = None
+        self.capacity = 0
+        self._reserve(capacity)
+        context = context or multiprocessing.get_context()
+        self.pool = context.Pool(self.workers)
+
+        self.parallel_calls = 0
+        self.serial_calls = 0
+
+    def _reserve(self, count):
+        if count <= self.capacity:
+            return
+        capacity = max(count, self.capacity * 2)
+        old = self.memory
+        self.memory = shared_memory.SharedMemory(create=True, size=3 * 8 * capacity)
+        self.capacity = capacity
+        self.x, self.y, self.radius = _arrays(self.memory.buf, capacity)
+        if old is not None:
+            old.close()
+            old.unlink()
+
+    def edges(self, x):
+        """Strip boundaries: the x values that split the objects into equal shares"""
+        count = len(x)
+        cuts = [count * strip // self.strips for strip in range(1, self.strips)]
+        inner = np.partition(x, cuts)[cuts] if cuts else np.zeros(0)
+        return np.concatenate(([-np.inf], inner, [np.inf]))
+
+    def pairs(self, x, y, radius, cell_size=None):
+        """The same pairs as collision.candidate_pairs(x, y, radius, cell_size)"""
+        cell_size = self.cell_size if cell_size is None else cell_size
+        count = len(x)
+        if count < self.min_parallel or self.workers < 2:
+            self.serial_calls += 1
+            return collision.candidate_pairs(x, y, radius, cell_size)
+        self.parallel_calls += 1
+
+        self._reserve(count)
+        self.x[:count] = x
+        self.y[:count] = y
+        self.radius[:count] = radius
+        # Overlapping objects are never further apart than this along x. The
+        # slack covers the tolerance candidate_pairs allows on the distance.
+        reach = 2.0 * float(radius.max()) * (1.0 + 1e-6)
+
+        edges = self.edges(self.x[:count])
+        jobs = [(self.memory.name, self.capacity, count, edges[strip], edges[strip + 1], reach, cell_size)
+                for strip in range(self.strips) if edges[strip] < edges[strip + 1]]
+        found = [pairs for pairs in self.pool.starmap(strip_pairs, jobs) if len(pairs)]
+        if not found:
+            return np.zeros((0, 2), dtype=np.int64)
+        pairs = np.concatenate(found)
+        return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        if self.memory is not None:
+            self.x = self.y = self.radius = None
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
+
+    def report(self):
+        return ("parallel collision: %d workers, %d strips, %d parallel and %d serial calls"
+                % (self.workers, self.strips, self.parallel_calls, self.serial_calls))
@@ -0,0 +1,153 @@
+import math
+import numpy as np
+import pyglet
+from pyglet import gl
+
+
+class ParticleGroup(pyglet.graphics.Group):
+    """Sets the point size and blending for one kind of particle"""
+
+    def __init__(self, point_size, parent=None):
+        super(ParticleGroup, self).__init__(parent)
+        self.point_size = point_size
+
+    def set_state(self):
+        gl.glPushAttrib(gl.GL_COLOR_BUFFER_BIT | gl.GL_POINT_BIT)
+        gl.glEnable(gl.GL_BLEND)
+        gl.glBlendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)
+        gl.glPointSize(self.point_size)
+
+    def unset_state(self):
+        gl.glPopAttrib()
+
+
+class Emitter(object):
+    """Describes how one kind of particle looks and moves"""
+
+    def __init__(self, color, life, min_speed, max_speed, spread=math.pi, point_size=2.0, drag=1.0):
+        self.color = color
+        self.life = life
+        self.min_speed = min_speed
+        self.max_speed = max_speed
+
+        # Half of the cone (in radians) the particles are thrown into
+        self.spread = spread
+        self.point_size = point_size
+
+        # Fraction of the velocity left after one second
+        self.drag = drag
+
+
+# The two kinds of particles the game objects know about
+debris = Emitter(color=(200, 180, 160), life=0.8, min_speed=20.0, max_speed=140.0,
+                 point_size=2.0, drag=0.3)
+thrust = Emitter(color=(255, 160, 40), life=0.3, min_speed=80.0, max_speed=160.0,
+                 spread=0.3, point_size=3.0, drag=0.1)
+
+# The system game objects emit into; stays None until the game creates one
+system = None
+
+
+def emit(emitter, x, y, count, velocity_x=0.0, velocity_y=0.0, direction=None):
+    """Emit particles into the game's particle system, if there is one"""
+    if system is not None:
+        system.emit(emitter, x, y, count, velocity_x, velocity_y, direction)
+
+
+class ParticleSystem(object):
+    """Thousands of particles kept in NumPy arrays and drawn as one vertex list per emitter.
+
+    All particles share one ring buffer of `budget` slots. New particles are
+    written at the cursor, so when the budget is exhausted the oldest ones are
+    overwritten first.
+    """
+
+    def __init__(self, budget=4096, batch=None, emitters=(debris, thrust), seed=None):
+        self.budget = budget
+        self.batch = batch
+        self.rng = np.random.default_rng(seed)
+
+        self.position = np.zeros((budget, 2), dtype=np.float32)
+        self.velocity = np.zeros((budget, 2), dtype=np.float32)
+        self.age = np.zeros(budget, dtype=np.float32)
+        self.life = np.zeros(budget, dtype=np.float32)
+        self.kind = np.full(budget, -1, dtype=np.int8)
+        self.cursor = 0
+
+        # Number of live particles overwritten because the budget ran out
+        self.culled = 0
+
+        self.emitters = []
+        self.vertex_lists = []
+        self._colors = np.zeros((budget, 4), dtype=np.uint8)
+        for emitter in emitters:
+            self.add_emitter(emitter)
+
+    def add_emitter(self, emitter):
+        """Register an emitter type and give it its own vertex list"""
+        self.emitters.append(emitter)
+        if self.batch is not None:
+            group = ParticleGroup(emitter.point_size)
+            vertex_list = self.batch.add(self.budget, gl.GL_POINTS, group, 'v2f/stream', 'c4B/stream')
+            self.vertex_lists.append(vertex_list)
+        return len(self.emitters) - 1
+
+    def emit(self, emitter, x, y, count, velocity_x=0.0, velocity_y=0.0, direction=None):
+        """Spawn `count` particles at (x, y), thrown around `direction` (radians)"""
+        count = min(int(count), self.budget)
+        if count <= 0:
+            return
+        if emitter not in self.emitters:
+            self.add_emitter(emitter)
+        kind = self.emitters.index(emitter)
+
+        slots = (self.cursor + np.arange(count)) % self.budget
+        self.cursor = (self.cursor + count) % self.budget
+        self.culled += int(np.count_nonzero(self.age[slots] < self.life[slots]))
+
+        if direction is None:
+            angles = self.rng.uniform(-math.pi, math.pi, count)
+        else:
+            angles = direction + self.rng.uniform(-emitter.spread, emitter.spread, count)
+        speeds = self.rng.uniform(emitter.min_speed, emitter.max_speed, count)
+
+        self.position[slots, 0] = x
+        self.position[slots, 1] = y
+        self.velocity[slots, 0] = np.cos(angles) * speeds + velocity_x
+        self.velocity[slots, 1] = np.sin(angles) * speeds + velocity_y
+        self.age[slots] = 0.0
+        self.life[slots] = emitter.life * self.rng.uniform(0.5, 1.0, count)
+        self.kind[slots] = kind
+
+    def update(self, dt):
+        """Advance every particle in one vectorized step"""
+        self.position += self.velocity * dt
+        self.age += dt
+        for kind, emitter in enumerate(self.emitters):
+            if emitter.drag != 1.0:
+                self.velocity[self.kind == kind] *= emitter.drag ** dt
+
+    def live_count(self):
+        return int(np.count_nonzero(self.age < self.life))
+
+    def upload(self):
+        """Copy positions and faded colors into the vertex lists, once per frame"""
+        alive = self.age < self.life
+        fade = np.clip(1.0 - self.age / np.maximum(self.life, 1e-6), 0.0, 1.0)
+        alpha = (fade * 255.0).astype(np.uint8)
+
+        for kind, vertex_list in enumerate(self.vertex_lists):
+            self._colors[:, :3] = self.emitters[kind].color
+            self._colors[:, 3] = np.where(alive & (self.kind == kind), alpha, 0)
+            np.ctypeslib.as_array(vertex_list.vertices)[:] = self.position.ravel()
+            np.ctypeslib.as_array(vertex_list.colors)[:] = self._colors.ravel()
+
+    def clear(self):
+        self.age[:] = 0.0
+        self.life[:] = 0.0
+        self.kind[:] = -1
+
+    def delete(self):
+        for vertex_list in self.vertex_lists:
+            vertex_list.delete()
+        self.vertex_lists = []
@@ -1,15 +1,26 @@
 import pyglet
-from . import util
+from . import world
 
 
 class PhysicalObject(pyglet.sprite.Sprite):
     """A sprite with physical properties such as velocity"""
 
+    # Set while a spritearray.SpriteArray draws the game objects: their own
+    # vertices are never shown then, so don't spend time computing them
+    array_drawn = False
+
     def __init__(self, *args, **kwargs):
+        # Set the initial transform before the Sprite builds its vertices,
+        # so they only get computed once
+        self._rotation = kwargs.pop('rotation', 0)
+        self._scale = kwargs.pop('scale', 1.0)
+        velocity_x = kwargs.pop('velocity_x', 0.0)
+        velocity_y = kwargs.pop('velocity_y', 0.0)
+
         super(PhysicalObject, self).__init__(*args, **kwargs)
 
         # Velocity
-        self.velocity_x, self.velocity_y = 0.0, 0.0
+        self.velocity_x, self.velocity_y = velocity_x, velocity_y
 
         # Flags to toggle collision with bullets
         self.reacts_to_bullets = True
@@ -21,10 +32,6 @@ class PhysicalObject(pyglet.sprite.Sprite):
         # List of new objects to go in the game_objects list
         self.new_objects = []
 
-        # Tell the game handler about any event handlers
-        # Only applies to things with keyboard/mouse input
-        self.event_handlers = []
-
     def update(self, dt):
         """This method should be called every frame."""
 
@@ -35,12 +42,16 @@ class PhysicalObject(pyglet.sprite.Sprite):
         # Wrap around the screen if necessary
         self.check_bounds()
 
+    def _update_position(self):
+        if not self.array_drawn:
+            super(PhysicalObject, self)._update_position()
+
     def check_bounds(self):
-        """Use the classic Asteroids screen wrapping behavior"""
+        """Use the classic Asteroids screen wrapping behavior, around the whole world"""
         min_x = -self.image.width / 2
         min_y = -self.image.height / 2
-        max_x = 800 + self.image.width / 2
-        max_y = 600 + self.image.height / 2
+        max_x = world.width + self.image.width / 2
+        max_y = world.height + self.image.height / 2
         if self.x < min_x:
             self.x = max_x
         if self.y < min_y:
@@ -64,10 +75,10 @@ class PhysicalObject(pyglet.sprite.Sprite):
         collision_distance = self.image.width * 0.5 * self.scale \
                              + other_object.image.width * 0.5 * other_object.scale
 
-        # Get distance using position tuples
-        actual_distance = util.distance(self.position, other_object.position)
-
-        return (actual_distance <= collision_distance)
+        # Compare squared distances, without building position tuples
+        dx = self.x - other_object.x
+        dy = self.y - other_object.y
+        return dx * dx + dy * dy <= collision_distance * collision_distance
 
     def handle_collision_with(self, other_object):
         if other_object.__class__ is not self.__class__:
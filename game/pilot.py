@@ -0,0 +1,184 @@
+"""Computer pilots that fly many ships at once, for load testing.
+
+Every tick, decide() takes the positions and velocities of all ships and
+all asteroids as arrays and, for every ship together:
+
+* finds the nearest asteroid (brute force, in blocks of ships so memory
+  stays bounded, or with a game.spatial k-d tree when there are many
+  ships and asteroids, or from the game's own SpatialIndex when it keeps
+  one);
+* works out where a bullet fired now would meet it, from the ship's and
+  asteroid's velocities (the lead angle);
+* turns towards that point, thrusts when the target is far away and
+  fires when it is lined up and in range.
+
+The answer comes back as LEFT/RIGHT/UP/SPACE arrays, the same inputs a
+person gives Player through the keyboard; controls.PilotSource turns them
+into the ships' action bytes.
+"""
+import math
+import time
+
+import numpy as np
+
+from . import collision, framestats, spatial
+
+
+def ship_state(ships):
+    """x, y, velocity x, velocity y and heading (radians, counterclockwise) of each ship"""
+    count = len(ships)
+    x, y = collision.positions(ships)
+    velocity_x = np.fromiter((ship.velocity_x for ship in ships), dtype=np.float64, count=count)
+    velocity_y = np.fromiter((ship.velocity_y for ship in ships), dtype=np.float64, count=count)
+    # Note: pyglet's rotation attributes are in "negative degrees"
+    heading = -np.radians(np.fromiter((ship.rotation for ship in ships), dtype=np.float64, count=count))
+    return x, y, velocity_x, velocity_y, heading
+
+
+def target_state(targets):
+    count = len(targets)
+    x, y = collision.positions(targets)
+    velocity_x = np.fromiter((obj.velocity_x for obj in targets), dtype=np.float64, count=count)
+    velocity_y = np.fromiter((obj.velocity_y for obj in targets), dtype=np.float64, count=count)
+    return x, y, velocity_x, velocity_y
+
+
+def nearest(x, y, target_x, target_y, block_size=1 << 20):
+    """Index of and squared distance to the nearest target of every point"""
+    count = len(x)
+    index = np.zeros(count, dtype=np.int64)
+    distance = np.full(count, np.inf)
+    if not len(target_x):
+        return index, distance
+    rows = max(1, block_size // len(target_x))
+    for start in range(0, count, rows):
+        stop = min(start + rows, count)
+        dx = target_x[None, :] - x[start:stop, None]
+        dy = target_y[None, :] - y[start:stop, None]
+        squared = dx * dx + dy * dy
+        closest = squared.argmin(axis=1)
+        index[start:stop] = closest
+        distance[start:stop] = squared[np.arange(stop - start), closest]
+    return index, distance
+
+
+def nearest_target(x, y, target_x, target_y, brute_limit=1 << 16):
+    """Same as nearest(), through a k-d tree once ships times targets passes `brute_limit`"""
+    if len(x) * len(target_x) <= brute_limit:
+        return nearest(x, y, target_x, target_y)
+    query, index, squared = spatial.KDTree(target_x, target_y).nearest(x, y, 1)
+    found = np.zeros(len(x), dtype=np.int64)
+    distance = np.full(len(x), np.inf)
+    found[query] = index
+    distance[query] = squared
+    return found, distance
+
+
+def intercept_time(dx, dy, velocity_x, velocity_y, speed):
+    """Time until a shot at `speed` meets a target at (dx, dy) moving at (velocity_x, velocity_y)
+
+    Solves |d + v t| = speed * t for the smallest positive t. Where there is
+    no such time, it falls back to the straight-line flight time.
+    """
+    a = velocity_x * velocity_x + velocity_y * velocity_y - speed * speed
+    b = dx * velocity_x + dy * velocity_y
+    c = dx * dx + dy * dy
+    discriminant = b * b - a * c
+    fallback = np.sqrt(c) / speed
+    with np.errstate(divide='ignore', invalid='ignore'):
+        root = np.sqrt(np.maximum(discriminant, 0.0))
+        first = (-b - root) / a
+        second = (-b + root) / a
+    first = np.where(first > 0, first, np.inf)
+    second = np.where(second > 0, second, np.inf)
+    time_to_hit = np.minimum(first, second)
+    usable = (discriminant >= 0) & (a != 0) & np.isfinite(time_to_hit)
+    return np.where(usable, time_to_hit, fallback)
+
+
+class Pilots(object):
+    """Decides the controls of many ships each tick"""
+
+    def __init__(self, bullet_speed=700.0, bullet_life=0.5, aim_tolerance=4.0,
+                 cruise_distance=250.0, fire_interval=0.2, index=None, target_kinds=None):
+        self.bullet_speed = bullet_speed
+        self.bullet_range = bullet_speed * bullet_life
+        self.aim_tolerance = math.radians(aim_tolerance)
+        self.cruise_distance = cruise_distance
+        self.fire_interval = fire_interval
+
+        # A spatial.SpatialIndex the game updates every tick, and the classes
+        # in it to shoot at. With one, decide() asks it for each ship's
+        # nearest target and needs no list of targets.
+        self.index = index
+        self.target_kinds = target_kinds
+
+        # Seconds until each ship may fire again
+        self.cooldown = np.zeros(0)
+
+        # Seconds spent in decide(), one entry per call
+        self.costs = framestats.FrameStats()
+        self.total_time = 0.0
+        self.decisions = 0
+
+    def decide(self, ships, targets, dt):
+        """LEFT, RIGHT, UP and SPACE boolean arrays, one entry per ship.
+        With an index, `targets` is unused and can be None."""
+        start = time.perf_counter()
+        x, y, velocity_x, velocity_y, heading = ship_state(ships)
+        count = len(x)
+        if self.index is not None:
+            # Only the nearest target of each ship, in ship order
+            found, squared = self.index.nearest(x, y, 1, kinds=self.target_kinds)
+            targets = self.index.objects_of(found)
+            index, squared = np.arange(len(targets)), squared[:, 0]
+        target_x, target_y, target_velocity_x, target_velocity_y = target_state(targets)
+
+        if len(self.cooldown) != count:
+            self.cooldown = np.resize(self.cooldown, count)
+        self.cooldown -= dt
+
+        if not len(target_x):
+            nothing = np.zeros(count, dtype=bool)
+            self._record(start, count)
+            return nothing, nothing.copy(), nothing.copy(), nothing.copy()
+
+        if self.index is None:
+            index, squared = nearest_target(x, y, target_x, target_y)
+        dx = target_x[index] - x
+        dy = target_y[index] - y
+
+        # Bullets inherit the ship's velocity, so lead by the relative velocity
+        relative_x = target_velocity_x[index] - velocity_x
+        relative_y = target_velocity_y[index] - velocity_y
+        lead = intercept_time(dx, dy, relative_x, relative_y, self.bullet_speed)
+        aim_x = dx + relative_x * lead
+        aim_y = dy + relative_y * lead
+
+        error = np.arctan2(aim_y, aim_x) - heading
+        error = (error + np.pi) % (2 * np.pi) - np.pi
+
+        # LEFT turns counterclockwise, which is a positive heading error
+        left = error > self.aim_tolerance
+        right = error < -self.aim_tolerance
+        lined_up = ~left & ~right
+        distance = np.sqrt(squared)
+        up = (distance > self.cruise_distance) & (np.abs(error) < np.pi / 4)
+        fire = lined_up & (lead * self.bullet_speed < self.bullet_range) & (self.cooldown <= 0)
+        self.cooldown[fire] = self.fire_interval
+
+        self._record(start, count)
+        return left, right, up, fire
+
+    def _record(self, start, count):
+        elapsed = time.perf_counter() - start
+        self.costs.record(elapsed)
+        self.total_time += elapsed
+        self.decisions += count
+
+    def report(self, name="pilots"):
+        stats = self.costs.summary()
+        per_ship = self.total_time / max(self.decisions, 1)
+        return ("%s: %d decisions, mean %.3f ms per tick, p99 %.3f ms, %.2f us per ship"
+                % (name, self.decisions, stats['mean'] * 1000, stats['p99'] * 1000, per_ship * 1e6))
+
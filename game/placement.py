@@ -0,0 +1,161 @@
+"""Evenly spread random positions: Poisson-disk placement on a grid.
+
+positions() returns points in a rectangle with no two closer than a minimum
+spacing and none inside the exclusion circles (the safe zone around the
+player). It runs in time roughly linear in the number of points:
+
+* A background grid has cells of spacing / sqrt(2), so a cell holds at most
+  one point and anything too close to a point lies in the 5x5 block of
+  cells around it.
+* Each round throws one dart into every empty cell at once. Darts in cells
+  three apart both ways can't be too close to each other, so a round is
+  nine passes, one per (row % 3, column % 3) class, and each pass checks
+  all of its darts against the points placed so far in one go.
+* Rounds go on until there are enough points. `count` of them are then
+  picked at random, so they cover the whole area evenly. If the area fills
+  up first, the spacing shrinks and it starts again, down to a minimum
+  spacing: when even that doesn't fit (say the exclusions cover the whole
+  area) it gives up with a ValueError.
+
+All randomness comes from spawn.rng, or from `seed` when one is given, so
+the same seed gives the same layout.
+"""
+import math
+
+import numpy as np
+
+from . import spawn, world
+
+# Fraction of the area one point's spacing square takes up, on average, when
+# picking a spacing for a count. A full grid holds about 0.6 points per
+# spacing squared, so this leaves room to pick from.
+default_density = 0.4
+
+# Offsets of the cells that can hold a point closer than the spacing: the
+# 5x5 block around a cell without its corners
+_offsets = [(row, column) for row in range(-2, 3) for column in range(-2, 3) if abs(row) + abs(column) < 4]
+_offset_rows = np.array([row for row, column in _offsets])
+_offset_columns = np.array([column for row, column in _offsets])
+
+
+def free_area(width, height, exclude=()):
+    """Area of the rectangle outside the exclusion circles (at most)"""
+    return max(width * height - sum(math.pi * radius * radius for x, y, radius in exclude), 1.0)
+
+
+def default_spacing(count, width, height, exclude=(), density=default_density):
+    """The spacing that spreads `count` points over the free area"""
+    return math.sqrt(density * free_area(width, height, exclude) / max(count, 1))
+
+
+def positions(count, width=None, height=None, spacing=None, exclude=(), seed=None, max_rounds=30,
+              min_spacing=None):
+    """An array of `count` (x, y) positions, at least `spacing` apart.
+
+    `exclude` is a sequence of (x, y, radius) circles to keep clear. Without
+    a spacing, one is picked from the count and the free area. If `count`
+    points don't fit at the spacing asked for, it is shrunk by a fifth until
+    they do. Shrinking below `min_spacing` (default: a tenth of the spacing
+    for `count` points in the whole rectangle) raises ValueError instead.
+    """
+    rng = spawn.rng if seed is None else np.random.default_rng(seed)
+    if count <= 0:
+        return np.zeros((0, 2))
+    width = world.width if width is None else width
+    height = world.height if height is None else height
+    exclude = [tuple(circle) for circle in exclude]
+    if spacing is None:
+        spacing = default_spacing(count, width, height, exclude)
+    if min_spacing is None:
+        min_spacing = default_spacing(count, width, height) / 10
+
+    while True:
+        points = fill(count, width, height, spacing, exclude, rng, max_rounds)
+        if len(points) >= count:
+            return points[rng.permutation(len(points))[:count]]
+        if spacing * 0.8 < min_spacing:
+            raise ValueError("%d positions don't fit in %gx%g outside the exclusions, even %g apart"
+                             % (count, width, height, spacing))
+        spacing *= 0.8
+
+
+def fill(count, width, height, spacing, exclude, rng, max_rounds=30):
+    """Place points at least `spacing` apart until there are `count` or more
+    at the end of a round, or the area is full, or `max_rounds` went by"""
+    cell = spacing / math.sqrt(2)
+    rows = max(int(math.ceil(height / cell)), 1)
+    columns = max(int(math.ceil(width / cell)), 1)
+
+    # Index of the point in each cell, or -1. Two cells of padding all round
+    # let the 5x5 lookups run without bounds checks.
+    grid = np.full((rows + 4, columns + 4), -1, dtype=np.int64)
+
+    # One slot per cell, plus a far away point at index -1 for the empty cells
+    point_x = np.empty(rows * columns + 1)
+    point_y = np.empty(rows * columns + 1)
+    point_x[-1] = point_y[-1] = np.inf
+    placed = 0
+
+    # Cells still worth a dart: not taken, and not entirely inside an exclusion
+    open_cells = np.ones((rows, columns), dtype=bool)
+    center_y, center_x = np.mgrid[0:rows, 0:columns] * cell + cell / 2
+    for x, y, radius in exclude:
+        far_x = np.abs(center_x - x) + cell / 2
+        far_y = np.abs(center_y - y) + cell / 2
+        open_cells &= far_x * far_x + far_y * far_y >= radius * radius
+    open_cells = open_cells.ravel()
+
+    # The cells of each of the nine classes, as flat indices
+    row_of, column_of = np.divmod(np.arange(rows * columns), columns)
+    classes = [np.flatnonzero((row_of % 3 == row_class) & (column_of % 3 == column_class))
+               for row_class in range(3) for column_class in range(3)]
+    squared_spacing = spacing * spacing
+
+    for round_number in range(max_rounds):
+        for cells in classes:
+            cells = cells[open_cells[cells]]
+            if not len(cells):
+                continue
+            row = row_of[cells]
+            column = column_of[cells]
+            x = (column + rng.random(len(cells))) * cell
+            y = (row + rng.random(len(cells))) * cell
+
+            keep = (x < width) & (y < height)
+            for circle_x, circle_y, radius in exclude:
+                keep &= (x - circle_x) ** 2 + (y - circle_y) ** 2 >= radius * radius
+            neighbours = grid[row[:, None] + 2 + _offset_rows, column[:, None] + 2 + _offset_columns]
+            dx = point_x[neighbours] - x[:, None]
+            dy = point_y[neighbours] - y[:, None]
+            keep &= (dx * dx + dy * dy >= squared_spacing).all(axis=1)
+
+            accepted = np.flatnonzero(keep)
+            ids = np.arange(placed, placed + len(accepted))
+            point_x[ids] = x[accepted]
+            point_y[ids] = y[accepted]
+            grid[row[accepted] + 2, column[accepted] + 2] = ids
+            open_cells[cells[accepted]] = False
+            placed += len(accepted)
+
+        if placed >= count or not open_cells.any():
+            break
+
+    return np.column_stack((point_x[:placed], point_y[:placed]))
+
+
+def minimum_distance(points, block_size=1 << 20):
+    """The smallest distance between two of the points (brute force, in blocks)"""
+    count = len(points)
+    if count < 2:
+        return np.inf
+    x, y = points[:, 0], points[:, 1]
+    best = np.inf
+    rows = max(1, block_size // count)
+    for start in range(0, count, rows):
+        stop = min(start + rows, count)
+        dx = x[None, :] - x[start:stop, None]
+        dy = y[None, :] - y[start:stop, None]
+        squared = dx * dx + dy * dy
+        squared[np.arange(stop - start), np.arange(start, stop)] = np.inf
+        best = min(best, squared.min())
+    return math.sqrt(best)
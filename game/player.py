@@ -1,12 +1,16 @@
 import pyglet, math
-from pyglet.window import key
-from . import bullet, physicalobject, resources
+from . import bullet, controls, events, particles, physicalobject, resources
 
 
 class Player(physicalobject.PhysicalObject):
     """Physical object that responds to user input"""
 
     def __init__(self, *args, **kwargs):
+        # Where this ship's input comes from: byte `ship_index` of the actions
+        self.controls = kwargs.pop('controls', None) or controls.Controls()
+        self.ship_index = kwargs.pop('ship_index', 0)
+        self.controls.ensure(self.ship_index + 1)
+
         super(Player, self).__init__(img=resources.player_image, *args, **kwargs)
 
         # Create a child sprite to show when the ship is thrusting
@@ -21,20 +25,18 @@ class Player(physicalobject.PhysicalObject):
         # Player should not collide with own bullets
         self.reacts_to_bullets = False
 
-        # Tell the game handler about any event handlers
-        self.key_handler = key.KeyStateHandler()
-        self.event_handlers = [self, self.key_handler]
-
     def update(self, dt):
         # Do all the normal physics stuff
         super(Player, self).update(dt)
 
-        if self.key_handler[key.LEFT]:
+        action = self.controls.actions[self.ship_index]
+
+        if action & controls.LEFT:
             self.rotation -= self.rotate_speed * dt
-        if self.key_handler[key.RIGHT]:
+        if action & controls.RIGHT:
             self.rotation += self.rotate_speed * dt
 
-        if self.key_handler[key.UP]:
+        if action & controls.UP:
             # Note: pyglet's rotation attributes are in "negative degrees"
             angle_radians = -math.radians(self.rotation)
             force_x = math.cos(angle_radians) * self.thrust * dt
@@ -42,17 +44,22 @@ class Player(physicalobject.PhysicalObject):
             self.velocity_x += force_x
             self.velocity_y += force_y
 
-            # If thrusting, update the engine sprite
+            # If thrusting, update the engine sprite; it shows when the ship does
             self.engine_sprite.rotation = self.rotation
             self.engine_sprite.x = self.x
             self.engine_sprite.y = self.y
-            self.engine_sprite.visible = True
+            self.engine_sprite.visible = self.visible
+
+            # Blow some exhaust out of the back of the ship
+            exhaust_x = self.x - math.cos(angle_radians) * self.image.width * 0.5
+            exhaust_y = self.y - math.sin(angle_radians) * self.image.width * 0.5
+            particles.emit(particles.thrust, exhaust_x, exhaust_y, 2,
+                           self.velocity_x, self.velocity_y, angle_radians + math.pi)
         else:
             # Otherwise, hide it
             self.engine_sprite.visible = False
 
-    def on_key_press(self, symbol, modifiers):
-        if symbol == key.SPACE:
+        if action & controls.FIRE:
             self.fire()
 
     def fire(self):
@@ -73,8 +80,26 @@ class Player(physicalobject.PhysicalObject):
         # Add it to the list of objects to be added to the game_objects list
         self.new_objects.append(new_bullet)
 
-        # Play the bullet sound
-        resources.bullet_sound.play()
+        # Play the bullet sound, or let the event bus's subscribers play it once a tick
+        if events.bus is not None:
+            events.bus.shot()
+        else:
+            resources.bullet_sound.play()
+
+    def hide(self):
+        """Out of sight but not deleted, so respawn() can bring the same sprites back"""
+        self.visible = False
+        self.engine_sprite.visible = False
+
+    def respawn(self, x, y):
+        """Back in one piece at (x, y), at rest and facing right"""
+        self.position = (x, y)
+        self.rotation = 0
+        self.velocity_x = self.velocity_y = 0.0
+        self.dead = False
+        del self.new_objects[:]
+        self.visible = True
+        self.engine_sprite.visible = False
 
     def delete(self):
         # We have a child sprite which must be deleted when this object
@@ -0,0 +1,189 @@
+"""Streaming replay/telemetry files, written without stalling the game loop.
+
+The game thread packs fixed-size records into a ring buffer (write()); a
+background thread takes whole batches out of it, compresses each batch on
+its own and appends it to the file as a framed chunk. A file cut off in
+the middle (crash, full disk) can still be read up to its last complete
+chunk.
+
+File layout:
+    header: b'ASTREPLY', version (u16), codec (u16), record size (u32)
+    chunks: b'CHNK', record count (u32), compressed size (u32), crc32 (u32), data
+"""
+import lzma
+import struct
+import threading
+import time
+import zlib
+
+MAGIC = b'ASTREPLY'
+VERSION = 1
+CHUNK_MAGIC = b'CHNK'
+
+_header = struct.Struct('<8sHHI')
+_chunk_header = struct.Struct('<4sIII')
+
+# Codec ids stored in the header
+NONE, ZLIB, LZMA = 0, 1, 2
+codecs = {'none': NONE, 'zlib': ZLIB, 'lzma': LZMA}
+
+# tick, kind, object id, then four values (e.g. x, y, velocity x, velocity y)
+record = struct.Struct('<IHHffff')
+
+
+def _compress(codec, data):
+    if codec == ZLIB:
+        return zlib.compress(data, 6)
+    if codec == LZMA:
+        return lzma.compress(data, preset=1)
+    return data
+
+
+def _decompress(codec, data):
+    if codec == ZLIB:
+        return zlib.decompress(data)
+    if codec == LZMA:
+        return lzma.decompress(data)
+    return data
+
+
+class ReplayWriter(object):
+    """Ring-buffered record writer with a background compressing flusher"""
+
+    def __init__(self, filename, codec='zlib', capacity=1 << 16, chunk_records=4096,
+                 flush_interval=0.25, record_struct=record):
+        self.codec = codecs[codec]
+        self.record_struct = record_struct
+        self.record_size = record_struct.size
+        self.capacity = capacity
+        self.chunk_records = chunk_records
+        self.flush_interval = flush_interval
+
+        self.buffer = bytearray(capacity * self.record_size)
+        self._pack_into = record_struct.pack_into
+
+        # Only the game thread moves `written`, only the flusher moves `flushed`
+        self.written = 0
+        self.flushed = 0
+
+        # Records thrown away because the ring was full
+        self.dropped = 0
+        self.peak_fill = 0.0
+        self.bytes_out = 0
+        self.chunks = 0
+
+        self.file = open(filename, 'wb')
+        self.file.write(_header.pack(MAGIC, VERSION, self.codec, self.record_size))
+        self.file.flush()
+
+        self._closing = False
+        self._wakeup = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="replay-writer")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def write(self, *values):
+        """Append one record. Returns False (and counts a drop) if the ring is full."""
+        written = self.written
+        if written - self.flushed >= self.capacity:
+            self.dropped += 1
+            return False
+        self._pack_into(self.buffer, (written % self.capacity) * self.record_size, *values)
+        written += 1
+        self.written = written
+        # Wake the flusher as soon as a whole chunk is waiting
+        if not written % self.chunk_records:
+            self._wakeup.set()
+        return True
+
+    @property
+    def fill(self):
+        """How full the ring is, from 0 to 1"""
+        return (self.written - self.flushed) / float(self.capacity)
+
+    @property
+    def backpressure(self):
+        """True when the disk is not keeping up: records were dropped or the ring is mostly full"""
+        return self.dropped > 0 or self.fill > 0.75
+
+    def stats(self):
+        return dict(written=self.written, flushed=self.flushed, dropped=self.dropped,
+                    fill=self.fill, peak_fill=self.peak_fill, chunks=self.chunks,
+                    bytes_out=self.bytes_out, backpressure=self.backpressure)
+
+    def _take(self, count):
+        """Copy `count` records out of the ring, starting at the flushed position"""
+        size = self.record_size
+        start = (self.flushed % self.capacity) * size
+        end = start + count * size
+        if end <= len(self.buffer):
+            return bytes(self.buffer[start:end])
+        wrapped = end - len(self.buffer)
+        return bytes(self.buffer[start:]) + bytes(self.buffer[:wrapped])
+
+    def _flush_some(self, everything=False):
+        while True:
+            pending = self.written - self.flushed
+            fill = pending / float(self.capacity)
+            if fill > self.peak_fill:
+                self.peak_fill = fill
+            if not pending or (pending < self.chunk_records and not everything):
+                return
+            count = min(pending, self.chunk_records)
+            data = _compress(self.codec, self._take(count))
+            self.file.write(_chunk_header.pack(CHUNK_MAGIC, count, len(data), zlib.crc32(data) & 0xffffffff) + data)
+            self.file.flush()
+            self.bytes_out += _chunk_header.size + len(data)
+            self.chunks += 1
+            self.flushed += count
+
+    def _run(self):
+        last_flush = time.time()
+        while not self._closing:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            # Write full chunks as they fill up, and whatever is there every interval
+            overdue = time.time() - last_flush >= self.flush_interval
+            self._flush_some(everything=overdue)
+            if overdue:
+                last_flush = time.time()
+        self._flush_some(everything=True)
+
+    def close(self):
+        """Flush everything that is left and close the file"""
+        if self._closing:
+            return
+        self._closing = True
+        self._wakeup.set()
+        self._thread.join()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read(filename, record_struct=record):
+    """Yield the records of a replay file, stopping quietly at a truncated chunk"""
+    with open(filename, 'rb') as replay:
+        header = replay.read(_header.size)
+        if len(header) < _header.size:
+            return
+        magic, version, codec, record_size = _header.unpack(header)
+        if magic != MAGIC:
+            raise ValueError("%s is not a replay file" % filename)
+        if record_size != record_struct.size:
+            raise ValueError("%s has %d byte records, expected %d" % (filename, record_size, record_struct.size))
+
+        while True:
+            chunk_header = replay.read(_chunk_header.size)
+            if len(chunk_header) < _chunk_header.size:
+                return
+            chunk_magic, count, size, crc = _chunk_header.unpack(chunk_header)
+            data = replay.read(size)
+            if chunk_magic != CHUNK_MAGIC or len(data) < size or zlib.crc32(data) & 0xffffffff != crc:
+                return
+            for values in record_struct.iter_unpack(_decompress(codec, data)):
+                yield values
@@ -0,0 +1,234 @@
+import math
+from collections import deque
+import numpy as np
+from . import asteroid, placement, spawn, world
+
+# Compact record for an asteroid nobody is near. `time` is when the other
+# fields were last brought up to date.
+record_type = np.dtype([('x', 'f8'), ('y', 'f8'),
+                        ('velocity_x', 'f4'), ('velocity_y', 'f4'),
+                        ('rotation', 'f4'), ('rotate_speed', 'f4'),
+                        ('scale', 'f4'), ('time', 'f8')])
+
+
+def random_records(count, player_position, min_distance=100, prefab=asteroid.big_asteroid):
+    """Draw records for `count` asteroids anywhere in the world, away from the player"""
+    records = np.zeros(count, dtype=record_type)
+    positions = placement.positions(count, exclude=[(player_position[0], player_position[1], min_distance)])
+    records['x'] = positions[:, 0]
+    records['y'] = positions[:, 1]
+
+    low, high = prefab.speed
+    records['velocity_x'] = spawn.rng.uniform(low, high, count)
+    records['velocity_y'] = spawn.rng.uniform(low, high, count)
+    records['rotation'] = spawn.rng.integers(prefab.rotation[0], prefab.rotation[1] + 1, count)
+    records['rotate_speed'] = spawn.rng.uniform(prefab.rotate_speed[0], prefab.rotate_speed[1], count)
+    records['scale'] = prefab.scale
+    return records
+
+
+class SectorGrid(object):
+    """Splits the world into sectors and only keeps full sprites near the players.
+
+    Asteroids in sectors away from every player are parked as compact
+    records. Those records are only touched a few sectors per tick: straight
+    line motion is fast-forwarded analytically, and records that drifted
+    into another sector are moved there. Turning records into sprites and
+    sprites back into records is spread over frames by `stream_budget`.
+    """
+
+    def __init__(self, sector_size=2000, active_range=1, batch=None,
+                 stream_budget=40, scan_budget=200, rebin_per_tick=2):
+        self.sector_size = sector_size
+        self.columns = max(1, int(math.ceil(world.width / float(sector_size))))
+        self.rows = max(1, int(math.ceil(world.height / float(sector_size))))
+
+        # Sectors within this many sectors of a player are active
+        self.active_range = active_range
+        self.batch = batch
+
+        # Work limits per tick: sprites created, objects checked, sectors rebinned
+        self.stream_budget = stream_budget
+        self.scan_budget = scan_budget
+        self.rebin_per_tick = rebin_per_tick
+
+        self.time = 0.0
+        self.active = set()
+
+        # Sector index -> list of record arrays parked there
+        self.dormant = {}
+        self.dormant_count = 0
+
+        self._to_activate = deque()
+        self._rebin_queue = deque()
+        self._scan_index = 0
+
+        # Counters for the last tick
+        self.activated = 0
+        self.parked = 0
+
+    def sector_of(self, x, y):
+        column = int(x // self.sector_size) % self.columns
+        row = int(y // self.sector_size) % self.rows
+        return row * self.columns + column
+
+    def sectors_of(self, x, y):
+        """Vectorized sector_of for arrays of positions"""
+        columns = (np.floor_divide(x, self.sector_size).astype(np.int64)) % self.columns
+        rows = (np.floor_divide(y, self.sector_size).astype(np.int64)) % self.rows
+        return rows * self.columns + columns
+
+    def clear(self):
+        self.dormant = {}
+        self.dormant_count = 0
+        self.active = set()
+        self._to_activate.clear()
+        self._rebin_queue.clear()
+
+    def add_records(self, records):
+        """Park a batch of records in the sectors they belong to"""
+        records = records.copy()
+        records['time'] = self.time
+        sector_ids = self.sectors_of(records['x'], records['y'])
+        order = np.argsort(sector_ids, kind='stable')
+        sector_ids = sector_ids[order]
+        records = records[order]
+        starts = np.flatnonzero(np.r_[True, sector_ids[1:] != sector_ids[:-1]])
+        ends = np.r_[starts[1:], len(records)]
+        for start, end in zip(starts, ends):
+            self._park_records(int(sector_ids[start]), records[start:end])
+
+    def _park_records(self, sector, records):
+        if not len(records):
+            return
+        if sector not in self.dormant:
+            self.dormant[sector] = []
+            self._rebin_queue.append(sector)
+        self.dormant[sector].append(records)
+        self.dormant_count += len(records)
+        if sector in self.active and sector not in self._to_activate:
+            self._to_activate.append(sector)
+
+    def _take_records(self, sector, count):
+        """Remove up to `count` records from a sector"""
+        chunks = self.dormant.get(sector)
+        if not chunks:
+            return np.zeros(0, dtype=record_type)
+        records = chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+        taken, kept = records[:count], records[count:]
+        if len(kept):
+            self.dormant[sector] = [kept]
+        else:
+            del self.dormant[sector]
+        self.dormant_count -= len(taken)
+        return taken
+
+    def fast_forward(self, records):
+        """Move records along their straight lines up to the current time"""
+        elapsed = self.time - records['time']
+        image = asteroid.big_asteroid.image
+        half_width = image.width * 0.5 if image is not None else 0.0
+        half_height = image.height * 0.5 if image is not None else 0.0
+        span_x = world.width + 2 * half_width
+        span_y = world.height + 2 * half_height
+        records['x'] = np.mod(records['x'] + records['velocity_x'] * elapsed + half_width, span_x) - half_width
+        records['y'] = np.mod(records['y'] + records['velocity_y'] * elapsed + half_height, span_y) - half_height
+        records['rotation'] = np.mod(records['rotation'] + records['rotate_speed'] * elapsed, 360.0)
+        records['time'] = self.time
+
+    def wanted_sectors(self, players):
+        wanted = set()
+        reach = self.active_range
+        for player in players:
+            column = int(player.x // self.sector_size)
+            row = int(player.y // self.sector_size)
+            for d_row in range(-reach, reach + 1):
+                for d_column in range(-reach, reach + 1):
+                    wanted.add(((row + d_row) % self.rows) * self.columns
+                               + (column + d_column) % self.columns)
+        return wanted
+
+    def update(self, dt, players, game_objects):
+        """Stream sectors in and out around the players. Edits game_objects in place."""
+        self.time += dt
+        self.activated = 0
+        self.parked = 0
+
+        wanted = self.wanted_sectors(players)
+        for sector in wanted - self.active:
+            if sector in self.dormant:
+                self._to_activate.append(sector)
+        self.active = wanted
+
+        self._park_far_objects(game_objects)
+        self._activate_some(game_objects)
+        self._rebin_some()
+
+    def _park_far_objects(self, game_objects):
+        """Check a slice of the live objects and park asteroids in inactive sectors"""
+        if not game_objects:
+            return
+        if self._scan_index >= len(game_objects):
+            self._scan_index = 0
+        end = self._scan_index + self.scan_budget
+        to_park = []
+        for obj in game_objects[self._scan_index:end]:
+            if (obj.__class__ is asteroid.Asteroid and not obj.dead
+                    and self.sector_of(obj.x, obj.y) not in self.active):
+                to_park.append(obj)
+        self._scan_index = end
+
+        if len(to_park) > self.stream_budget:
+            to_park = to_park[:self.stream_budget]
+        if not to_park:
+            return
+
+        records = np.zeros(len(to_park), dtype=record_type)
+        for i, obj in enumerate(to_park):
+            records[i] = (obj.x, obj.y, obj.velocity_x, obj.velocity_y,
+                          obj.rotation, obj.rotate_speed, obj.scale, self.time)
+            obj.delete()
+        parked = set(to_park)
+        game_objects[:] = [obj for obj in game_objects if obj not in parked]
+        self.add_records(records)
+        self.parked = len(to_park)
+
+    def _activate_some(self, game_objects):
+        """Turn records in active sectors into sprites, a few per frame"""
+        budget = self.stream_budget
+        while budget > 0 and self._to_activate:
+            sector = self._to_activate[0]
+            if sector not in self.active or sector not in self.dormant:
+                self._to_activate.popleft()
+                continue
+            records = self._take_records(sector, budget)
+            self.fast_forward(records)
+
+            # Records that drifted out of the active area go back to sleep
+            awake = np.isin(self.sectors_of(records['x'], records['y']), list(self.active))
+            if not awake.all():
+                self.add_records(records[~awake])
+                records = records[awake]
+
+            for record in records.tolist():
+                x, y, velocity_x, velocity_y, rotation, rotate_speed, scale, time = record
+                game_objects.append(asteroid.Asteroid(x=x, y=y, batch=self.batch,
+                                                      rotation=rotation, scale=scale,
+                                                      velocity_x=velocity_x, velocity_y=velocity_y,
+                                                      rotate_speed=rotate_speed))
+            budget -= max(len(records), 1)
+            self.activated += len(records)
+
+    def _rebin_some(self):
+        """The reduced-rate simulation: catch up a few dormant sectors and re-sort their records"""
+        for i in range(min(self.rebin_per_tick, len(self._rebin_queue))):
+            sector = self._rebin_queue.popleft()
+            if sector not in self.dormant:
+                continue
+            records = self._take_records(sector, self.dormant_count)
+            self.fast_forward(records)
+            sector_ids = self.sectors_of(records['x'], records['y'])
+            staying = sector_ids == sector
+            self._park_records(sector, records[staying])
+            if not staying.all():
+                self.add_records(records[~staying])
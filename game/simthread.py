@@ -0,0 +1,455 @@
+"""Run the simulation on a worker thread and draw from published snapshots.
+
+The worker owns every Entity and steps them at a fixed rate, through the
+same rules modules the single-threaded game uses. After each step it
+publishes an immutable Snapshot; the main thread only ever reads the
+latest one and moves sprites to match. Key presses travel to the worker
+through a deque, whose append and popleft are atomic, and the deaths and
+shots the main thread reacts to (debris, sounds) come back through
+another one, so neither side takes a lock.
+"""
+import collections
+import math
+import threading
+import time
+
+import numpy as np
+
+from . import asteroid, collision, controls, entity, events, fixedpoint, levels, pilot, spawn, world
+from .ecs import ASTEROID, BULLET, PLAYER
+
+
+class Snapshot(object):
+    """Render state after one simulation tick. The arrays are read-only."""
+
+    __slots__ = ('tick', 'time', 'kind', 'x', 'y', 'rotation', 'scale', 'thrusting',
+                 'score', 'lives', 'level', 'game_over')
+
+    def __init__(self, tick, time, kind, x, y, rotation, scale, thrusting,
+                 score, lives, level, game_over):
+        for array in (kind, x, y, rotation, scale):
+            array.flags.writeable = False
+        self.tick = tick
+        self.time = time
+        self.kind = kind
+        self.x = x
+        self.y = y
+        self.rotation = rotation
+        self.scale = scale
+        self.thrusting = thrusting
+        self.score = score
+        self.lives = lives
+        self.level = level
+        self.game_over = game_over
+
+
+class EntitySimulation(object):
+    """The game's update() on Entity records instead of sprites.
+
+    A tick goes the way update_game() goes, with the same parts: a
+    controls.Controls fills in the ships' actions (the keyboard's from
+    press() and release(), the computer pilots' from a PilotSource),
+    collisions, deaths, new objects, shots and points go through an
+    events.EventBus, dying asteroids break up through asteroid.Breakup,
+    and each level comes in through a levels.LevelLoader. All randomness
+    comes from spawn.rng.
+    """
+
+    def __init__(self, num_asteroids=3, lives=2, pilots=0, seed=None):
+        if seed is not None:
+            spawn.seed(seed)
+        self.num_asteroids = num_asteroids
+        self.lives = lives
+        self.score = 0
+        self.level = 1
+        self.game_over = False
+        self.tick = 0
+        self.time = 0.0
+
+        # Ship 0 is the player's, the computer pilots fly ships 1 to `pilots`
+        self.controls = controls.Controls(1 + pilots)
+        self.keyboard = self.controls.add_source(controls.KeyboardSource(ship=0))
+        self.num_pilots = pilots
+        self.pilot_ships = []
+        self.pilots = None
+        if pilots:
+            self.pilots = pilot.Pilots()
+            self.controls.add_source(controls.PilotSource(self.pilots, lambda: self.pilot_ships,
+                                                          self.asteroids, first=1))
+
+        self.bus = events.EventBus()
+        self.bus.subscribe(asteroid.Breakup(self.add, fragment=entity.fragment),
+                           on_deaths=self.score_deaths, on_score=self.add_points)
+        self.level_loader = levels.LevelLoader(prefab=entity.big_asteroid)
+
+        self.entities = []
+        self.reset_level()
+        # Nothing is running yet, so the first level can come in all at once
+        self.entities.extend(self.level_loader.finish())
+
+    def reset_level(self):
+        """The ships back in the middle, and the next level's asteroids on their way"""
+        x, y = world.width / 2, world.height / 2
+        self.player_ship = entity.player(x, y)
+        self.pilot_ships[:] = []
+        for i in range(self.num_pilots):
+            angle = 2 * math.pi * i / self.num_pilots
+            self.pilot_ships.append(entity.player(x + math.cos(angle) * 60, y + math.sin(angle) * 60))
+        self.ships = [self.player_ship] + self.pilot_ships
+        self.ship_index = dict((ship, index) for index, ship in enumerate(self.ships))
+        self.entities = list(self.ships)
+
+        self.level_loader.start(self.num_asteroids, (x, y))
+        self.level_loader.prepare(self.num_asteroids, (x, y))
+        self.level_loader.prepare(self.num_asteroids + 1, (x, y))
+
+    def press(self, symbol):
+        self.keyboard.on_key_press(symbol, 0)
+
+    def release(self, symbol):
+        self.keyboard.on_key_release(symbol, 0)
+
+    def add(self, new_entities):
+        """Put entities made by an event subscriber into the game"""
+        self.entities.extend(new_entities)
+        self.bus.spawn(new_entities)
+
+    def asteroids(self):
+        return [e for e in self.entities if e.kind == ASTEROID]
+
+    def score_deaths(self, objects, x, y, velocity_x, velocity_y):
+        """One point for every asteroid destroyed"""
+        self.bus.score(sum(1 for obj in objects if obj.kind == ASTEROID))
+
+    def add_points(self, points):
+        self.score += points
+
+    def control(self, ship, action, dt, new_entities):
+        """Turn, thrust and fire the way Player.update does"""
+        ship.steer(dt, action & controls.LEFT, action & controls.RIGHT, action & controls.UP)
+        if action & controls.FIRE:
+            new_entities.append(ship.fire())
+            self.bus.shot()
+
+    def step(self, dt):
+        self.tick += 1
+        self.time += dt
+        if self.game_over:
+            return
+        bus = self.bus
+        actions = self.controls.update()
+
+        # Collisions, using the same pair order as the nested loop
+        entities = self.entities
+        if len(entities) > 1:
+            count = len(entities)
+            x = np.fromiter((e.x for e in entities), dtype=np.float64, count=count)
+            y = np.fromiter((e.y for e in entities), dtype=np.float64, count=count)
+            radius = np.fromiter((e.radius * e.scale for e in entities), dtype=np.float64, count=count)
+            for i, j in collision.candidate_pairs(x, y, radius).tolist():
+                first, second = entities[i], entities[j]
+                if not first.dead and not second.dead and first.collides_with(second):
+                    first.handle_collision_with(second)
+                    second.handle_collision_with(first)
+                    if first.dead or second.dead:
+                        bus.collision(first, second)
+
+        # Move everything and steer the ships; dead asteroids still count until the cleanup
+        new_entities = []
+        dead = []
+        asteroids_remaining = self.level_loader.pending
+        ship_index = self.ship_index
+        for e in entities:
+            e.update(dt)
+            if e.kind == PLAYER:
+                self.control(e, actions[ship_index[e]], dt, new_entities)
+            elif e.kind == ASTEROID:
+                asteroids_remaining += 1
+            if e.dead:
+                dead.append(e)
+
+        # Get rid of the dead, and bring in the new
+        player_dead = self.player_ship.dead
+        if dead:
+            for e in dead:
+                bus.death(e)
+            self.entities = [e for e in entities if not e.dead]
+        if new_entities:
+            self.add(new_entities)
+
+        # Breakups and points for everything above
+        bus.dispatch()
+
+        if self.level_loader.pending:
+            self.entities.extend(self.level_loader.step())
+        if player_dead:
+            if self.lives > 0:
+                self.lives -= 1
+                self.reset_level()
+            else:
+                self.game_over = True
+        elif asteroids_remaining == 0:
+            self.num_asteroids += 1
+            bus.score(10)
+            self.level += 1
+            self.reset_level()
+
+    def snapshot(self):
+        entities = self.entities
+        count = len(entities)
+        return Snapshot(self.tick, self.time,
+                        np.fromiter((e.kind for e in entities), dtype=np.int8, count=count),
+                        np.fromiter((e.x for e in entities), dtype=np.float64, count=count),
+                        np.fromiter((e.y for e in entities), dtype=np.float64, count=count),
+                        np.fromiter((e.rotation for e in entities), dtype=np.float64, count=count),
+                        np.fromiter((e.scale for e in entities), dtype=np.float64, count=count),
+                        bool(self.controls.actions[0] & controls.UP) and not self.player_ship.dead,
+                        self.score, self.lives, self.level, self.game_over)
+
+    def close(self):
+        self.level_loader.close()
+
+
+class FixedPointSimulation(object):
+    """The same game on fixedpoint.FixedSimulation, for runs that must be bit-identical.
+
+    The bodies move in Q16.16 integer maths and asteroids break up inside
+    FixedSimulation, so this only keeps the score, lives and levels, and
+    posts what happened each tick onto the bus: a shot for every new
+    bullet, and a death for every body gone, as an Entity record in
+    pixels so Debris and the sounds work as they do for EntitySimulation.
+    A tick is always 1/TICKS_PER_SECOND seconds.
+    """
+
+    dt = 1.0 / fixedpoint.TICKS_PER_SECOND
+
+    def __init__(self, num_asteroids=3, lives=2, seed=1):
+        self.num_asteroids = num_asteroids
+        self.lives = lives
+        self.score = 0
+        self.level = 1
+        self.game_over = False
+        self.tick = 0
+        self.time = 0.0
+        self.pilots = None
+
+        self.controls = controls.Controls(1)
+        self.keyboard = self.controls.add_source(controls.KeyboardSource(ship=0))
+        self.bus = events.EventBus()
+        self.bus.subscribe(on_score=self.add_points)
+
+        width, height = int(world.width), int(world.height)
+        self.middle = (width // 2, height // 2)
+        self.sim = fixedpoint.FixedSimulation(width, height, seed)
+        self.player_ship = self.sim.add_player(*self.middle)
+        self.reset_level()
+
+    def reset_level(self):
+        """The ship back in the middle, and a new field of asteroids"""
+        self.sim.start_level(self.num_asteroids, *self.middle)
+
+    def press(self, symbol):
+        self.keyboard.on_key_press(symbol, 0)
+
+    def release(self, symbol):
+        self.keyboard.on_key_release(symbol, 0)
+
+    def add_points(self, points):
+        self.score += points
+
+    def record(self, body):
+        """An Entity copy of a body, in pixels and pixels per second"""
+        one, ticks = float(fixedpoint.ONE), fixedpoint.TICKS_PER_SECOND
+        x, y = body.x / one, body.y / one
+        velocity_x, velocity_y = body.velocity_x * ticks / one, body.velocity_y * ticks / one
+        scale = 1.0 / (1 << body.level)
+        if body.kind == ASTEROID:
+            return entity.asteroid(x, y, velocity_x, velocity_y, scale=scale)
+        return entity.Entity(body.kind, x, y, scale=scale, velocity_x=velocity_x, velocity_y=velocity_y)
+
+    def step(self, dt):
+        self.tick += 1
+        self.time += self.dt
+        if self.game_over:
+            return
+        bus = self.bus
+        sim = self.sim
+        bodies = sim.bodies
+        kills = sim.kills
+        sim.step(self.controls.update())
+
+        # Bullets are aged before new ones join, so only this tick's have a full ttl
+        for body in sim.bodies:
+            if body.kind == BULLET and body.ttl == sim.bullet_ticks:
+                bus.shot()
+        for body in bodies:
+            if body.dead:
+                bus.death(self.record(body))
+        if sim.kills > kills:
+            bus.score(sim.kills - kills)
+        bus.dispatch()
+
+        if self.player_ship.dead:
+            if self.lives > 0:
+                self.lives -= 1
+                self.reset_level()
+            else:
+                self.game_over = True
+        elif not any(body.kind == ASTEROID for body in sim.bodies):
+            self.num_asteroids += 1
+            bus.score(10)
+            self.level += 1
+            self.reset_level()
+
+    def snapshot(self):
+        bodies = self.sim.bodies
+        count = len(bodies)
+        one = float(fixedpoint.ONE)
+        # Binary angles turn anticlockwise; sprite rotation is clockwise degrees
+        degrees = -360.0 / fixedpoint.ANGLE_STEPS
+        return Snapshot(self.tick, self.time,
+                        np.fromiter((b.kind for b in bodies), dtype=np.int8, count=count),
+                        np.fromiter((b.x / one for b in bodies), dtype=np.float64, count=count),
+                        np.fromiter((b.y / one for b in bodies), dtype=np.float64, count=count),
+                        np.fromiter((b.angle * degrees for b in bodies), dtype=np.float64, count=count),
+                        np.fromiter((1.0 / (1 << b.level) for b in bodies), dtype=np.float64, count=count),
+                        bool(self.controls.actions[0] & controls.UP) and not self.player_ship.dead,
+                        self.score, self.lives, self.level, self.game_over)
+
+    def close(self):
+        pass
+
+
+class Relay(object):
+    """Event subscriber on the worker: hands deaths and shots over to the main thread.
+
+    Whatever needs pyglet (debris particles, sounds) reacts on the main
+    thread, where deliver() posts what came over onto a bus of its own.
+    Dead entities are never touched by the worker again, so they can go
+    across as they are.
+    """
+
+    def __init__(self):
+        self.events = collections.deque()
+
+    def on_deaths(self, objects, x, y, velocity_x, velocity_y):
+        self.events.append(('death', list(objects)))
+
+    def on_shots(self, count):
+        self.events.append(('shots', count))
+
+    def deliver(self, bus):
+        """Post everything that came over since the last call onto `bus`, and dispatch it"""
+        events = self.events
+        while events:
+            kind, value = events.popleft()
+            if kind == 'death':
+                for obj in value:
+                    bus.death(obj)
+            else:
+                for i in range(value):
+                    bus.shot()
+        bus.dispatch()
+
+
+class SimulationThread(threading.Thread):
+    """Steps a simulation at a fixed rate and publishes a snapshot after every step"""
+
+    def __init__(self, simulation, dt=1 / 120.0):
+        super(SimulationThread, self).__init__(name="simulation")
+        self.daemon = True
+        self.simulation = simulation
+        self.dt = dt
+
+        # (symbol, pressed) pairs from the main thread
+        self.inputs = collections.deque()
+
+        # Deaths and shots for the main thread, from the simulation's bus
+        self.relay = Relay()
+        simulation.bus.subscribe(self.relay)
+
+        # The most recent snapshot; replaced, never modified
+        self.latest = simulation.snapshot()
+
+        self.step_times = collections.deque(maxlen=1024)
+        self._running = True
+
+    def on_key_press(self, symbol, modifiers):
+        self.inputs.append((symbol, True))
+
+    def on_key_release(self, symbol, modifiers):
+        self.inputs.append((symbol, False))
+
+    def stop(self):
+        self._running = False
+
+    def run(self):
+        simulation = self.simulation
+        next_tick = time.perf_counter()
+        while self._running:
+            while self.inputs:
+                symbol, pressed = self.inputs.popleft()
+                if pressed:
+                    simulation.press(symbol)
+                else:
+                    simulation.release(symbol)
+
+            start = time.perf_counter()
+            simulation.step(self.dt)
+            snapshot = simulation.snapshot()
+            self.step_times.append(time.perf_counter() - start)
+
+            # Publishing is one reference assignment; readers see the old snapshot or the new one
+            self.latest = snapshot
+
+            next_tick += self.dt
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -0.25:
+                # Far behind (e.g. the process was suspended): don't try to catch up
+                next_tick = time.perf_counter()
+        simulation.close()
+
+
+class SnapshotRenderer(object):
+    """Moves a pool of sprites to match a snapshot, on the main thread"""
+
+    def __init__(self, batch):
+        from . import resources
+        import pyglet
+        self.batch = batch
+        self.images = {ASTEROID: resources.asteroid_image,
+                       BULLET: resources.bullet_image,
+                       PLAYER: resources.player_image}
+        self.pools = dict((kind, []) for kind in self.images)
+        self.engine_sprite = pyglet.sprite.Sprite(resources.engine_image, batch=batch)
+        self.engine_sprite.visible = False
+
+    def _sprites(self, kind, count):
+        import pyglet
+        pool = self.pools[kind]
+        while len(pool) < count:
+            pool.append(pyglet.sprite.Sprite(self.images[kind], batch=self.batch))
+        return pool
+
+    def draw_snapshot(self, snapshot):
+        kinds = snapshot.kind
+        for kind in self.pools:
+            indices = np.flatnonzero(kinds == kind).tolist()
+            pool = self._sprites(kind, len(indices))
+            for sprite, index in zip(pool, indices):
+                sprite.update(x=snapshot.x[index], y=snapshot.y[index],
+                              rotation=snapshot.rotation[index], scale=snapshot.scale[index])
+                if not sprite.visible:
+                    sprite.visible = True
+            for sprite in pool[len(indices):]:
+                if sprite.visible:
+                    sprite.visible = False
+
+            if kind == PLAYER:
+                self.engine_sprite.visible = bool(indices) and snapshot.thrusting
+                if indices:
+                    index = indices[0]
+                    self.engine_sprite.update(x=snapshot.x[index], y=snapshot.y[index],
+                                              rotation=snapshot.rotation[index])
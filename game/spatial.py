@@ -0,0 +1,425 @@
+"""What's near here? Radius, nearest-neighbour and ray queries over the game objects.
+
+SpatialIndex.update(game_objects) is called once per tick. It keeps one
+k-d tree per class of object (Asteroid, Bullet, Player, ...), so a query
+can ask for some classes only. When the objects are the same as last tick
+the trees are only refitted to the new positions; they are rebuilt when
+objects come or go, and every `rebuild_every` ticks so they stay balanced.
+
+Every query is batched: it takes arrays of query points (or rays) and
+walks the trees for all of them at once, level by level, so hundreds of
+queries cost a handful of NumPy calls:
+
+* within(x, y, radius): every object whose center is within `radius`;
+* nearest(x, y, k): the k nearest objects, closest first;
+* ray(x, y, dx, dy, length): the first object whose collision circle the
+  ray hits.
+
+Ties are broken by object index, and distances are computed the same way
+as in the brute-force references at the bottom of this module, so the
+results match them exactly.
+"""
+import numpy as np
+
+from . import collision
+
+
+class KDTree(object):
+    """A balanced k-d tree over 2D points, stored as flat arrays.
+
+    The tree is complete: 2**depth leaves of about `leaf_size` points each,
+    node i having children 2i+1 and 2i+2. Points are kept in leaf order,
+    each leaf a contiguous run of them. Every node has the bounding box of
+    its points' centers, how many points it holds, and the largest radius
+    among them (for ray queries).
+    """
+
+    def __init__(self, x, y, radius=None, ids=None, leaf_size=16):
+        count = len(x)
+        self.count = count
+        self.ids = np.arange(count) if ids is None else np.asarray(ids)
+
+        leaves = 1
+        while leaves * leaf_size < count:
+            leaves *= 2
+        self.leaves = leaves
+        self.depth = leaves.bit_length() - 1
+
+        # Split every node at its median, alternating axes, the longer one first
+        order = np.arange(count)
+        bounds = np.array([0, count])
+        if count:
+            axes = (x, y) if np.ptp(x) >= np.ptp(y) else (y, x)
+        for level in range(self.depth):
+            coordinate = axes[level % 2]
+            segment = np.repeat(np.arange(len(bounds) - 1), np.diff(bounds))
+            order = order[np.lexsort((coordinate[order], segment))]
+            middle = (bounds[:-1] + bounds[1:]) // 2
+            bounds = np.append(np.stack([bounds[:-1], middle], axis=1).ravel(), count)
+        self.order = order
+        self.starts = bounds
+        # What each point in leaf order stands for
+        self.point_ids = self.ids[order]
+        self.refit(x, y, radius)
+
+    def refit(self, x, y, radius=None):
+        """Take new positions for the same points and recompute the boxes"""
+        order = self.order
+        self.x = x[order]
+        self.y = y[order]
+        self.radius = np.zeros(self.count) if radius is None else radius[order]
+
+        nodes = 2 * self.leaves - 1
+        self.min_x = np.full(nodes, np.inf)
+        self.min_y = np.full(nodes, np.inf)
+        self.max_x = np.full(nodes, -np.inf)
+        self.max_y = np.full(nodes, -np.inf)
+        self.reach = np.zeros(nodes)
+        self.sizes = np.zeros(nodes, dtype=np.int64)
+
+        first_leaf = self.leaves - 1
+        starts = self.starts
+        self.sizes[first_leaf:] = np.diff(starts)
+        filled = np.flatnonzero(starts[:-1] < starts[1:])
+        if len(filled):
+            # Empty leaves are zero-length runs, so the filled ones' starts split the points exactly
+            at = starts[filled]
+            slots = first_leaf + filled
+            self.min_x[slots] = np.minimum.reduceat(self.x, at)
+            self.max_x[slots] = np.maximum.reduceat(self.x, at)
+            self.min_y[slots] = np.minimum.reduceat(self.y, at)
+            self.max_y[slots] = np.maximum.reduceat(self.y, at)
+            self.reach[slots] = np.maximum.reduceat(self.radius, at)
+
+        # Each level from its children, bottom up
+        for level in reversed(range(self.depth)):
+            first = (1 << level) - 1
+            nodes = slice(first, 2 * first + 1)
+            left = slice(2 * first + 1, 4 * first + 3, 2)
+            right = slice(2 * first + 2, 4 * first + 3, 2)
+            self.min_x[nodes] = np.minimum(self.min_x[left], self.min_x[right])
+            self.min_y[nodes] = np.minimum(self.min_y[left], self.min_y[right])
+            self.max_x[nodes] = np.maximum(self.max_x[left], self.max_x[right])
+            self.max_y[nodes] = np.maximum(self.max_y[left], self.max_y[right])
+            self.reach[nodes] = np.maximum(self.reach[left], self.reach[right])
+            self.sizes[nodes] = self.sizes[left] + self.sizes[right]
+
+    def _box_distance2(self, node, x, y):
+        """Squared distance from each point to its node's box (0 inside)"""
+        dx = np.maximum(np.maximum(self.min_x[node] - x, x - self.max_x[node]), 0.0)
+        dy = np.maximum(np.maximum(self.min_y[node] - y, y - self.max_y[node]), 0.0)
+        return dx * dx + dy * dy
+
+    def _walk(self, count, keep):
+        """(query, point) pairs for the leaves that `keep(query, node)` lets through on the way down"""
+        query = np.arange(count)
+        node = np.zeros(count, dtype=np.int64)
+        for level in range(self.depth + 1):
+            kept = keep(query, node)
+            query, node = query[kept], node[kept]
+            if level < self.depth:
+                query = np.repeat(query, 2)
+                node = (2 * node[:, None] + np.array([1, 2])).ravel()
+
+        leaf = node - (self.leaves - 1)
+        start = self.starts[leaf]
+        sizes = self.starts[leaf + 1] - start
+        total = int(sizes.sum())
+        within = np.arange(total) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        return np.repeat(query, sizes), np.repeat(start, sizes) + within
+
+    def within(self, x, y, squared_radius):
+        """(query, id, squared distance) of every point within reach of each query, unsorted"""
+        if not self.count:
+            return _empty()
+
+        def keep(query, node):
+            return self._box_distance2(node, x[query], y[query]) <= squared_radius[query]
+
+        query, point = self._walk(len(x), keep)
+        dx = self.x[point] - x[query]
+        dy = self.y[point] - y[query]
+        squared = dx * dx + dy * dy
+        inside = squared <= squared_radius[query]
+        return query[inside], self.point_ids[point[inside]], squared[inside]
+
+    def bound(self, x, y, k):
+        """A squared radius around each query that holds at least k points (or all of them).
+
+        Goes down towards the query for as long as the nearer child still
+        has k points (the other child if the nearer one hasn't), then takes
+        the distance to the far corner of that node's box.
+        """
+        node = np.zeros(len(x), dtype=np.int64)
+        for level in range(self.depth):
+            left = 2 * node + 1
+            right = left + 1
+            nearer_left = self._box_distance2(left, x, y) <= self._box_distance2(right, x, y)
+            child = np.where(nearer_left, left, right)
+            other = np.where(nearer_left, right, left)
+            child = np.where(self.sizes[child] >= k, child, other)
+            node = np.where(self.sizes[child] >= k, child, node)
+        far_x = np.maximum(np.abs(x - self.min_x[node]), np.abs(x - self.max_x[node]))
+        far_y = np.maximum(np.abs(y - self.min_y[node]), np.abs(y - self.max_y[node]))
+        return far_x * far_x + far_y * far_y
+
+    def nearest(self, x, y, k=1):
+        """(query, id, squared distance) of up to k nearest points of each query, unsorted"""
+        if not self.count:
+            return _empty()
+        return _closest(len(x), k, *self.within(x, y, self.bound(x, y, k)))
+
+    def ray(self, x, y, dx, dy, start, end):
+        """(query, id, distance along the ray) of every circle each unit ray hits between `start` and `end`"""
+        if not self.count:
+            return _empty()
+
+        def keep(query, node):
+            pad = self.reach[node] + 1e-6
+            enter, leave = _slab(x[query], dx[query], self.min_x[node] - pad, self.max_x[node] + pad)
+            enter_y, leave_y = _slab(y[query], dy[query], self.min_y[node] - pad, self.max_y[node] + pad)
+            enter = np.maximum(enter, enter_y)
+            leave = np.minimum(leave, leave_y)
+            return ((self.sizes[node] > 0) & (enter <= leave) &
+                    (leave >= start[query] - 1e-6) & (enter <= end[query]))
+
+        query, point = self._walk(len(x), keep)
+        hit, distance = _hits(self.x[point], self.y[point], self.radius[point],
+                              x[query], y[query], dx[query], dy[query], end[query])
+        hit &= distance >= start[query]
+        return query[hit], self.point_ids[point[hit]], distance[hit]
+
+
+class SpatialIndex(object):
+    """Per-class k-d trees over the game objects, updated once per tick"""
+
+    def __init__(self, leaf_size=16, rebuild_every=30):
+        self.leaf_size = leaf_size
+        self.rebuild_every = rebuild_every
+        self.objects = []
+        self.classes = []
+        self.trees = []
+        self.kinds = np.zeros(0, dtype=np.int64)
+        self.x = self.y = self.radius = np.zeros(0)
+        self.since_rebuild = 0
+        self.rebuilds = 0
+        self.refits = 0
+
+    def update(self, game_objects):
+        """Index the objects' current positions. Query results are indices into this list."""
+        x, y = collision.positions(game_objects)
+        radius = collision.radii(game_objects)
+        if game_objects == self.objects and self.since_rebuild < self.rebuild_every:
+            self.refit(x, y, radius)
+            return
+        self.objects = list(game_objects)
+        codes = {}
+        kinds = np.fromiter((codes.setdefault(type(obj), len(codes)) for obj in game_objects),
+                            dtype=np.int64, count=len(game_objects))
+        self.load(x, y, radius, kinds, sorted(codes, key=codes.get))
+
+    def load(self, x, y, radius, kinds, classes=()):
+        """Rebuild from arrays; kinds[i] is object i's class, as an index into `classes`"""
+        self.x, self.y, self.radius, self.kinds = x, y, radius, kinds
+        self.classes = list(classes)
+        count = max(len(self.classes), int(kinds.max()) + 1 if len(kinds) else 0)
+        self.trees = []
+        for kind in range(count):
+            ids = np.flatnonzero(kinds == kind)
+            self.trees.append(KDTree(x[ids], y[ids], radius[ids], ids, self.leaf_size))
+        self.since_rebuild = 0
+        self.rebuilds += 1
+
+    def refit(self, x, y, radius):
+        """New positions for the same objects"""
+        self.x, self.y, self.radius = x, y, radius
+        for tree in self.trees:
+            tree.refit(x[tree.ids], y[tree.ids], radius[tree.ids])
+        self.since_rebuild += 1
+        self.refits += 1
+
+    def _trees(self, kinds):
+        """The trees for `kinds`: classes (subclasses count too) or kind numbers, or None for all"""
+        if kinds is None:
+            return self.trees
+        wanted = set(selected_kinds(kinds, self.classes))
+        return [tree for kind, tree in enumerate(self.trees) if kind in wanted]
+
+    def within(self, x, y, radius, kinds=None):
+        """(query, index) pairs of every object within `radius` of each point, sorted"""
+        x, y, radius = _batch(x, y, radius)
+        found = [tree.within(x, y, radius * radius) for tree in self._trees(kinds)]
+        query, index, squared = _concatenate(found)
+        order = np.lexsort((index, query))
+        return query[order], index[order]
+
+    def nearest(self, x, y, k=1, kinds=None):
+        """Indices and squared distances of the k nearest objects to each point, closest first.
+
+        Both come back as (queries, k) arrays; rows with fewer than k
+        objects to find are padded with -1 and infinity.
+        """
+        x, y = _batch(x, y)
+        found = [tree.nearest(x, y, k) for tree in self._trees(kinds)]
+        return _table(len(x), k, *_closest(len(x), k, *_concatenate(found)))
+
+    def ray(self, x, y, dx, dy, length=np.inf, kinds=None, first_step=64.0):
+        """Index of the first object each ray hits, and how far along; -1 and infinity for a miss.
+
+        Rays are followed in stretches of doubling length, and only the ones
+        that haven't hit anything yet go on to the next stretch, so a long
+        ray through a crowd doesn't test everything along its whole length.
+        """
+        x, y, dx, dy, length = _batch(x, y, dx, dy, length)
+        dx, dy = unit(dx, dy)
+        trees = self._trees(kinds)
+        # Nothing lies beyond the far corner of every tree's box
+        farthest = np.zeros(len(x))
+        for tree in trees:
+            if tree.count:
+                farthest = np.maximum(farthest, np.sqrt(tree.bound(x, y, tree.count)) + tree.reach[0] + 1.0)
+        length = np.minimum(length, farthest)
+        indices = np.full(len(x), -1, dtype=np.int64)
+        distances = np.full(len(x), np.inf)
+        pending = np.arange(len(x))
+        start = np.zeros(len(x))
+        step = first_step
+        while len(pending) and trees:
+            end = np.minimum(start + step, length[pending])
+            found = [tree.ray(x[pending], y[pending], dx[pending], dy[pending], start, end) for tree in trees]
+            query, index, distance = _closest(len(pending), 1, *_concatenate(found))
+            indices[pending[query]] = index
+            distances[pending[query]] = distance
+            going = np.ones(len(pending), dtype=bool)
+            going[query] = False
+            going &= end < length[pending]
+            pending, start = pending[going], end[going]
+            step *= 2
+        return indices, distances
+
+    def objects_of(self, indices):
+        objects = self.objects
+        return [objects[i] for i in np.asarray(indices).ravel().tolist() if i >= 0]
+
+
+def selected_kinds(kinds, classes):
+    """Kind numbers for a sequence of classes or kind numbers"""
+    selected = []
+    for kind in kinds:
+        if isinstance(kind, type):
+            selected.extend(number for number, cls in enumerate(classes) if issubclass(cls, kind))
+        else:
+            selected.append(int(kind))
+    return selected
+
+
+def unit(dx, dy):
+    """Directions scaled to length 1"""
+    length = np.hypot(dx, dy)
+    length[length == 0] = 1.0
+    return dx / length, dy / length
+
+
+def _batch(*values):
+    values = np.broadcast_arrays(*[np.atleast_1d(np.asarray(value, dtype=np.float64)) for value in values])
+    return [np.ascontiguousarray(value) for value in values]
+
+
+def _empty():
+    return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+
+
+def _concatenate(found):
+    if not found:
+        return _empty()
+    return tuple(np.concatenate(column) for column in zip(*found))
+
+
+def _closest(count, k, query, index, value):
+    """The k smallest values of each query, ties going to the lower index"""
+    order = np.lexsort((index, value, query))
+    query, index, value = query[order], index[order], value[order]
+    rank = np.arange(len(query)) - np.searchsorted(query, np.arange(count))[query]
+    keep = rank < k
+    return query[keep], index[keep], value[keep]
+
+
+def _table(count, k, query, index, value):
+    """Sorted (query, index, value) results as (count, k) arrays"""
+    indices = np.full((count, k), -1, dtype=np.int64)
+    values = np.full((count, k), np.inf)
+    rank = np.arange(len(query)) - np.searchsorted(query, np.arange(count))[query]
+    indices[query, rank] = index
+    values[query, rank] = value
+    return indices, values
+
+
+def _slab(origin, direction, low, high):
+    """Where a ray enters and leaves the band low..high of one axis"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        enter = (low - origin) / direction
+        leave = (high - origin) / direction
+    enter, leave = np.minimum(enter, leave), np.maximum(enter, leave)
+    # Parallel to the band: inside it all the way, or never
+    parallel = direction == 0
+    inside = (low <= origin) & (origin <= high)
+    enter = np.where(parallel, np.where(inside, -np.inf, np.inf), enter)
+    leave = np.where(parallel, np.where(inside, np.inf, -np.inf), leave)
+    return enter, leave
+
+
+def _hits(center_x, center_y, radius, x, y, dx, dy, length):
+    """Whether each unit ray hits each circle within `length`, and where (0 when it starts inside)"""
+    to_x = center_x - x
+    to_y = center_y - y
+    along = to_x * dx + to_y * dy
+    outside = to_x * to_x + to_y * to_y - radius * radius
+    discriminant = along * along - outside
+    with np.errstate(invalid='ignore'):
+        distance = np.where(outside <= 0, 0.0, along - np.sqrt(discriminant))
+    hit = (outside <= 0) | ((discriminant >= 0) & (distance >= 0))
+    hit &= distance <= length
+    return hit, distance
+
+
+# Brute-force references: the same answers from a scan over every object
+
+def brute_within(x, y, selected, query_x, query_y, radius):
+    queries, indices = [], []
+    candidates = np.flatnonzero(selected)
+    for query in range(len(query_x)):
+        dx = x[candidates] - query_x[query]
+        dy = y[candidates] - query_y[query]
+        inside = candidates[dx * dx + dy * dy <= radius[query] * radius[query]]
+        queries.extend([query] * len(inside))
+        indices.extend(inside.tolist())
+    return np.array(queries, dtype=np.int64), np.array(indices, dtype=np.int64)
+
+
+def brute_nearest(x, y, selected, query_x, query_y, k=1):
+    indices = np.full((len(query_x), k), -1, dtype=np.int64)
+    values = np.full((len(query_x), k), np.inf)
+    candidates = np.flatnonzero(selected)
+    for query in range(len(query_x)):
+        dx = x[candidates] - query_x[query]
+        dy = y[candidates] - query_y[query]
+        squared = dx * dx + dy * dy
+        order = np.lexsort((candidates, squared))[:k]
+        indices[query, :len(order)] = candidates[order]
+        values[query, :len(order)] = squared[order]
+    return indices, values
+
+
+def brute_ray(x, y, radius, selected, query_x, query_y, dx, dy, length):
+    dx, dy = unit(dx, dy)
+    indices = np.full(len(query_x), -1, dtype=np.int64)
+    values = np.full(len(query_x), np.inf)
+    candidates = np.flatnonzero(selected)
+    for query in range(len(query_x)):
+        hit, distance = _hits(x[candidates], y[candidates], radius[candidates], query_x[query],
+                              query_y[query], dx[query], dy[query], length[query])
+        if hit.any():
+            order = np.lexsort((candidates[hit], distance[hit]))
+            indices[query] = candidates[hit][order[0]]
+            values[query] = distance[hit][order[0]]
+    return indices, values
@@ -0,0 +1,80 @@
+import numpy as np
+
+# All spawn randomness comes from this generator so a run can be seeded
+rng = np.random.default_rng()
+
+
+def seed(value):
+    """Reseed the generator used for spawning"""
+    global rng
+    rng = np.random.default_rng(value)
+
+
+class Prefab(object):
+    """Template for a batch of identical game objects"""
+
+    def __init__(self, cls, image=None, scale=1.0, speed=(0.0, 40.0),
+                 rotation=(0, 360), rotate_speed=(-50.0, 50.0)):
+        self.cls = cls
+        self.image = image
+        self.scale = scale
+
+        # Each velocity component is drawn uniformly from this range
+        self.speed = speed
+
+        # Initial rotation is a whole number of degrees in this range (inclusive)
+        self.rotation = rotation
+
+        # Spin in degrees per second, or None to leave it to the class
+        self.rotate_speed = rotate_speed
+
+
+def spawn(prefab, count, positions, batch=None, velocity=(0.0, 0.0), scale=None):
+    """Create `count` objects from a prefab with one draw of random values.
+
+    `positions` is either a single (x, y) shared by all objects or a sequence
+    of `count` positions. `velocity` is added to the random velocities, and
+    `scale` overrides the prefab's scale. Every attribute is passed to the
+    constructor so each sprite builds its vertices exactly once.
+    """
+    if count <= 0:
+        return []
+    if len(positions) == 2 and not hasattr(positions[0], '__len__'):
+        positions = [positions] * count
+    return build(prefab, positions, random_values(prefab, count, velocity), batch, scale)
+
+
+def random_values(prefab, count, velocity=(0.0, 0.0), generator=None):
+    """Rotation, velocity x, velocity y and spin (None when the class picks it) for
+    `count` objects, as lists, drawn from `generator` (default: rng)"""
+    generator = rng if generator is None else generator
+    rotations = generator.integers(prefab.rotation[0], prefab.rotation[1] + 1, count).tolist()
+    low, high = prefab.speed
+    velocities_x = (generator.random(count) * (high - low) + (low + velocity[0])).tolist()
+    velocities_y = (generator.random(count) * (high - low) + (low + velocity[1])).tolist()
+    rotate_speeds = None
+    if prefab.rotate_speed is not None:
+        rotate_speeds = generator.uniform(prefab.rotate_speed[0], prefab.rotate_speed[1], count).tolist()
+    return rotations, velocities_x, velocities_y, rotate_speeds
+
+
+def build(prefab, positions, values, batch=None, scale=None, start=0, stop=None):
+    """Objects `start` to `stop` of a set whose positions and random_values() are known"""
+    if scale is None:
+        scale = prefab.scale
+    rotations, velocities_x, velocities_y, rotate_speeds = values
+    stop = len(rotations) if stop is None else stop
+
+    extra = {}
+    if prefab.image is not None:
+        extra['img'] = prefab.image
+
+    new_objects = []
+    for i in range(start, stop):
+        if rotate_speeds is not None:
+            extra['rotate_speed'] = rotate_speeds[i]
+        x, y = positions[i]
+        new_objects.append(prefab.cls(x=x, y=y, batch=batch, rotation=rotations[i], scale=scale,
+                                      velocity_x=velocities_x[i], velocity_y=velocities_y[i],
+                                      **extra))
+    return new_objects
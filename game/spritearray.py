@@ -0,0 +1,268 @@
+"""Draw thousands of sprites from arrays, through one vertex buffer.
+
+A pyglet Sprite works out its four corners in Python every time its x, y,
+rotation or scale is set, and writes them into its own part of the batch.
+A SpriteArray keeps x, y, rotation, scale and image ("frame") for all of
+its sprites in NumPy arrays instead. Once per frame upload() computes
+every corner in one vectorized pass, straight into the vertex list, which
+pyglet then sends to the GPU in one piece when the batch is drawn.
+
+All frames have to come from one texture so a single draw call covers
+them; Atlas takes care of that, reusing pyglet.resource's shared texture
+when the images are already in it.
+
+    python -m game.spritearray --asteroids 10000
+
+shows rotating asteroids drawn this way and reports the frame rate and
+what the vertex updates cost.
+"""
+import argparse
+import math
+import sys
+import time
+
+import numpy as np
+import pyglet
+from pyglet import gl
+
+from . import framestats
+
+# Corner order of a quad, as pyglet's Sprite: (x1, y1), (x2, y1), (x2, y2), (x1, y2)
+_corner_x = np.array([0, 1, 1, 0])
+_corner_y = np.array([0, 0, 1, 1])
+
+
+class Atlas(object):
+    """The images a SpriteArray can show, all on one texture"""
+
+    def __init__(self, images, size=1024):
+        textures = [image.get_texture() for image in images]
+        if len(set((texture.target, texture.id) for texture in textures)) > 1:
+            # Copy them into a texture of their own
+            atlas = pyglet.image.atlas.TextureAtlas(size, size)
+            regions = []
+            for image, texture in zip(images, textures):
+                region = atlas.add(image.get_image_data())
+                region.anchor_x, region.anchor_y = image.anchor_x, image.anchor_y
+                regions.append(region)
+            textures = regions
+        self.images = list(images)
+        self.texture = textures[0]
+        self.frames = dict((image, index) for index, image in enumerate(images))
+
+        self.width = np.array([texture.width for texture in textures], dtype=np.float64)
+        self.height = np.array([texture.height for texture in textures], dtype=np.float64)
+        self.anchor_x = np.array([image.anchor_x for image in images], dtype=np.float64)
+        self.anchor_y = np.array([image.anchor_y for image in images], dtype=np.float64)
+        self.tex_coords = np.array([texture.tex_coords for texture in textures], dtype=np.float32)
+
+    def frame(self, image):
+        return self.frames[image]
+
+
+class SpriteArray(object):
+    """Many textured quads, held in arrays and drawn as one vertex list"""
+
+    def __init__(self, atlas, capacity=1024, batch=None, group=None):
+        self.atlas = atlas
+        self.batch = batch
+        self.group = pyglet.sprite.SpriteGroup(atlas.texture, gl.GL_SRC_ALPHA,
+                                               gl.GL_ONE_MINUS_SRC_ALPHA, group)
+        self.count = 0
+        self.capacity = 0
+        self.vertex_list = None
+        self._allocate(capacity)
+
+        # Quads outside the view given to upload() are left out
+        self.visible = 0
+
+        # Seconds spent gathering from game objects and computing vertices, once per frame
+        self.gather_costs = framestats.FrameStats()
+        self.upload_costs = framestats.FrameStats()
+
+    def _allocate(self, capacity):
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.rotation = np.zeros(capacity)
+        self.scale = np.ones(capacity)
+        self.frame = np.zeros(capacity, dtype=np.int64)
+        if self.vertex_list is not None:
+            self.vertex_list.delete()
+        if self.batch is not None:
+            self.vertex_list = self.batch.add(capacity * 4, gl.GL_QUADS, self.group,
+                                              'v2f/stream', 't3f/dynamic')
+        self.capacity = capacity
+        # Which frames the texture coordinates were last written for (-1: none yet)
+        self._uploaded_frames = np.full(capacity, -1, dtype=np.int64)
+        self._uploaded_count = capacity
+
+    def reserve(self, count):
+        """Make room for at least `count` sprites, keeping the ones there"""
+        if count <= self.capacity:
+            return
+        capacity = max(count, self.capacity * 2)
+        kept = self.count
+        old = self.x[:kept], self.y[:kept], self.rotation[:kept], self.scale[:kept], self.frame[:kept]
+        self._allocate(capacity)
+        self.set(*old)
+
+    def set(self, x, y, rotation=0.0, scale=1.0, frame=0):
+        """Replace every sprite with these arrays (or scalars, for all of them)"""
+        count = len(x)
+        self.reserve(count)
+        self.count = count
+        self.x[:count] = x
+        self.y[:count] = y
+        self.rotation[:count] = rotation
+        self.scale[:count] = scale
+        self.frame[:count] = frame
+
+    def gather(self, objects):
+        """Take position, rotation, scale and image from game objects (any Sprites)"""
+        start = time.perf_counter()
+        count = len(objects)
+        self.reserve(count)
+        self.count = count
+        state = np.fromiter(((obj.x, obj.y, obj.rotation, obj.scale) for obj in objects),
+                            dtype=np.dtype((np.float64, 4)), count=count)
+        frames = self.atlas.frames
+        self.frame[:count] = np.fromiter((frames[obj.image] for obj in objects), dtype=np.int64, count=count)
+        self.x[:count] = state[:, 0]
+        self.y[:count] = state[:, 1]
+        self.rotation[:count] = state[:, 2]
+        self.scale[:count] = state[:, 3]
+        self.gather_costs.record(time.perf_counter() - start)
+
+    def vertices(self, view=None):
+        """The corners of every sprite as a (count, 4, 2) array, and which are in `view`.
+
+        `view` is (left, bottom, right, top); sprites entirely outside it are
+        collapsed to a point. Same formula as pyglet's Sprite, for all of
+        them at once.
+        """
+        count = self.count
+        frame = self.frame[:count]
+        scale = self.scale[:count]
+        atlas = self.atlas
+        x1 = -atlas.anchor_x[frame] * scale
+        y1 = -atlas.anchor_y[frame] * scale
+        width = atlas.width[frame] * scale
+        height = atlas.height[frame] * scale
+        local_x = x1[:, None] + width[:, None] * _corner_x
+        local_y = y1[:, None] + height[:, None] * _corner_y
+
+        angle = -np.radians(self.rotation[:count])
+        cos = np.cos(angle)[:, None]
+        sin = np.sin(angle)[:, None]
+        corners = np.empty((count, 4, 2))
+        corners[:, :, 0] = local_x * cos - local_y * sin + self.x[:count, None]
+        corners[:, :, 1] = local_x * sin + local_y * cos + self.y[:count, None]
+
+        if view is None:
+            return corners, np.ones(count, dtype=bool)
+        left, bottom, right, top = view
+        low = corners.min(axis=1)
+        high = corners.max(axis=1)
+        inside = (high[:, 0] >= left) & (low[:, 0] <= right) & (high[:, 1] >= bottom) & (low[:, 1] <= top)
+        corners[~inside] = 0.0
+        return corners, inside
+
+    def upload(self, view=None):
+        """Write every corner (and any changed texture coordinates) into the vertex list"""
+        start = time.perf_counter()
+        count = self.count
+        corners, inside = self.vertices(view)
+        self.visible = int(np.count_nonzero(inside))
+
+        if self.vertex_list is not None:
+            vertices = np.ctypeslib.as_array(self.vertex_list.vertices).reshape(self.capacity, 4, 2)
+            vertices[:count] = corners
+            if self._uploaded_count > count:
+                # Collapse the quads that are no longer used
+                vertices[count:self._uploaded_count] = 0.0
+            self._uploaded_count = count
+
+            frame = self.frame[:count]
+            changed = frame != self._uploaded_frames[:count]
+            if changed.any():
+                tex_coords = np.ctypeslib.as_array(self.vertex_list.tex_coords).reshape(self.capacity, 12)
+                tex_coords[:count][changed] = self.atlas.tex_coords[frame[changed]]
+                self._uploaded_frames[:count] = frame
+        self.upload_costs.record(time.perf_counter() - start)
+
+    def delete(self):
+        if self.vertex_list is not None:
+            self.vertex_list.delete()
+            self.vertex_list = None
+
+    def report(self, name="sprite array"):
+        gather = self.gather_costs.summary()
+        upload = self.upload_costs.summary()
+        return ("%s: %d sprites (%d in view), gather mean %.3f ms, vertex upload mean %.3f ms (p99 %.3f ms)"
+                % (name, self.count, self.visible, gather['mean'] * 1000,
+                   upload['mean'] * 1000, upload['p99'] * 1000))
+
+
+def sprite_vertices(x, y, rotation, scale, image):
+    """One sprite's corners, the way pyglet's Sprite works them out (with subpixel=True)"""
+    x1 = -image.anchor_x * scale
+    y1 = -image.anchor_y * scale
+    x2 = x1 + image.width * scale
+    y2 = y1 + image.height * scale
+    r = -math.radians(rotation)
+    cr = math.cos(r)
+    sr = math.sin(r)
+    return (x1 * cr - y1 * sr + x, x1 * sr + y1 * cr + y,
+            x2 * cr - y1 * sr + x, x2 * sr + y1 * cr + y,
+            x2 * cr - y2 * sr + x, x2 * sr + y2 * cr + y,
+            x1 * cr - y2 * sr + x, x1 * sr + y2 * cr + y)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rotating asteroids drawn from one vertex buffer")
+    parser.add_argument('--asteroids', type=int, default=10000)
+    parser.add_argument('--frames', type=int, default=0, help="stop after this many frames (default: run until closed)")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    from . import resources, world
+    window = pyglet.window.Window(world.width, world.height)
+    batch = pyglet.graphics.Batch()
+    atlas = Atlas([resources.asteroid_image, resources.bullet_image, resources.player_image])
+    sprites = SpriteArray(atlas, args.asteroids, batch=batch)
+
+    rng = np.random.default_rng(args.seed)
+    count = args.asteroids
+    sprites.set(rng.uniform(0, world.width, count), rng.uniform(0, world.height, count),
+                rng.uniform(0, 360, count), rng.choice([1.0, 0.5, 0.25], count))
+    velocity = rng.uniform(-40, 40, (2, count))
+    spin = rng.uniform(-50, 50, count)
+
+    frame_stats = framestats.FrameStats()
+    last = time.perf_counter()
+    frames = 0
+    while not window.has_exit and (not args.frames or frames < args.frames):
+        now = time.perf_counter()
+        dt, last = now - last, now
+        window.dispatch_events()
+
+        sprites.x[:count] += velocity[0] * dt
+        sprites.y[:count] += velocity[1] * dt
+        sprites.x[:count] %= world.width
+        sprites.y[:count] %= world.height
+        sprites.rotation[:count] += spin * dt
+
+        sprites.upload()
+        window.clear()
+        batch.draw()
+        window.flip()
+        frame_stats.tick()
+        frames += 1
+
+    print(frame_stats.report("%d asteroids" % count))
+    print(sprites.report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,328 @@
+"""Headless stress test: the real game rules, as fast as they will go.
+
+    python -m game.stress --asteroids 5000 --bullets-per-sec 60 --ticks 100000 --seed 1
+
+Exits with status 1 if --min-tps is given and the run was slower than that,
+so it can be used as a capacity gate. SIGUSR1, or a tick slower than
+--capture-threshold, profiles the next ticks into a .pstats file.
+"""
+import argparse
+import random
+import sys
+import time
+
+from . import headless
+
+
+def peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Stress(object):
+    """Drives the real Asteroid/Bullet/Player objects without a window"""
+
+    def __init__(self, num_asteroids, bullets_per_sec=60.0, seed=1, dt=1 / 120.0, cell_size=0.0, pilots=0,
+                 workers=0):
+        # Swap pyglet for the windowless stand-in before the game modules load
+        self.clock = headless.install()
+        from . import asteroid, collision, controls, events, load, pilot, player, spawn
+        self.asteroid = asteroid
+        self.collision = collision
+        self.controls = controls
+        self.player = player
+
+        random.seed(seed)
+        spawn.seed(seed)
+        self.rng = random.Random(seed)
+
+        self.dt = dt
+        self.cell_size = cell_size
+        # With workers, a pool of processes finds the collision pairs, a strip of the world each
+        self.collider = None
+        self.find_pairs = collision.candidate_pairs
+        if workers > 1:
+            from . import parallel
+            self.collider = parallel.ParallelCollider(workers)
+            self.find_pairs = self.collider.pairs
+        self.bullets_per_sec = bullets_per_sec
+        self._fire_debt = 0.0
+
+        # Ship i reads byte i of the action array
+        self.game_controls = controls.Controls(max(pilots, 1))
+        self.held = 0
+
+        self.player_ship = self.new_player(0)
+        self.game_objects = [self.player_ship] + load.asteroids(num_asteroids, self.player_ship.position)
+
+        # With pilots, that many computer-flown ships (the first is player_ship)
+        # replace the restless random pilot
+        self.pilots = pilot.Pilots() if pilots else None
+        self.ships = [self.player_ship]
+        for i in range(1, pilots):
+            self.ships.append(self.new_player(i))
+        self.game_objects.extend(self.ships[1:])
+        if self.pilots is not None:
+            self.pilot_source = self.game_controls.add_source(
+                controls.PilotSource(self.pilots, lambda: self.ships, self.asteroids, dt=dt))
+
+        # Dead asteroids break up when the tick's events go out
+        self.events = events.EventBus()
+        self.events.subscribe(asteroid.Breakup(self.add_objects))
+
+        self.ticks = 0
+        self.peak_objects = len(self.game_objects)
+        self.kills = 0
+        self.splits = 0
+        self.player_deaths = 0
+        self.bullets_fired = 0
+        self.pairs_tested = 0
+        self.collisions = 0
+
+        # A ProfileCapture wrapping each tick while it has work to do, or None
+        self.capture = None
+
+    def new_player(self, index):
+        """Ship `index`: the first one starts in the middle, the others anywhere"""
+        from . import world
+        if index:
+            x, y = self.rng.uniform(0, world.width), self.rng.uniform(0, world.height)
+        else:
+            x, y = world.width / 2, world.height / 2
+        return self.player.Player(x=x, y=y, controls=self.game_controls, ship_index=index)
+
+    def add_objects(self, objects):
+        self.game_objects.extend(objects)
+
+    def asteroids(self):
+        Asteroid = self.asteroid.Asteroid
+        return [obj for obj in self.game_objects if obj.__class__ is Asteroid]
+
+    def steer(self):
+        """Change the held keys now and then, like a restless pilot"""
+        if self.pilots is not None:
+            shots = self.pilot_source.shots
+            self.game_controls.update()
+            self.bullets_fired += self.pilot_source.shots - shots
+            return
+
+        controls = self.controls
+        if self.rng.random() < 0.02:
+            left = self.rng.random() < 0.3
+            right = not left and self.rng.random() < 0.3
+            up = self.rng.random() < 0.5
+            self.held = (controls.LEFT if left else 0) | (controls.RIGHT if right else 0) | (controls.UP if up else 0)
+        self.game_controls.update()[0] |= self.held
+
+        # Shots go straight to fire(), as more than one can come due in a tick
+        self._fire_debt += self.bullets_per_sec * self.dt
+        while self._fire_debt >= 1.0:
+            self._fire_debt -= 1.0
+            self.player_ship.fire()
+            self.bullets_fired += 1
+
+    def tick(self):
+        """One step of the game's update(), minus the drawing"""
+        dt = self.dt
+        self.clock.tick(dt)
+        self.steer()
+
+        tested, hits = self.collision.collide(self.game_objects, self.cell_size, self.find_pairs)
+        self.pairs_tested += tested
+        self.collisions += hits
+
+        to_add = []
+        for obj in self.game_objects:
+            obj.update(dt)
+            to_add.extend(obj.new_objects)
+            obj.new_objects = []
+
+        ships_dead = 0
+        survivors = []
+        for obj in self.game_objects:
+            if not obj.dead:
+                survivors.append(obj)
+                continue
+            to_add.extend(obj.new_objects)
+            self.events.death(obj)
+            obj.delete()
+            if obj.__class__ is self.player.Player:
+                ships_dead += 1
+            elif obj.__class__ is self.asteroid.Asteroid:
+                self.kills += 1
+                if obj.scale > 0.25:
+                    self.splits += 1
+        survivors.extend(to_add)
+        self.game_objects = survivors
+        self.events.dispatch()
+
+        if ships_dead:
+            self.player_deaths += ships_dead
+            for index, ship in enumerate(self.ships):
+                if ship.dead:
+                    self.ships[index] = self.new_player(index)
+                    self.game_objects.append(self.ships[index])
+            self.player_ship = self.ships[0]
+
+        self.ticks += 1
+        if len(self.game_objects) > self.peak_objects:
+            self.peak_objects = len(self.game_objects)
+
+    def run(self, ticks):
+        start = time.perf_counter()
+        for i in range(ticks):
+            capture_hook = self.capture
+            if capture_hook is None:
+                self.tick()
+                continue
+            capture_hook.run('tick()', self.tick)
+        return time.perf_counter() - start
+
+    def close(self):
+        if self.collider is not None:
+            self.collider.close()
+
+    def watch(self, profile_capture):
+        """Hand ticks to `profile_capture` whenever it is watching"""
+        def set_hook(filename=None):
+            if filename is not None:
+                print(profile_capture.report(filename))
+            self.capture = profile_capture if profile_capture.watching else None
+
+        def request(reason="request"):
+            profile_capture.request(reason)
+            set_hook()
+
+        profile_capture.objects = lambda: self.game_objects
+        profile_capture.on_finish = set_hook
+        set_hook()
+        return request
+
+
+class FixedStress(object):
+    """The same scenario on the deterministic fixed-point simulation"""
+
+    def __init__(self, num_asteroids, bullets_per_sec=60.0, seed=1, world_width=800, world_height=600):
+        from . import fixedpoint
+        self.fixedpoint = fixedpoint
+        self.simulation = fixedpoint.FixedSimulation(world_width, world_height, seed)
+        self.player_ship = self.simulation.add_player(world_width // 2, world_height // 2)
+        self.simulation.add_asteroids(num_asteroids, avoid=self.player_ship)
+        self.pilot = fixedpoint.XorShift(seed + 1)
+        self.held = 0
+
+        # Whole ticks between shots, so the fire button can be pressed and released
+        ticks_per_shot = fixedpoint.TICKS_PER_SECOND / bullets_per_sec if bullets_per_sec else 0
+        self.ticks_per_shot = max(2, int(ticks_per_shot)) if ticks_per_shot else 0
+
+        self.ticks = 0
+        self.peak_objects = len(self.simulation.bodies)
+        self.player_deaths = 0
+        self.bullets_fired = 0
+
+    def tick(self):
+        fixedpoint = self.fixedpoint
+        if self.pilot.below(50) == 0:
+            self.held = self.pilot.below(8) & (fixedpoint.LEFT | fixedpoint.RIGHT | fixedpoint.UP)
+        controls = self.held
+        if self.ticks_per_shot and self.ticks % self.ticks_per_shot == 0:
+            controls |= fixedpoint.FIRE
+            self.bullets_fired += 1
+        self.simulation.step([controls])
+
+        if self.player_ship.dead:
+            self.player_deaths += 1
+            self.simulation.respawn_player(0, self.simulation.width // 2 // fixedpoint.ONE,
+                                           self.simulation.height // 2 // fixedpoint.ONE)
+        self.ticks += 1
+        if len(self.simulation.bodies) > self.peak_objects:
+            self.peak_objects = len(self.simulation.bodies)
+
+    @property
+    def kills(self):
+        return self.simulation.kills
+
+    @property
+    def splits(self):
+        return self.simulation.splits
+
+    def run(self, ticks):
+        start = time.perf_counter()
+        for i in range(ticks):
+            self.tick()
+        return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the asteroid game headless and report throughput")
+    parser.add_argument('--asteroids', type=int, default=5000)
+    parser.add_argument('--bullets-per-sec', type=float, default=60.0)
+    parser.add_argument('--ticks', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--dt', type=float, default=1 / 120.0, help="simulated seconds per tick")
+    parser.add_argument('--world', default='20000x20000', help="size of the playfield")
+    parser.add_argument('--cell-size', type=float, default=0.0,
+                        help="collision grid cell size (default: the largest object)")
+    parser.add_argument('--min-tps', type=float, default=0.0,
+                        help="exit with status 1 if ticks per second ends up below this")
+    parser.add_argument('--pilots', type=int, default=0,
+                        help="fly this many ships with computer pilots instead of one random pilot")
+    parser.add_argument('--fixed', action='store_true',
+                        help="use the deterministic fixed-point simulation (fixed 1/120 s ticks)")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="find collision pairs with this many worker processes (default: on this one)")
+    parser.add_argument('--capture-calls', type=int, default=240, metavar='N',
+                        help="ticks a profile capture covers (default: 240)")
+    parser.add_argument('--capture-threshold', type=float, metavar='MS',
+                        help="start a profile capture when a tick takes longer than this")
+    parser.add_argument('--capture-dir', default='.',
+                        help="where profile captures are written (default: the current directory)")
+    args = parser.parse_args(argv)
+    world_width, world_height = [int(size) for size in args.world.split('x')]
+
+    if args.fixed:
+        stress = FixedStress(args.asteroids, args.bullets_per_sec, args.seed, world_width, world_height)
+    else:
+        headless.install()
+        from . import capture, world
+        world.resize(world_width, world_height)
+        stress = Stress(args.asteroids, args.bullets_per_sec, args.seed, args.dt, args.cell_size, args.pilots,
+                        args.workers)
+        threshold = args.capture_threshold / 1000.0 if args.capture_threshold is not None else None
+        request = stress.watch(capture.ProfileCapture(calls=args.capture_calls, threshold=threshold,
+                                                      directory=args.capture_dir))
+        capture.install_signal(lambda: request("SIGUSR1"))
+    elapsed = stress.run(args.ticks)
+    ticks_per_sec = stress.ticks / elapsed if elapsed > 0 else float('inf')
+
+    print("ticks:          %d in %.2f s" % (stress.ticks, elapsed))
+    print("ticks/sec:      %.1f" % ticks_per_sec)
+    print("peak objects:   %d" % stress.peak_objects)
+    print("peak RSS:       %.1f MB" % (peak_rss_bytes() / 1048576.0))
+    print("asteroid kills: %d" % stress.kills)
+    print("splits:         %d" % stress.splits)
+    print("player deaths:  %d" % stress.player_deaths)
+    print("bullets fired:  %d" % stress.bullets_fired)
+    if args.fixed:
+        print("state hash:     %s" % stress.simulation.state_hash())
+    else:
+        print("pairs tested:   %d (%d collided)" % (stress.pairs_tested, stress.collisions))
+        if stress.pilots is not None:
+            print(stress.pilots.report())
+        if stress.collider is not None:
+            print(stress.collider.report())
+        stress.close()
+
+    if args.min_tps and ticks_per_sec < args.min_tps:
+        print("FAIL: %.1f ticks/sec is below the %.1f minimum" % (ticks_per_sec, args.min_tps))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""Record when each part of a frame starts and ends, for a trace viewer.
+
+A Tracer writes begin and end events into preallocated arrays; once they
+are full the oldest events are overwritten. export() writes them in the
+Chrome trace event format, which chrome://tracing, Perfetto and
+speedscope open as a timeline.
+
+Spans nest: push(name) and pop() mark a whole call such as update() or
+on_draw(). begin(name) and end() mark phases one after the other, the same
+way AllocationProfiler gets them, so update() can hand its phases to
+either (or to both, through Tee).
+
+The game only touches a tracer while tracing is on; switched off, its
+hooks are None and nothing is recorded or timed.
+"""
+import json
+import os
+import threading
+import time
+from array import array
+
+from pyglet.window import key
+
+# Setting this to a file name turns tracing on from the start and writes the trace there at exit
+environment_variable = 'ASTEROID_TRACE'
+default_filename = 'asteroid-trace.json'
+
+
+class Tracer(object):
+    """Begin/end events in a ring buffer of `capacity` events"""
+
+    def __init__(self, capacity=1 << 16, clock=time.perf_counter):
+        self.capacity = capacity
+        self.clock = clock
+        self.names = []
+        self._codes = {}
+
+        # Event i: name number * 2, plus 1 for an end event, and when it happened
+        self.events = array('i', bytes(4 * capacity))
+        self.times = array('d', bytes(8 * capacity))
+        self.count = 0
+
+        self._stack = []
+        self._phase = False
+        self.thread = threading.get_ident()
+
+    def code(self, name):
+        """The begin event code for `name`"""
+        code = self._codes.get(name)
+        if code is None:
+            code = self._codes[name] = 2 * len(self.names)
+            self.names.append(name)
+        return code
+
+    def _record(self, event):
+        index = self.count % self.capacity
+        self.events[index] = event
+        self.times[index] = self.clock()
+        self.count += 1
+
+    def push(self, name):
+        """Start a span inside whatever is open"""
+        code = self.code(name)
+        self._stack.append(code)
+        self._record(code)
+
+    def pop(self):
+        """End the innermost open span"""
+        if self._stack:
+            self._record(self._stack.pop() + 1)
+
+    def begin(self, name):
+        """End the phase that is running, if any, and start `name`"""
+        if self._phase:
+            self.pop()
+        self.push(name)
+        self._phase = True
+
+    def end(self):
+        """End the last phase"""
+        if self._phase:
+            self.pop()
+            self._phase = False
+
+    @property
+    def dropped(self):
+        """Events overwritten because the buffer was full"""
+        return max(self.count - self.capacity, 0)
+
+    def trace_events(self):
+        """The recorded events, oldest first, as Chrome trace event dicts.
+
+        Spans still open at the end (say, update() while an export runs
+        inside it) are closed at the time of the last event, so viewers
+        that drop unmatched begins still show them.
+        """
+        count = min(self.count, self.capacity)
+        first = self.count - count
+        process = os.getpid()
+        names = self.names
+        found = []
+        open_names = []
+        for i in range(first, self.count):
+            index = i % self.capacity
+            event = self.events[index]
+            ending = event & 1
+            if ending:
+                if not open_names:
+                    # Its begin event was overwritten
+                    continue
+                open_names.pop()
+            else:
+                open_names.append(names[event >> 1])
+            found.append({'name': names[event >> 1], 'ph': 'E' if ending else 'B',
+                          'ts': self.times[index] * 1e6, 'pid': process, 'tid': self.thread})
+        while open_names:
+            found.append({'name': open_names.pop(), 'ph': 'E', 'ts': found[-1]['ts'],
+                          'pid': process, 'tid': self.thread})
+        return found
+
+    def export(self, filename):
+        """Write the trace as Chrome trace event JSON; returns the number of events"""
+        events = self.trace_events()
+        with open(filename, 'w') as trace:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, trace)
+        return len(events)
+
+    def clear(self):
+        self.count = 0
+        del self._stack[:]
+        self._phase = False
+
+
+class Tee(object):
+    """Hands begin(name) and end() on to several phase listeners"""
+
+    def __init__(self, *listeners):
+        self.listeners = listeners
+
+    def begin(self, name):
+        for listener in self.listeners:
+            listener.begin(name)
+
+    def end(self):
+        for listener in self.listeners:
+            listener.end()
+
+
+class TraceKeys(object):
+    """Window handler: one key turns tracing on and off, another exports the trace"""
+
+    def __init__(self, toggle, export, toggle_key=key.F9, export_key=key.F10):
+        self.toggle = toggle
+        self.export = export
+        self.toggle_key = toggle_key
+        self.export_key = export_key
+
+    def on_key_press(self, symbol, modifiers):
+        if symbol == self.toggle_key:
+            self.toggle()
+            return True
+        if symbol == self.export_key:
+            self.export()
+            return True
+        return False
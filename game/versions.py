@@ -0,0 +1,229 @@
+"""Run version1 to version5 and asteroid.py through the same scenario, headless.
+
+    python -m game.versions --asteroids 10 50 200 --ticks 1200 --seed 1
+
+Each version's script is loaded as a module under the pyglet stand-in from
+game.headless, so its classes and update() work without a window. Its
+Viewer is never constructed (that would start the event loop); an adapter
+builds the same scene from the version's own classes instead: a ship in
+the middle, the asked-for number of asteroids, the ship turning and firing
+at a steady rate. A ship that dies is put back, so every version keeps
+being measured under load. The table shows how long each tick took and
+how many objects each version ended up with.
+"""
+import argparse
+import contextlib
+import importlib.util
+import os
+import random
+import sys
+import time
+
+from . import framestats, headless
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (name, script, what its update loop does)
+versions = [
+    ('version1', 'version1/asteroid_Martin.py', "static sprites, no update"),
+    ('version2', 'version2/asteroid_Martin2.py', "motion only"),
+    ('version3', 'version3/asteroid_Martin3.py', "collgroup1 x collgroup2 lists"),
+    ('version4', 'version4/asteroid_Martin4.py', "collgroup lists, bullets, splits"),
+    ('version5', 'version5/asteroid_Martin5.py', "collgroup lists, score, lives"),
+    ('asteroid.py', 'asteroid.py', "grid-culled collision pairs"),
+]
+
+
+@contextlib.contextmanager
+def working_directory(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def load_script(name, script):
+    """Import a script by path, without running its __main__ block"""
+    path = os.path.join(ROOT, script)
+    spec = importlib.util.spec_from_file_location('headless_' + name.replace('.', '_'), path)
+    module = importlib.util.module_from_spec(spec)
+    with working_directory(os.path.dirname(path)):
+        spec.loader.exec_module(module)
+    return module
+
+
+class VersionAdapter(object):
+    """Builds the scenario from one versionN script's classes and ticks it"""
+
+    def __init__(self, name, script, num_asteroids, fire_every=30):
+        self.name = name
+        self.module = load_script(name, script)
+        self.fire_every = fire_every
+        self.ticks = 0
+        self.respawns = 0
+
+        Viewer = self.module.Viewer
+        Viewer.game_objects = []
+        # Bypass Viewer.__init__, which opens a window and runs the event loop
+        self.viewer = viewer = Viewer.__new__(Viewer)
+        viewer.game_window = sys.modules['pyglet'].window.Window(800, 600)
+        with working_directory(os.path.dirname(os.path.join(ROOT, script))):
+            self.load_images()
+        for label in ('score_label', 'game_over_label'):
+            setattr(Viewer, label, sys.modules['pyglet'].text.Label(text=""))
+
+        self.has_update = hasattr(self.module, 'update')
+        self.player_ship = self.new_player()
+        viewer.asteroids = viewer.load_asteroids(num_asteroids, self.player_ship.position)
+        Viewer.game_objects = [self.player_ship] + viewer.asteroids
+        self.add_engine()
+
+    def load_images(self):
+        viewer = self.viewer
+        if hasattr(viewer, 'load_resources'):
+            viewer.load_resources()
+            return
+        pyglet = sys.modules['pyglet']
+        pyglet.resource.path = ['data']
+        pyglet.resource.reindex()
+        for name in ('player', 'bullet', 'asteroid'):
+            image = pyglet.resource.image(name + '.png')
+            self.module.center_image(image)
+            setattr(viewer, name + '_image', image)
+
+    def new_player(self):
+        module = self.module
+        if hasattr(module, 'Player'):
+            return module.Player(image=self.viewer.player_image, x=400, y=300)
+        return sys.modules['pyglet'].sprite.Sprite(img=self.viewer.player_image, x=400, y=300)
+
+    def add_engine(self):
+        if hasattr(self.module, 'Engine'):
+            self.module.Viewer.game_objects.append(
+                self.module.Engine(image=self.viewer.engine_image, boss=self.player_ship))
+
+    def steer(self):
+        """Hold LEFT all the time and fire every `fire_every` ticks"""
+        ship = self.player_ship
+        key = sys.modules['pyglet'].window.key
+        if hasattr(ship, 'key_handler'):
+            ship.key_handler[key.LEFT] = True
+        elif hasattr(ship, 'keys'):
+            ship.keys['left'] = True
+        if hasattr(ship, 'fire') and self.ticks % self.fire_every == 0:
+            ship.fire()
+
+    def tick(self, dt):
+        self.steer()
+        if self.has_update:
+            self.module.update(dt)
+        self.ticks += 1
+
+        Viewer = self.module.Viewer
+        if getattr(self.player_ship, 'dead', False):
+            # Same for every version: a new ship, and the level carries on
+            self.respawns += 1
+            self.player_ship = self.new_player()
+            Viewer.game_objects.append(self.player_ship)
+            self.add_engine()
+        # version5's own level resets would change the scenario
+        Viewer.reset = False
+        Viewer.player_dead = False
+
+    def object_count(self):
+        return len(self.module.Viewer.game_objects)
+
+
+class GameAdapter(object):
+    """The same scenario for asteroid.py and the game package"""
+
+    def __init__(self, name, script, num_asteroids, fire_every=30):
+        from . import bench, spawn
+        spawn.seed(random.randrange(1 << 30))
+        self.name = name
+        self.clock, self.game = bench.load_game()
+        self.fire_every = fire_every
+        self.ticks = 0
+        self.respawns = 0
+        self.game['init'](num_asteroids)
+        # Plenty of lives, so the level never ends in a game over
+        self.game['game_hud'].set_lives(10 ** 6)
+
+    def tick(self, dt):
+        from pyglet.window import key
+        window = self.game['game_window']
+        if self.ticks == 0:
+            window.dispatch_event('on_key_press', key.LEFT, 0)
+        if self.ticks % self.fire_every == 0:
+            window.dispatch_event('on_key_press', key.SPACE, 0)
+        lives = self.game['game_hud'].lives
+        self.game['update'](dt)
+        if self.game['game_hud'].lives < lives:
+            self.respawns += 1
+        self.ticks += 1
+
+    def object_count(self):
+        return len(self.game['game_objects'])
+
+
+def run(name, script, num_asteroids, ticks, seed=1, dt=1 / 120.0):
+    """Time `ticks` ticks of one version; returns a row for the table"""
+    clock = headless.install()
+    random.seed(seed)
+    adapter_class = GameAdapter if script == 'asteroid.py' else VersionAdapter
+    adapter = adapter_class(name, script, num_asteroids)
+
+    stats = framestats.FrameStats(capacity=max(ticks, 1))
+    peak = adapter.object_count()
+    total = 0.0
+    # Some versions print on every shot or split; keep that out of the timings' way
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for i in range(ticks):
+            start = time.perf_counter()
+            clock.tick(dt)
+            adapter.tick(dt)
+            elapsed = time.perf_counter() - start
+            stats.record(elapsed)
+            total += elapsed
+            peak = max(peak, adapter.object_count())
+    summary = stats.summary()
+    return dict(name=name, asteroids=num_asteroids, ticks=ticks, mean=summary['mean'], p99=summary['p99'],
+                ticks_per_sec=ticks / total if total else float('inf'),
+                peak=peak, final=adapter.object_count(), respawns=adapter.respawns)
+
+
+def table(rows):
+    lines = ["%-12s %9s %10s %10s %11s %6s %6s %9s  %s"
+             % ("version", "asteroids", "ms/tick", "p99 ms", "ticks/sec", "peak", "final", "respawns", "loop")]
+    designs = dict((name, design) for name, script, design in versions)
+    for row in rows:
+        lines.append("%-12s %9d %10.3f %10.3f %11.0f %6d %6d %9d  %s"
+                     % (row['name'], row['asteroids'], row['mean'] * 1000, row['p99'] * 1000,
+                        row['ticks_per_sec'], row['peak'], row['final'], row['respawns'],
+                        designs[row['name']]))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the update loops of version1-5 and asteroid.py")
+    parser.add_argument('--asteroids', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--ticks', type=int, default=1200)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--only', nargs='+', metavar='NAME',
+                        help="versions to run (default: all of %s)" % ", ".join(name for name, s, d in versions))
+    args = parser.parse_args(argv)
+
+    rows = []
+    for num_asteroids in args.asteroids:
+        for name, script, design in versions:
+            if args.only and name not in args.only:
+                continue
+            rows.append(run(name, script, num_asteroids, args.ticks, args.seed))
+    print(table(rows))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
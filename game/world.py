@@ -0,0 +1,10 @@
+"""Size of the playfield. It can be larger than the window; the camera shows part of it."""
+
+width = 800
+height = 600
+
+
+def resize(new_width, new_height):
+    """Change the size of the playfield"""
+    global width, height
+    width, height = new_width, new_height
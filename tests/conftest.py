@@ -0,0 +1,4 @@
+"""The game modules import pyglet; the tests run them on game.headless, without a display"""
+from game import headless
+
+headless.install()
@@ -0,0 +1,10 @@
+import subprocess
+import sys
+
+
+def test_steady_state_update_does_not_allocate():
+    # In a process of its own: the game installs the headless pyglet, and
+    # anything else this process allocated would blur the counts
+    result = subprocess.run([sys.executable, '-m', 'game.bench', 'steady_state_allocations'],
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    assert result.returncode == 0, result.stdout
@@ -0,0 +1,32 @@
+import numpy as np
+
+from game import collision, parallel
+
+
+def test_parallel_pairs_match_candidate_pairs():
+    rng = np.random.default_rng(1)
+    count = 20000
+    x = rng.uniform(0, 5000, count)
+    y = rng.uniform(0, 5000, count)
+    radius = rng.choice([4.0, 8.0, 16.0, 32.0], count)
+
+    collider = parallel.ParallelCollider(2, min_parallel=0)
+    try:
+        pairs = collider.pairs(x, y, radius)
+    finally:
+        collider.close()
+    assert collider.parallel_calls == 1
+    assert len(pairs)
+    assert np.array_equal(pairs, collision.candidate_pairs(x, y, radius))
+
+
+def test_candidate_pairs_match_the_nested_loop():
+    rng = np.random.default_rng(2)
+    count = 300
+    x = rng.uniform(0, 800, count)
+    y = rng.uniform(0, 600, count)
+    radius = rng.uniform(5, 40, count)
+
+    expected = [(i, j) for i in range(count) for j in range(i + 1, count)
+                if (x[i] - x[j]) ** 2 + (y[i] - y[j]) ** 2 <= (radius[i] + radius[j]) ** 2]
+    assert collision.candidate_pairs(x, y, radius).tolist() == [list(pair) for pair in expected]
@@ -0,0 +1,52 @@
+from game import fixedpoint, simthread
+
+
+def run(inputs, seed=1, num_asteroids=20):
+    simulation = fixedpoint.FixedSimulation(800, 600, seed)
+    ship = simulation.add_player(400, 300)
+    simulation.add_asteroids(num_asteroids, avoid=ship)
+    for held in inputs:
+        simulation.step([held])
+    return simulation.state_hash()
+
+
+def recorded_inputs(ticks=3000, seed=2):
+    pilot = fixedpoint.XorShift(seed)
+    return [pilot.below(16) for i in range(ticks)]
+
+
+def test_same_inputs_give_the_same_hash():
+    inputs = recorded_inputs()
+    assert run(inputs) == run(list(inputs))
+
+
+def test_hash_depends_on_the_inputs():
+    inputs = recorded_inputs()
+    changed = list(inputs)
+    changed[10] ^= fixedpoint.UP
+    assert run(inputs) != run(changed)
+
+
+def test_bodies_wrap_half_their_size_past_the_edge():
+    simulation = fixedpoint.FixedSimulation(800, 600)
+    ship = simulation.add_player(0, 300)
+    ship.velocity_x = -fixedpoint.ONE
+    for i in range(25):
+        simulation.step()
+    assert ship.x == -25 * fixedpoint.ONE
+    simulation.step()
+    assert ship.x == 825 * fixedpoint.ONE
+
+
+def test_fixed_point_game_is_repeatable():
+    def play():
+        simulation = simthread.FixedPointSimulation(5)
+        for tick in range(2000):
+            simulation.controls.actions[0] = 0
+            simulation.step(simulation.dt)
+            if tick % 20 == 0:
+                simulation.keyboard.fire = True
+        snapshot = simulation.snapshot()
+        return simulation.sim.state_hash(), snapshot.score, snapshot.lives, snapshot.level
+
+    assert play() == play()
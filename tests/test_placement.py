@@ -0,0 +1,27 @@
+import pytest
+
+from game import placement
+
+
+def test_positions_keep_their_spacing_and_the_safe_zone():
+    exclude = [(400, 300, 100)]
+    points = placement.positions(500, 800, 600, exclude=exclude, seed=1)
+    spacing = placement.default_spacing(500, 800, 600, exclude)
+
+    assert points.shape == (500, 2)
+    assert placement.minimum_distance(points) >= spacing * (1 - 1e-9)
+    assert (((points - [400, 300]) ** 2).sum(axis=1) >= 100 ** 2).all()
+
+
+def test_same_seed_gives_the_same_layout():
+    assert (placement.positions(200, 800, 600, seed=3) == placement.positions(200, 800, 600, seed=3)).all()
+
+
+def test_too_many_points_shrink_the_spacing():
+    points = placement.positions(300, 100, 100, spacing=50, seed=1)
+    assert len(points) == 300
+
+
+def test_no_room_at_all_is_an_error():
+    with pytest.raises(ValueError):
+        placement.positions(10, 800, 600, spacing=50, exclude=[(400, 300, 2000)], seed=1)
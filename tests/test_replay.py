@@ -0,0 +1,42 @@
+import struct
+
+import pytest
+
+from game import replay
+
+
+@pytest.mark.parametrize('codec', sorted(replay.codecs))
+def test_records_read_back_as_written(tmp_path, codec):
+    filename = str(tmp_path / 'game.replay')
+    # Values that survive the trip through float32 unchanged
+    written = [(tick, tick % 3, index, index * 0.5, -index * 0.25, 1.0, 2.0 ** -tick)
+               for tick in range(50) for index in range(100)]
+    with replay.ReplayWriter(filename, codec=codec, chunk_records=256) as writer:
+        for values in written:
+            assert writer.write(*values)
+
+    assert list(replay.read(filename)) == written
+    assert writer.stats()['dropped'] == 0
+
+
+def test_truncated_file_reads_up_to_the_last_whole_chunk(tmp_path):
+    filename = str(tmp_path / 'game.replay')
+    with replay.ReplayWriter(filename, chunk_records=100) as writer:
+        for index in range(1000):
+            writer.write(0, 0, index, 0.0, 0.0, 0.0, 0.0)
+    with open(filename, 'rb') as replay_file:
+        data = replay_file.read()
+    with open(filename, 'wb') as replay_file:
+        replay_file.write(data[:-1])
+
+    records = list(replay.read(filename))
+    assert 0 < len(records) < 1000
+    assert [values[2] for values in records] == list(range(len(records)))
+
+
+def test_other_files_are_refused(tmp_path):
+    filename = str(tmp_path / 'other.replay')
+    with open(filename, 'wb') as other:
+        other.write(struct.pack('<8sHHI', b'NOTREPLY', 1, 0, replay.record.size))
+    with pytest.raises(ValueError):
+        list(replay.read(filename))
@@ -0,0 +1,56 @@
+import numpy as np
+
+from game import spatial
+
+
+def random_world(count=3000, kinds=3, seed=1):
+    rng = np.random.default_rng(seed)
+    return (rng.uniform(0, 800, count), rng.uniform(0, 600, count),
+            rng.uniform(5, 40, count), rng.integers(0, kinds, count))
+
+
+def queries(count=100, seed=2):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(0, 800, count), rng.uniform(0, 600, count), rng.uniform(10, 100, count)
+
+
+def test_within_matches_brute_force():
+    x, y, radius, kind = random_world()
+    index = spatial.SpatialIndex()
+    index.load(x, y, radius, kind)
+    query_x, query_y, reach = queries()
+
+    found = index.within(query_x, query_y, reach, [0])
+    expected = spatial.brute_within(x, y, kind == 0, query_x, query_y, reach)
+    assert np.array_equal(found[0], expected[0])
+    assert np.array_equal(found[1], expected[1])
+
+
+def test_nearest_matches_brute_force_after_refit():
+    x, y, radius, kind = random_world()
+    index = spatial.SpatialIndex()
+    index.load(x, y, radius, kind)
+    x = x + 3.0
+    index.refit(x, y, radius)
+    query_x, query_y, reach = queries()
+
+    found = index.nearest(query_x, query_y, 4)
+    expected = spatial.brute_nearest(x, y, np.ones(len(x), dtype=bool), query_x, query_y, 4)
+    assert np.array_equal(found[0], expected[0])
+    assert np.array_equal(found[1], expected[1])
+
+
+def test_ray_matches_brute_force():
+    x, y, radius, kind = random_world()
+    index = spatial.SpatialIndex()
+    index.load(x, y, radius, kind)
+    query_x, query_y, reach = queries()
+    angle = np.random.default_rng(3).uniform(0, 2 * np.pi, len(query_x))
+    direction_x, direction_y = np.cos(angle), np.sin(angle)
+    length = np.full(len(query_x), 400.0)
+
+    found = index.ray(query_x, query_y, direction_x, direction_y, length, [1, 2])
+    expected = spatial.brute_ray(x, y, radius, kind != 0, query_x, query_y,
+                                 direction_x, direction_y, length)
+    assert np.array_equal(found[0], expected[0])
+    assert np.array_equal(found[1], expected[1])
@@ -0,0 +1,56 @@
+from game import tracing
+
+
+class Ticks(object):
+    """A clock that moves one second per reading"""
+
+    def __init__(self):
+        self.time = 0.0
+
+    def __call__(self):
+        self.time += 1.0
+        return self.time
+
+
+def phases(events):
+    return [(event['name'], event['ph'], event['ts']) for event in events]
+
+
+def test_spans_and_phases_pair_up():
+    tracer = tracing.Tracer(clock=Ticks())
+    tracer.push('update')
+    tracer.begin('collide')
+    tracer.begin('move')
+    tracer.end()
+    tracer.pop()
+
+    assert phases(tracer.trace_events()) == [
+        ('update', 'B', 1e6), ('collide', 'B', 2e6), ('collide', 'E', 3e6),
+        ('move', 'B', 4e6), ('move', 'E', 5e6), ('update', 'E', 6e6)]
+
+
+def test_open_spans_close_at_the_last_event():
+    tracer = tracing.Tracer(clock=Ticks())
+    tracer.push('update')
+    tracer.begin('collide')
+    tracer.begin('move')
+
+    assert phases(tracer.trace_events()) == [
+        ('update', 'B', 1e6), ('collide', 'B', 2e6), ('collide', 'E', 3e6), ('move', 'B', 4e6),
+        ('move', 'E', 4e6), ('update', 'E', 4e6)]
+    # Exporting doesn't close them for the tracer itself
+    tracer.end()
+    tracer.pop()
+    assert phases(tracer.trace_events())[-2:] == [('move', 'E', 5e6), ('update', 'E', 6e6)]
+
+
+def test_ends_without_their_begins_are_dropped():
+    tracer = tracing.Tracer(capacity=4, clock=Ticks())
+    tracer.push('update')
+    tracer.push('draw')
+    tracer.pop()
+    tracer.pop()
+    tracer.push('update')
+    tracer.pop()
+
+    assert phases(tracer.trace_events()) == [('update', 'B', 5e6), ('update', 'E', 6e6)]